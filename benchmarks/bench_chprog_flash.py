@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+chprog flashing throughput benchmark
+
+Runs detect, erase, write, verify and exit against the simulated CH55x
+bootloader (firmware/chsim.py) for every supported chip and both bootloader
+versions, and checks that the simulated flash ends up holding the image.
+Per-phase times come from Programmer.timings.
+A second table flashes a sparse CH559 image (code at the bottom, a small
+table at the top of flash) to show that cost follows populated bytes.
+
+Usage:
+    python3 benchmarks/bench_chprog_flash.py
+    python3 benchmarks/bench_chprog_flash.py --latency 0.0005
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'firmware'))
+
+from chprog import Programmer, split_image  # noqa: E402
+from chsim import CHIPS, SimulatedBootloader  # noqa: E402
+
+
+def flash_once(chip, bootloader, latency):
+    """Flash a full-size random image; returns (bytes, seconds, transfers, timings)"""
+    sim = SimulatedBootloader(chip, bootloader=bootloader, latency=latency)
+    isp = Programmer(sim)
+    data = os.urandom(CHIPS[chip][1])
+
+    start = time.perf_counter()
+    isp.detect()
+    isp.erase()
+    isp.flash_data(data)
+    isp.verify_data(data)
+    isp.exit()
+    elapsed = time.perf_counter() - start
+
+    if sim.image(len(data)) != data:
+        raise AssertionError(f"{chip} v{bootloader}: flash content mismatch")
+    return len(data), elapsed, sim.transfers, isp.timings
+
+
+def flash_sparse(populated, latency):
+    """Flash a CH559 image with `populated` bytes of code plus a 64 byte table
+    at the top of flash; returns (image end, seconds, transfers)"""
+    sim = SimulatedBootloader('CH559', latency=latency)
+    isp = Programmer(sim)
+    end = CHIPS['CH559'][1]
+    image = bytearray(b'\xff' * end)
+    image[:populated] = os.urandom(populated)
+    image[end - 64:] = os.urandom(64)
+    segments = split_image(image, 0)
+
+    start = time.perf_counter()
+    isp.detect()
+    isp.erase()
+    isp.flash_segments(segments)
+    isp.verify_segments(segments)
+    isp.exit()
+    elapsed = time.perf_counter() - start
+
+    if sim.image(end) != bytes(image):
+        raise AssertionError("sparse image: flash content mismatch")
+    return end, elapsed, sim.transfers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chprog against the simulated bootloader')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated seconds per USB transfer')
+    args = parser.parse_args()
+
+    phases = ('detect', 'erase', 'write', 'verify', 'exit')
+    print(f"{'chip':>6} {'boot':>5} {'bytes':>6} {'transfers':>9} {'seconds':>8} {'KB/s':>8}"
+          + ''.join(f" {phase + ' ms':>9}" for phase in phases))
+    for chip in CHIPS:
+        for bootloader in ('1.1', '2.31'):
+            size, elapsed, transfers, timings = flash_once(chip, bootloader, args.latency)
+            # write + verify both move the image over USB
+            rate = 2 * size / 1024 / elapsed
+            print(f"{chip:>6} {bootloader:>5} {size:>6} {transfers:>9} {elapsed:>8.3f} {rate:>8.1f}"
+                  + ''.join(f" {timings.get(phase, 0.0) * 1000:>9.2f}" for phase in phases))
+
+    print()
+    print(f"{'populated':>9} {'image end':>9} {'transfers':>9} {'seconds':>8}")
+    for populated in (1024, 8192, 32768):
+        end, elapsed, transfers = flash_sparse(populated, args.latency)
+        print(f"{populated + 64:>9} {end:>9} {transfers:>9} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+chprog packet construction benchmark
+
+Compares packets prepared per second by the per-byte loops chprog used to
+run against the current slice/translate based packet builders, for image
+sizes in the range chprog supports (CH551 14 KB .. CH559 60 KB). USB is
+not touched; packets are only built.
+
+Usage:
+    python3 benchmarks/bench_chprog_packets.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'firmware'))
+
+import chprog  # noqa: E402
+
+SIZES = (14336, 32768, 61440)
+CHIPID = 0x52
+
+
+def legacy_packets_v1(data, mode):
+    """Packet loop of chprog v1.1 __writev1"""
+    rest = len(data)
+    curr_addr = 0
+    outbuffer = bytearray(64)
+    outbuffer[0] = mode
+    while curr_addr < len(data):
+        pkt_length = 0x3c if rest >= 0x3c else rest
+        outbuffer[1] = pkt_length
+        outbuffer[2] = (curr_addr & 0xff)
+        outbuffer[3] = ((curr_addr >> 8) & 0xff)
+        for x in range(pkt_length):
+            outbuffer[x + 4] = data[curr_addr + x]
+        yield outbuffer
+        curr_addr += pkt_length
+        rest -= pkt_length
+
+
+def legacy_packets_v2(data, mode, chipid):
+    """Packet loop of chprog v1.1 __writev2"""
+    rest = len(data)
+    curr_addr = 0
+    outbuffer = bytearray(64)
+    outbuffer[0] = mode
+    while curr_addr < len(data):
+        pkt_length = 0x38 if rest >= 0x38 else rest
+        outbuffer[1] = (pkt_length+5)
+        outbuffer[3] = (curr_addr & 0xff)
+        outbuffer[4] = ((curr_addr >> 8) & 0xff)
+        outbuffer[7] = rest & 0xff
+        for x in range(pkt_length):
+            outbuffer[x + 8] = data[curr_addr + x]
+        for x in range(pkt_length + 8):
+            if x % 8 == 7:
+                outbuffer[x] ^= chipid
+        yield outbuffer
+        curr_addr += pkt_length
+        rest -= pkt_length
+
+
+def make_programmer():
+    """Programmer instance without a USB device, only used to build packets"""
+    isp = chprog.Programmer.__new__(chprog.Programmer)
+    isp.chipid = CHIPID
+    return isp
+
+
+def rate(packets, repeat=5):
+    """Best packets/s over repeat runs of the packets() generator factory"""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in packets())
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    isp = make_programmer()
+    new_v1 = isp._Programmer__packetsv1
+    new_v2 = isp._Programmer__packetsv2
+
+    print(f"{'size':>7} {'proto':>5} {'legacy pkt/s':>13} {'new pkt/s':>11} {'speedup':>8}")
+    for size in SIZES:
+        data = os.urandom(size)
+
+        # Both builders must emit identical packets
+        for old, new in zip(legacy_packets_v2(data, chprog.MODE_WRITE_V2, CHIPID),
+                            new_v2(data, chprog.MODE_WRITE_V2)):
+            assert old == new, "v2 packet mismatch"
+        for old, new in zip(legacy_packets_v1(data, chprog.MODE_WRITE_V1),
+                            new_v1(data, chprog.MODE_WRITE_V1)):
+            assert old == new, "v1 packet mismatch"
+
+        cases = (
+            ('v1', lambda: legacy_packets_v1(data, chprog.MODE_WRITE_V1),
+                   lambda: new_v1(data, chprog.MODE_WRITE_V1)),
+            ('v2', lambda: legacy_packets_v2(data, chprog.MODE_WRITE_V2, CHIPID),
+                   lambda: new_v2(data, chprog.MODE_WRITE_V2)),
+        )
+        for proto, legacy, new in cases:
+            old_rate = rate(legacy)
+            new_rate = rate(new)
+            print(f"{size:>7} {proto:>5} {old_rate:>13.0f} {new_rate:>11.0f} {new_rate / old_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Color catch benchmark: how close FREEZE lands to the requested phase
+
+Runs against a simulated device whose packet writes take --write-ms plus up
+to --jitter-ms (uniform). The Rainbow phase a catch freezes at is measured
+from the completion of the Rainbow finish packet to the completion of the
+FREEZE finish packet, for:
+
+    sleep        set_led_mode(Rainbow), sleep(phase), set_led_mode(FREEZE),
+                 as the RGB tab did with root.after() (without Tk's own jitter)
+    compensated  ColorCatcher.catch(phase): timer thread, latency subtracted
+
+Per method: mean error, its standard deviation and the worst error in ms.
+
+Usage:
+    python3 benchmarks/bench_color_catch.py
+    python3 benchmarks/bench_color_catch.py --write-ms 4 --jitter-ms 2 --runs 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from color_catch import FREEZE_MODE, RAINBOW_MODE, ColorCatcher  # noqa: E402
+from minikb_gui import MiniKBDevice  # noqa: E402
+
+
+class SimulatedDevice(MiniKBDevice):
+    """MiniKBDevice whose writes take a fixed time plus jitter"""
+
+    def __init__(self, write_s, jitter_s):
+        super().__init__()
+        self.device = object()  # passes the "Not connected" check
+        self.write_s = write_s
+        self.jitter_s = jitter_s
+        self.landed = []  # completion time of every write
+
+    def _write(self, data):
+        time.sleep(self.write_s + random.uniform(0, self.jitter_s))
+        self.landed.append(time.perf_counter())
+
+
+def sleep_catch(device, phase):
+    device.set_led_mode(RAINBOW_MODE)
+    time.sleep(phase)
+    device.set_led_mode(FREEZE_MODE)
+
+
+def run(method, device, phases, runs):
+    """Errors in ms between the landed and the requested phase"""
+    catcher = ColorCatcher(device)
+    catcher.measure()
+    errors = []
+    for _ in range(runs):
+        for phase in phases:
+            device.landed.clear()
+            if method == 'sleep':
+                sleep_catch(device, phase)
+            else:
+                catcher.catch(phase)
+            # Finish packets are the 3rd and 6th writes
+            caught = device.landed[5] - device.landed[2]
+            errors.append((caught - phase) * 1000)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure color catch accuracy on a simulated device')
+    parser.add_argument('--write-ms', type=float, default=1.0, help='Time per packet write (default: 1)')
+    parser.add_argument('--jitter-ms', type=float, default=0.5,
+                        help='Extra random time per write, up to (default: 0.5)')
+    parser.add_argument('--runs', type=int, default=20, help='Catches per phase (default: 20)')
+    args = parser.parse_args()
+
+    phases = (0.05, 0.2, 0.5)
+    device = SimulatedDevice(args.write_ms / 1000, args.jitter_ms / 1000)
+    print(f"writes {args.write_ms:.1f} ms + up to {args.jitter_ms:.1f} ms, "
+          f"phases {', '.join(f'{p:.2f}' for p in phases)} s, {args.runs} runs each")
+    print(f"{'method':>12} {'mean ms':>8} {'stdev':>7} {'worst':>7}")
+    for method in ('sleep', 'compensated'):
+        errors = run(method, device, phases, args.runs)
+        print(f"{method:>12} {statistics.mean(errors):>+8.2f} {statistics.stdev(errors):>7.2f} "
+              f"{max(errors, key=abs):>+7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Display toggle benchmark: parser checks and toggle latency
+
+Runs display_toggle.py against the captured `kscreen-doctor -o` outputs in
+benchmarks/data/ and checks the planned kscreen-doctor call for each, then
+reports:
+
+    parse+plan   in-process cost per toggle decision
+    toggle       wall time of `python3 display_toggle.py` with stand-in
+                 kscreen-doctor/notify-send scripts on PATH (interpreter
+                 start, one query, one apply), and the processes it spawned
+
+Exits with status 1 if a capture is parsed or planned differently than
+expected. Real kscreen-doctor calls take tens of ms each; they are the
+same two calls in every version and are not included.
+
+Usage:
+    python3 benchmarks/bench_display_toggle.py
+    python3 benchmarks/bench_display_toggle.py --runs 50
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from display_toggle import parse_outputs, plan_toggle  # noqa: E402
+
+TOGGLE = os.path.join(BENCH_DIR, '..', 'display_toggle.py')
+DATA = os.path.join(BENCH_DIR, 'data')
+
+# capture -> expected kscreen-doctor arguments
+EXPECTED = {
+    'kscreen-plasma6-three-on.txt': [
+        'output.eDP-1.disable', 'output.DP-2.disable', 'output.HDMI-A-1.position.0,0'],
+    # DP-1 is listed but disconnected; it must not become the middle screen
+    'kscreen-plasma6-internal-off.txt': [
+        'output.eDP-1.enable', 'output.eDP-1.position.0,0',
+        'output.DP-2.enable', 'output.DP-2.position.1440,0', 'output.HDMI-A-1.position.4000,0'],
+    'kscreen-plasma5-internal-off.txt': [
+        'output.eDP-1.enable', 'output.eDP-1.position.0,0', 'output.HDMI-A-1.position.1920,0'],
+}
+
+FAKE_KSCREEN = """#!/bin/sh
+echo kscreen-doctor >> "$BENCH_LOG"
+[ "$1" = "-o" ] && cat "$BENCH_CAPTURE"
+exit 0
+"""
+
+FAKE_NOTIFY = """#!/bin/sh
+echo notify-send >> "$BENCH_LOG"
+"""
+
+
+def check_captures():
+    """Number of captures whose plan differs from EXPECTED"""
+    failures = 0
+    for name, expected in EXPECTED.items():
+        with open(os.path.join(DATA, name)) as f:
+            args, message = plan_toggle(parse_outputs(f.read()))
+        ok = args == expected
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {message}")
+        if not ok:
+            print(f"     got      {' '.join(args)}\n     expected {' '.join(expected)}")
+    return failures
+
+
+def plan_cost(text, runs=2000):
+    start = time.perf_counter()
+    for _ in range(runs):
+        plan_toggle(parse_outputs(text))
+    return (time.perf_counter() - start) / runs
+
+
+def toggle_latency(capture, runs):
+    """(median ms, processes spawned per toggle) for the toggle script"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, script in (('kscreen-doctor', FAKE_KSCREEN), ('notify-send', FAKE_NOTIFY)):
+            path = os.path.join(tmp, name)
+            with open(path, 'w') as f:
+                f.write(script)
+            os.chmod(path, 0o755)
+        log = os.path.join(tmp, 'calls.log')
+        env = dict(os.environ, PATH=tmp + os.pathsep + os.environ['PATH'],
+                   BENCH_LOG=log, BENCH_CAPTURE=capture)
+
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, TOGGLE], env=env, check=True, stdout=subprocess.DEVNULL)
+            times.append((time.perf_counter() - start) * 1000)
+        # notify-send is not waited for; let the last one land in the log
+        time.sleep(0.2)
+        with open(log) as f:
+            calls = len(f.readlines()) / runs
+    return statistics.median(times), calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the display toggle parser and time a toggle')
+    parser.add_argument('--runs', type=int, default=20, help='Toggle runs to time (default: 20)')
+    args = parser.parse_args()
+
+    failures = check_captures()
+
+    capture = os.path.join(DATA, 'kscreen-plasma6-three-on.txt')
+    with open(capture) as f:
+        text = f.read()
+    print(f"\nparse+plan   {plan_cost(text) * 1e6:8.1f} us")
+    median, calls = toggle_latency(capture, args.runs)
+    print(f"toggle       {median:8.1f} ms median, {calls:.0f} process(es) spawned per toggle")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+MiniKB GUI time-to-interactive benchmark
+
+Starts minikb_gui.py --startup-report in a fresh interpreter several times
+and reports the median of each startup milestone:
+
+    process      spawn -> report line (interpreter, imports, Tk, UI, config)
+    ui_built     MiniKBApp widgets created (ms since MiniKBApp started)
+    first_paint  main window mapped
+    interactive  saved config loaded, event loop free
+
+Exits with status 1 when the median time-to-interactive (process) is over
+--budget, so it can gate startup regressions. Needs a display (X11/Wayland
+or xvfb-run); no device is touched.
+
+Usage:
+    python3 benchmarks/bench_gui_startup.py
+    xvfb-run python3 benchmarks/bench_gui_startup.py --runs 10 --budget 800
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+GUI = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'minikb_gui.py')
+MILESTONES = ('ui_built', 'first_paint', 'interactive')
+
+
+def startup_once(timeout=30):
+    """Milestones of one GUI start in ms, plus 'process' wall time"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, GUI, '--startup-report'],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        for line in proc.stdout:
+            if line.startswith('{'):
+                times = json.loads(line)
+                times['process'] = (time.perf_counter() - start) * 1000
+                proc.wait(timeout=timeout)
+                return times
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        raise RuntimeError("GUI did not become interactive")
+    raise RuntimeError("GUI exited without a startup report:\n" + proc.stderr.read().strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure MiniKB GUI time-to-interactive')
+    parser.add_argument('--runs', type=int, default=5, help='GUI starts to measure (default: 5)')
+    parser.add_argument('--budget', type=float, default=1000.0,
+                        help='Median time-to-interactive budget in ms (default: 1000)')
+    args = parser.parse_args()
+
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        print("No display; run under X11/Wayland or xvfb-run")
+        sys.exit(2)
+
+    runs = [startup_once() for _ in range(args.runs)]
+
+    for name in MILESTONES + ('process',):
+        samples = [run[name] for run in runs if name in run]
+        if samples:
+            print(f"{name:12} {statistics.median(samples):8.1f} ms median "
+                  f"({min(samples):.1f} - {max(samples):.1f})")
+
+    interactive = statistics.median(run['process'] for run in runs)
+    if interactive > args.budget:
+        print(f"FAIL: time-to-interactive {interactive:.1f} ms over {args.budget:.0f} ms budget")
+        sys.exit(1)
+    print(f"OK: time-to-interactive {interactive:.1f} ms within {args.budget:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
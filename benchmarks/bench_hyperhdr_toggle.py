@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+HyperHDR toggle benchmark with a dummy child
+
+Runs hyperhdr_toggle.py as the keyboard shortcut does (a new process per
+press) against a stand-in for hyperhdr that opens its domain socket after
+--ready seconds and exits --exit seconds after SIGTERM. Reports the median
+wall time per press for each case and checks the outcome with --status:
+
+    start       spawn until the socket accepts
+    stop        SIGTERM until the process is gone
+    stubborn    child ignores SIGTERM: SIGKILL after --term-timeout
+    crash       child exits during startup: reported without waiting
+
+The old hyperhdr-toggle.sh slept a fixed 2 s per start and 1 s per stop.
+
+Usage:
+    python3 benchmarks/bench_hyperhdr_toggle.py
+    python3 benchmarks/bench_hyperhdr_toggle.py --ready 0.5 --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TOGGLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hyperhdr_toggle.py')
+
+DUMMY = """
+import os, signal, socket, sys, time
+path, ready, exit_delay, mode = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), sys.argv[4]
+if mode == 'crash':
+    sys.exit(3)
+if mode == 'stubborn':
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+else:
+    signal.signal(signal.SIGTERM, lambda *a: (time.sleep(exit_delay), sys.exit(0)))
+time.sleep(ready)
+server = socket.socket(socket.AF_UNIX)
+server.bind(path)
+server.listen(1)
+while True:
+    signal.pause()
+"""
+
+
+def press(args, mode, workdir, term_timeout):
+    """(seconds, printed line) for one toggle"""
+    dummy = os.path.join(workdir, 'dummy.py')
+    command = f"{sys.executable} {dummy} {workdir}/domain.sock {args.ready} {args.exit} {mode}"
+    argv = [sys.executable, TOGGLE, '--no-notify', '--command', command,
+            '--socket', os.path.join(workdir, 'domain.sock'),
+            '--pidfile', os.path.join(workdir, 'toggle.pid'),
+            '--term-timeout', str(term_timeout), '--start-timeout', '5']
+    start = time.perf_counter()
+    result = subprocess.run(argv, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stdout.strip()
+
+
+def status(workdir):
+    argv = [sys.executable, TOGGLE, '--status', '--command', 'unused',
+            '--pidfile', os.path.join(workdir, 'toggle.pid')]
+    return subprocess.run(argv, capture_output=True, text=True, check=True).stdout.split()[0]
+
+
+def describe(args, case):
+    """What the dummy child did in a case"""
+    return {
+        'start': f"socket after {args.ready:.2f}s",
+        'stop': f"exit {args.exit:.2f}s after SIGTERM",
+        'stubborn': f"SIGKILL after {args.term_timeout:.2f}s",
+        'crash': "exit status 3 during startup",
+    }[case]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time HyperHDR toggles against a dummy child')
+    parser.add_argument('--ready', type=float, default=0.3, help='Dummy socket delay in s (default: 0.3)')
+    parser.add_argument('--exit', type=float, default=0.05,
+                        help='Dummy exit delay after SIGTERM in s (default: 0.05)')
+    parser.add_argument('--term-timeout', type=float, default=0.5,
+                        help='SIGKILL escalation for the stubborn case (default: 0.5)')
+    parser.add_argument('--runs', type=int, default=5, help='Presses per case (default: 5)')
+    args = parser.parse_args()
+
+    cases = {'start': [], 'stop': [], 'stubborn': [], 'crash': []}
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, 'dummy.py'), 'w') as f:
+            f.write(DUMMY)
+
+        for _ in range(args.runs):
+            for case, mode, expect in (('start', 'normal', 'running'), ('stop', 'normal', 'stopped'),
+                                       (None, 'stubborn', 'running'), ('stubborn', 'stubborn', 'stopped'),
+                                       ('crash', 'crash', 'stopped')):
+                seconds, line = press(args, mode, workdir, args.term_timeout)
+                if case:
+                    cases[case].append(seconds)
+                state = status(workdir)
+                if state != expect:
+                    failures += 1
+                    print(f"FAIL {case or 'start'} ({mode}): {line}; now {state}, expected {expect}")
+
+        print(f"{'case':>9} {'median s':>9}  dummy")
+        for case, samples in cases.items():
+            print(f"{case:>9} {statistics.median(samples):>9.3f}  {describe(args, case)}")
+    print("\nold script: 2.000 s per start, 1.000 s per stop (fixed sleeps)")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Keycode registry benchmark for MiniKB
+
+Reports the import cost of keycodes.py (fresh interpreter per run) and the
+per-call cost of the lookups used on the monitor and YAML paths.
+
+Usage:
+    python3 benchmarks/bench_keycodes.py
+"""
+
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import keycodes  # noqa: E402
+
+
+def import_cost(runs=20):
+    """Median (self, cumulative) import time of keycodes in microseconds
+
+    Cumulative includes functools, which the GUI already pulls in via tkinter.
+    """
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import keycodes'],
+                                cwd=ROOT, capture_output=True, text=True)
+        for line in result.stderr.splitlines():
+            # "import time:   self [us] | cumulative | imported package"
+            fields = [f.strip() for f in line.split('|')]
+            if len(fields) == 3 and fields[2] == 'keycodes':
+                samples.append((int(fields[0].split(':')[-1]), int(fields[1])))
+    samples.sort()
+    return samples[len(samples) // 2] if samples else None
+
+
+def lookup_costs(number=200000):
+    """Nanoseconds per call for the registry lookups"""
+    cases = [
+        ('name -> code', lambda: keycodes.keycode('volumeup')),
+        ('code -> display', lambda: keycodes.display_name(0x68)),
+        ('code -> display (unassigned)', lambda: keycodes.display_name(0xf0)),
+        ('modifier string', lambda: keycodes.modifier_string(0x03)),
+        ('parse_action (cached)', lambda: keycodes.parse_action('ctrl-shift-c')),
+        ('parse_action (uncached)', lambda: keycodes.parse_action.__wrapped__('ctrl-shift-c')),
+    ]
+    results = []
+    for label, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        results.append((label, seconds / number * 1e9))
+    return results
+
+
+def main():
+    cost = import_cost()
+    if cost is None:
+        print("import keycodes: not measured")
+    else:
+        print(f"import keycodes: {cost[0]} us self, {cost[1]} us cumulative (median)")
+    for label, ns in lookup_costs():
+        print(f"{label:30} {ns:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+LED pattern benchmark: overlapping effects, thread-per-effect vs one timer wheel
+
+Fires a burst of --notifications notify patterns spread over --spread
+seconds, plus an error blink and a profile flash in the middle of it,
+against a simulated device whose set_led_mode() takes --write-ms:
+
+    threads      one sleeping thread per effect, each writing its own steps
+                 (what the backgrounded blink_led subshells did)
+    engine       PatternEngine: one TimerWheel thread, priorities, coalesced writes
+
+Reports the peak number of threads, LED writes and the wall time until the
+LED is back to Off for good.
+
+Usage:
+    python3 benchmarks/bench_led_patterns.py
+    python3 benchmarks/bench_led_patterns.py --notifications 200 --spread 0.5
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from led_patterns import OFF_MODE, PATTERNS, PatternEngine  # noqa: E402
+
+
+class SimulatedDevice:
+    """set_led_mode() that takes write_s and counts calls"""
+
+    def __init__(self, write_s):
+        self.write_s = write_s
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.mode = OFF_MODE
+        self.last_write = 0.0
+
+    def set_led_mode(self, mode):
+        with self.lock:
+            time.sleep(self.write_s)
+            self.writes += 1
+            self.mode = mode
+            self.last_write = time.perf_counter()
+
+
+def schedule(notifications, spread):
+    """[(start offset, pattern name)] sorted by start"""
+    events = [(random.uniform(0, spread), 'notify') for _ in range(notifications)]
+    events += [(spread / 2, 'error'), (spread / 2, 'profile')]
+    return sorted(events)
+
+
+def run_threads(device, events):
+    def effect(name):
+        for step in PATTERNS[name].steps:
+            device.set_led_mode(step.mode)
+            time.sleep(step.duration)
+        device.set_led_mode(OFF_MODE)
+
+    peak = threading.active_count()
+    start = time.perf_counter()
+    workers = []
+    for offset, name in events:
+        time.sleep(max(0.0, start + offset - time.perf_counter()))
+        worker = threading.Thread(target=effect, args=(name,))
+        worker.start()
+        workers.append(worker)
+        peak = max(peak, threading.active_count())
+    for worker in workers:
+        worker.join()
+    return peak, start
+
+
+def run_engine(device, events):
+    engine = PatternEngine(device)
+    peak = threading.active_count()
+    start = time.perf_counter()
+    for offset, name in events:
+        time.sleep(max(0.0, start + offset - time.perf_counter()))
+        engine.play(name)
+        peak = max(peak, threading.active_count())
+    # Until every pattern has ended and the Off write is done
+    while engine.stats()['active'] or engine.wheel.pending or device.mode != OFF_MODE:
+        time.sleep(0.01)
+    engine.close()
+    return peak, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare LED effect threads with the pattern engine')
+    parser.add_argument('--notifications', type=int, default=50, help='Notify patterns (default: 50)')
+    parser.add_argument('--spread', type=float, default=1.0, help='Seconds they arrive over (default: 1)')
+    parser.add_argument('--write-ms', type=float, default=1.0, help='set_led_mode() time (default: 1)')
+    args = parser.parse_args()
+
+    events = schedule(args.notifications, args.spread)
+    base = threading.active_count()
+    print(f"{len(events)} effects over {args.spread:.2f}s, writes take {args.write_ms:.1f} ms")
+    print(f"{'method':>8} {'threads':>8} {'writes':>7} {'done s':>7}")
+    for method, run in (('threads', run_threads), ('engine', run_engine)):
+        device = SimulatedDevice(args.write_ms / 1000)
+        peak, start = run(device, events)
+        print(f"{method:>8} {peak - base:>8} {device.writes:>7} {device.last_write - start:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Live state block benchmark: seqlock reads under a busy writer
+
+A writer process rewrites the held keys of the shared state block as fast as
+it can; every update is self-consistent (keycode and modifier derived from
+the timestamp). The reader samples the block for --seconds and reports:
+
+    ns/read    cost of one consistent read (no syscalls)
+    retries    reads repeated because the writer was mid-update
+    torn       snapshots whose fields do not belong to one update (must be 0)
+    updates/s  writer rate (one flock + two sequence bumps per update)
+
+Usage:
+    python3 benchmarks/bench_live_state.py
+    python3 benchmarks/bench_live_state.py --seconds 5 --path /dev/shm/minikb-bench
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from live_state import StateReader, StateWriter, held_keycodes  # noqa: E402
+
+
+def writer_process(path, stop, counter):
+    with StateWriter(path) as writer:
+        i = 0
+        while not stop.is_set():
+            i += 1
+            writer.set_keys((i % 200 + 1,), i % 256, timestamp_ns=i)
+        counter.value = i
+
+
+def consistent(state):
+    i = state.last_event_ns
+    return i == 0 or (held_keycodes(state) == [i % 200 + 1] and state.modifier == i % 256)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure live state seqlock reads against a busy writer')
+    parser.add_argument('--seconds', type=float, default=2.0, help='Measurement time (default: 2)')
+    parser.add_argument('--path', help='State file (default: a temporary file)')
+    args = parser.parse_args()
+
+    tmp = None
+    path = args.path
+    if path is None:
+        tmp = tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+        path = os.path.join(tmp.name, 'minikb-state')
+
+    StateWriter(path).close()
+    stop = multiprocessing.Event()
+    counter = multiprocessing.Value('q', 0)
+    proc = multiprocessing.Process(target=writer_process, args=(path, stop, counter))
+    proc.start()
+
+    reads = torn = 0
+    try:
+        with StateReader(path) as reader:
+            time.sleep(0.1)
+            start = time.perf_counter()
+            end = start + args.seconds
+            while time.perf_counter() < end:
+                for _ in range(1000):
+                    if not consistent(reader.read()):
+                        torn += 1
+                reads += 1000
+            elapsed = time.perf_counter() - start
+            retries = reader.retries
+    finally:
+        stop.set()
+        proc.join()
+        if tmp:
+            tmp.cleanup()
+
+    # ns/read includes the consistency check of each snapshot
+    print(f"{'reads':>9} {'ns/read':>8} {'retries':>8} {'torn':>5} {'updates/s':>10}")
+    print(f"{reads:>9} {elapsed / reads * 1e9:>8.0f} {retries:>8} {torn:>5} "
+          f"{counter.value / (elapsed + 0.1):>10.0f}")
+    if torn:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
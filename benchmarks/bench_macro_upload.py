@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Macro upload benchmark for MiniKB
+
+Measures the cost of programming one button with macros of increasing
+length. Without --device a simulated endpoint is used that charges a fixed
+latency per OUT transfer (1 ms = one full-speed interrupt interval).
+
+Usage:
+    python3 benchmarks/bench_macro_upload.py
+    python3 benchmarks/bench_macro_upload.py --latency 0.002
+    sudo python3 benchmarks/bench_macro_upload.py --device
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minikb_gui import MiniKBDevice, MAX_MACRO_LENGTH  # noqa: E402
+
+
+class SimulatedEndpoint:
+    """Stand-in for a pyusb device that only counts and delays writes"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.packets = 0
+
+    def write(self, endpoint, data, timeout=None):
+        self.packets += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark macro upload cost per macro length')
+    parser.add_argument('--device', action='store_true', help='Use the real keyboard')
+    parser.add_argument('--latency', type=float, default=0.001, help='Simulated seconds per packet')
+    parser.add_argument('--button', type=lambda v: int(v, 0), default=0x01, help='Button ID to program')
+    parser.add_argument('--repeat', type=int, default=5, help='Uploads per macro length')
+    args = parser.parse_args()
+
+    device = MiniKBDevice()
+    if args.device:
+        device.connect()
+        counter = None
+    else:
+        counter = SimulatedEndpoint(args.latency)
+        device.device = counter
+
+    print(f"{'length':>6} {'packets':>8} {'ms/upload':>10} {'ms/key':>8}")
+    try:
+        for length in range(1, MAX_MACRO_LENGTH + 1):
+            # a, b, c, ... as the macro body
+            sequence = [(0x04 + (i % 26), 0x00) for i in range(length)]
+            if counter:
+                counter.packets = 0
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                device.set_macro(args.button, sequence)
+            elapsed = (time.perf_counter() - start) / args.repeat
+
+            packets = counter.packets // args.repeat if counter else length + 2
+            print(f"{length:>6} {packets:>8} {elapsed * 1000:>10.2f} {elapsed * 1000 / length:>8.2f}")
+    finally:
+        if args.device:
+            device.disconnect()
+
+
+if __name__ == "__main__":
+    main()
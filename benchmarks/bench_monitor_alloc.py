@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Live Monitor allocation benchmark
+
+Replays a burst of HID reports (encoder spins and key taps) through
+InputMonitor._process_input and reports traced bytes per event while the
+events wait in a queue for the UI, as they do between the monitor thread
+and Tk's after() callback. "dict" is the per-event dict the monitor used to
+build with hex strings and byte lists; "InputEvent" is the current slotted
+record. No strings are rendered, as when the Live Monitor tab is not shown.
+
+Usage:
+    python3 benchmarks/bench_monitor_alloc.py
+    python3 benchmarks/bench_monitor_alloc.py --trace encoder.mkt
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hid_trace import TraceWriter, read_trace  # noqa: E402
+from keycodes import display_name, modifier_string  # noqa: E402
+from minikb_gui import InputMonitor  # noqa: E402
+
+BURST = 5000
+
+
+class DictMonitor(InputMonitor):
+    """_process_input as it was before InputEvent"""
+
+    def _process_input(self, data, ep_addr=0):
+        if len(data) < 1:
+            return
+        self.callback({'type': 'raw', 'endpoint': ep_addr, 'data': data.hex(), 'bytes': list(data)})
+        modifier = data[0]
+        keys = set(data[2:]) - {0x00}
+        for keycode in keys - self.last_keys:
+            self.callback({'type': 'press', 'keycode': keycode, 'key_name': display_name(keycode),
+                           'modifier': modifier_string(modifier), 'raw': data.hex()})
+        for keycode in self.last_keys - keys:
+            self.callback({'type': 'release', 'keycode': keycode, 'key_name': display_name(keycode),
+                           'raw': data.hex()})
+        self.last_keys = keys
+
+
+def make_burst(path, reports=BURST):
+    """Encoder ticks (F19/F21) and ctrl+F13 taps, each a press and a release report"""
+    start = time.monotonic_ns()
+    with TraceWriter(path) as writer:
+        for i in range(reports // 2):
+            keycode = (0x6e, 0x70, 0x68)[i % 3]
+            modifier = 0x01 if keycode == 0x68 else 0x00
+            writer.write(0x81, bytes((modifier, 0, keycode, 0, 0, 0, 0, 0)), start + i * 2_000_000)
+            writer.write(0x81, bytes(8), start + i * 2_000_000 + 1_000_000)
+
+
+def measure(monitor_class, records):
+    """(bytes per event, events, microseconds per report) for one replay"""
+    queue = []
+    monitor = monitor_class(None, queue.append)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _, endpoint, data in records:
+        monitor._process_input(data, endpoint)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(queue), len(queue), elapsed / len(records) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure allocations per Live Monitor event')
+    parser.add_argument('--trace', help='Replay this trace instead of a synthetic burst')
+    args = parser.parse_args()
+
+    if args.trace:
+        records = list(read_trace(args.trace))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'burst.mkt')
+            make_burst(path)
+            records = list(read_trace(path))
+    if not records:
+        print("Trace is empty")
+        return
+
+    print(f"{len(records)} reports")
+    print(f"{'event record':>12} {'events':>7} {'bytes/event':>12} {'us/report':>10}")
+    for label, monitor_class in (('dict', DictMonitor), ('InputEvent', InputMonitor)):
+        per_event, events, us = measure(monitor_class, records)
+        print(f"{label:>12} {events:>7} {per_event:>12.0f} {us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Reconnect benchmark: recovery from USB faults on a simulated keyboard
+
+The simulated keyboard (minikb_sim.py) applies LED commands and key
+programming sessions like the firmware and takes injected faults:
+
+    stall    one OUT transfer fails with EPIPE (retried, no reconnect)
+    reset    the device drops off the bus in the middle of a transfer and
+             re-enumerates after --reenumerate s, forgetting the open
+             session and its LED mode (keys already committed stay)
+    gone     the device stays away longer than the reconnect timeout
+
+Checks that after each fault the device holds exactly the requested keys
+and LED mode, and that a write from the UI thread during a long unplug fails
+within the interactive timeout while the recovery finishes in the
+background. Then reports the time to recovery: for writes (reset during
+program_layer / set_led_mode) and for the Live Monitor (reset while reading,
+until the next key press arrives). Exits with status 1 on a wrong state.
+
+Usage:
+    python3 benchmarks/bench_reconnect.py
+    python3 benchmarks/bench_reconnect.py --reenumerate 0.5 --runs 10
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minikb_gui import BUTTONS, INTERACTIVE_RECONNECT_TIMEOUT, InputMonitor  # noqa: E402
+from minikb_sim import SimulatedDevice, SimulatedKeyboard  # noqa: E402
+
+F13 = 0x68
+
+
+def bindings(keycode):
+    return [(button_id, [(keycode + i, 0)]) for i, button_id in enumerate(BUTTONS.values())]
+
+
+def expected_keys(keycode):
+    return {(0, button_id): sequence for button_id, sequence in bindings(keycode)}
+
+
+def check(name, ok, failures):
+    if not ok:
+        failures.append(name)
+        print(f"FAIL {name}")
+
+
+def run_checks(reenumerate, failures):
+    """Correctness of each fault kind"""
+    keyboard = SimulatedKeyboard(reenumerate)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    device.set_led_mode(2)
+
+    keyboard.inject('stall', after=3)
+    device.program_layer(bindings(0x04))
+    check('stall: keys written', keyboard.keys == expected_keys(0x04), failures)
+    check('stall: no reconnect', device.reconnects == 0, failures)
+
+    keyboard.inject('reset', after=4)
+    device.program_layer(bindings(0x10))
+    check('reset in program_layer: session replayed', keyboard.keys == expected_keys(0x10), failures)
+    check('reset in program_layer: LED mode restored', keyboard.led_mode == 2, failures)
+
+    keyboard.inject('reset', after=1)
+    device.set_led_mode(1)
+    check('reset in set_led_mode: new mode set', keyboard.led_mode == 1, failures)
+
+    device.reconnect_timeout = 0.5
+    keyboard.inject('gone')
+    start = time.monotonic()
+    try:
+        device.set_led_mode(2)
+        check('gone: error raised', False, failures)
+    except RuntimeError:
+        waited = time.monotonic() - start
+        check(f'gone: gave up after {waited:.2f}s', waited < 0.5 + 0.6, failures)
+
+
+def run_interactive_checks(failures, away=1.0):
+    """A UI-thread write during an unplug must not block for the reconnect"""
+    keyboard = SimulatedKeyboard(away)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    device.set_led_mode(2)
+    device.interactive_thread = threading.current_thread()
+
+    keyboard.inject('reset')
+    for name in ('ui write during unplug', 'ui write while reconnecting'):
+        start = time.monotonic()
+        try:
+            device.set_led_mode(1)
+            check(f'{name}: error raised', False, failures)
+        except RuntimeError:
+            waited = time.monotonic() - start
+            check(f'{name}: failed after {waited:.2f}s', waited < INTERACTIVE_RECONNECT_TIMEOUT + 0.1,
+                  failures)
+
+    deadline = time.monotonic() + away + 1.0
+    while not device.reconnects and time.monotonic() < deadline:
+        time.sleep(0.01)
+    check('ui write: reconnected in the background', device.reconnects == 1, failures)
+    check('ui write: LED mode restored', keyboard.led_mode == 2, failures)
+
+
+def write_recovery(reenumerate, runs):
+    """Seconds from the reset to the end of the interrupted program_layer"""
+    keyboard = SimulatedKeyboard(reenumerate)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    times = []
+    for i in range(runs):
+        keyboard.inject('reset', after=3)
+        device.program_layer(bindings(0x04 + i))
+        times.append(time.monotonic() - keyboard.reset_at)
+    return times
+
+
+def monitor_recovery(reenumerate, runs):
+    """Seconds from a reset under the Live Monitor to the next key press event"""
+    keyboard = SimulatedKeyboard(reenumerate)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    pressed = threading.Event()
+
+    def on_event(event):
+        if event.type == 'press':
+            pressed.set()
+
+    monitor = InputMonitor(device, on_event)
+    monitor.raw_events = False
+    monitor.start()
+    times = []
+    try:
+        for _ in range(runs):
+            pressed.clear()
+            keyboard.reset()
+            # Keep pressing F13 until the monitor sees it again
+            while not pressed.wait(0.005):
+                keyboard.reports[:] = [bytes(8), bytes([0, 0, F13, 0, 0, 0, 0, 0])]
+            times.append(time.monotonic() - keyboard.reset_at)
+    finally:
+        monitor.stop()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure recovery from USB faults on a simulated keyboard')
+    parser.add_argument('--reenumerate', type=float, default=0.1,
+                        help='Seconds the keyboard is away after a reset (default: 0.1)')
+    parser.add_argument('--runs', type=int, default=5, help='Resets per measurement (default: 5)')
+    args = parser.parse_args()
+    # Reconnect warnings would interleave with the table
+    logging.disable(logging.WARNING)
+
+    failures = []
+    run_checks(args.reenumerate, failures)
+    run_interactive_checks(failures)
+    print(f"fault checks: {'all OK' if not failures else f'{len(failures)} failed'}")
+
+    print(f"\nrecovery after a reset, device away {args.reenumerate * 1000:.0f} ms")
+    print(f"{'path':>8} {'median ms':>10} {'max ms':>8} {'overhead ms':>12}")
+    for path, measure in (('write', write_recovery), ('monitor', monitor_recovery)):
+        times = measure(args.reenumerate, args.runs)
+        median = statistics.median(times)
+        print(f"{path:>8} {median * 1000:>10.1f} {max(times) * 1000:>8.1f} "
+              f"{(median - args.reenumerate) * 1000:>12.1f}")
+    print("\nbefore: an error dialog, then Connect by hand; the monitor retried a dead handle every 0.5 s")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Transfer trace benchmark: tracing cost per transfer and Chrome export
+
+Programs layers and LED modes on a simulated endpoint that only counts
+writes (so the time is Python overhead), with MiniKBDevice.tracer off and
+on, and reports:
+
+    us/packet    OUT transfer cost without and with the tracer
+    export       time and size of export_chrome() for the recorded events
+
+Also checks the exported trace: every transfer names its operation and lies
+inside a span of that name on the same thread. Exits with status 1 if not.
+
+Usage:
+    python3 benchmarks/bench_transfer_trace.py
+    python3 benchmarks/bench_transfer_trace.py --rounds 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minikb_gui import BUTTONS, MiniKBDevice  # noqa: E402
+from transfer_trace import TransferTracer  # noqa: E402
+
+BINDINGS = [(button_id, [(0x68 + i, 0)]) for i, button_id in enumerate(BUTTONS.values())]
+
+
+class CountingEndpoint:
+    """Stand-in for a pyusb device that only counts writes"""
+
+    def __init__(self):
+        self.packets = 0
+
+    def write(self, endpoint, data, timeout=None):
+        self.packets += 1
+        return len(data)
+
+
+def workload(device, rounds):
+    """us per OUT packet for rounds of program_layer + set_led_mode + set_key"""
+    endpoint = device.device
+    endpoint.packets = 0
+    start = time.perf_counter()
+    for i in range(rounds):
+        device.program_layer(BINDINGS)
+        device.set_led_mode(i % 3)
+        device.set_key(0x01, 0x68)
+    return (time.perf_counter() - start) / endpoint.packets * 1e6
+
+
+def check_spans(events):
+    """Transfers outside a span of their operation"""
+    spans = {}
+    for event in events:
+        if event.get('cat') == 'op':
+            spans.setdefault((event['tid'], event['name']), []).append((event['ts'], event['ts'] + event['dur']))
+    bad = 0
+    for event in events:
+        if event.get('cat') not in ('out', 'in'):
+            continue
+        operation = event['args'].get('operation')
+        start, end = event['ts'], event['ts'] + event['dur']
+        if not any(s <= start and end <= e for s, e in spans.get((event['tid'], operation), ())):
+            bad += 1
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure transfer tracing overhead and Chrome export')
+    parser.add_argument('--rounds', type=int, default=2000, help='Workload rounds (default: 2000)')
+    args = parser.parse_args()
+
+    device = MiniKBDevice()
+    device.device = CountingEndpoint()
+    device.rgb_log_level = 100  # keep LED log formatting out of the numbers
+
+    off = workload(device, args.rounds)
+    device.tracer = TransferTracer()
+    on = workload(device, args.rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trace.json')
+        start = time.perf_counter()
+        count = device.tracer.export_chrome(path)
+        export = time.perf_counter() - start
+        size = os.path.getsize(path)
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+
+    print(f"{'tracer':>7} {'us/packet':>10}")
+    print(f"{'off':>7} {off:>10.2f}")
+    print(f"{'on':>7} {on:>10.2f}  (+{on - off:.2f} us per transfer)")
+    print(f"\nexport  {count} events ({device.tracer.transfers} transfers) in {export * 1000:.0f} ms, "
+          f"{size / 1024:.0f} KiB, {size / count:.0f} bytes/event")
+
+    bad = check_spans(events)
+    print(f"spans   {'every transfer inside its operation' if not bad else f'{bad} transfer(s) outside'}")
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
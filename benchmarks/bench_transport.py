@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+MiniKB transport benchmark: pyusb vs hidraw
+
+Without --device both transports run against in-process stand-ins:
+    usb     MiniKBDevice on a fake pyusb device whose read() blocks on a
+            queue per endpoint with a timeout, like libusb interrupt reads
+    hidraw  HidrawDevice attached to SOCK_SEQPACKET socketpairs (one per
+            interface), which keep report boundaries like /dev/hidrawN
+
+Two numbers per transport:
+    write   packets/s and us per packet for the 65 byte OUT packets (the
+            fake pyusb write only counts, so this is Python overhead there)
+    read    report latency: a report is injected on the last interface and
+            timed until read_input() returns it (the monitor loop's view)
+
+With --device the write test runs on the real keyboard through each
+transport (the connect init packet is resent, which changes nothing).
+Input latency on hardware needs key presses and is not measured.
+
+Usage:
+    python3 benchmarks/bench_transport.py
+    sudo python3 benchmarks/bench_transport.py --device
+"""
+
+import argparse
+import os
+import queue
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minikb_gui import ENDPOINT_OUT, USB_AVAILABLE, HidrawDevice, MiniKBDevice  # noqa: E402
+
+if USB_AVAILABLE:
+    import usb.core
+
+ENDPOINTS = (0x81, 0x82, 0x83)
+INIT_PACKET = bytes([0x03] + [0x00] * 64)
+REPORT = bytes((0, 0, 0x68, 0, 0, 0, 0, 0))
+
+
+class QueueUSBDevice:
+    """Fake pyusb device: writes are counted, reads block on a queue per endpoint"""
+
+    def __init__(self):
+        self.packets = 0
+        self.queues = {ep: queue.Queue() for ep in ENDPOINTS}
+
+    def write(self, endpoint, data, timeout=None):
+        self.packets += 1
+        return len(data)
+
+    def read(self, endpoint, size, timeout=None):
+        try:
+            return self.queues[endpoint].get(timeout=timeout / 1000)
+        except queue.Empty:
+            raise usb.core.USBError("Operation timed out", errno=110)
+
+    def inject(self, endpoint, data):
+        self.queues[endpoint].put(data)
+
+
+def make_usb():
+    device = MiniKBDevice()
+    fake = QueueUSBDevice()
+    device.device = fake
+    device._all_endpoints = [(ep, 64, i) for i, ep in enumerate(ENDPOINTS)]
+    return device, fake.inject, None
+
+
+def make_hidraw():
+    device = HidrawDevice()
+    pairs = {ep: socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET) for ep in ENDPOINTS}
+    ours = {pair[0].fileno(): ep for ep, pair in pairs.items()}
+    # OUT packets go to the last interface, like the ch57x vendor interface
+    out_pair = pairs[ENDPOINTS[-1]]
+    device.attach(out_pair[0].fileno(), ours)
+
+    def drain():
+        while True:
+            try:
+                if not out_pair[1].recv(256):
+                    return
+            except OSError:
+                return
+
+    threading.Thread(target=drain, daemon=True).start()
+
+    def inject(endpoint, data):
+        pairs[endpoint][1].send(data)
+
+    return device, inject, pairs
+
+
+def write_rate(device, packets=2000):
+    """(packets/s, us/packet) for OUT packets"""
+    start = time.perf_counter()
+    for _ in range(packets):
+        device._send_packet(INIT_PACKET)
+    elapsed = time.perf_counter() - start
+    return packets / elapsed, elapsed / packets * 1e6
+
+
+def read_latency(device, inject, samples=300):
+    """Median and p95 microseconds from report injection to read_input() return"""
+    latencies = []
+    endpoint = ENDPOINTS[-1]
+    results = queue.Queue()
+
+    def reader():
+        for _ in range(samples):
+            while not device.read_input(timeout=50):
+                pass
+            results.put(time.perf_counter())
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    for _ in range(samples):
+        time.sleep(0.002)
+        sent = time.perf_counter()
+        inject(endpoint, REPORT)
+        latencies.append((results.get(timeout=5) - sent) * 1e6)
+    thread.join(timeout=1)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare pyusb and hidraw transports')
+    parser.add_argument('--device', action='store_true', help='Write test on the real keyboard')
+    parser.add_argument('--packets', type=int, default=2000, help='OUT packets per write test')
+    args = parser.parse_args()
+
+    if args.device:
+        print(f"{'transport':>9} {'pkt/s':>9} {'us/pkt':>8}")
+        for name, cls in (('usb', MiniKBDevice), ('hidraw', HidrawDevice)):
+            device = cls()
+            device.connect()
+            try:
+                rate, us = write_rate(device, min(args.packets, 500))
+            finally:
+                device.disconnect()
+            print(f"{name:>9} {rate:>9.0f} {us:>8.1f}")
+        return
+
+    print(f"{'transport':>9} {'pkt/s':>9} {'us/pkt':>8} {'read p50 us':>12} {'read p95 us':>12}")
+    for name, make in (('usb', make_usb), ('hidraw', make_hidraw)):
+        if name == 'usb' and not USB_AVAILABLE:
+            print(f"{name:>9} skipped (pyusb not installed)")
+            continue
+        device, inject, _pairs = make()
+        rate, us = write_rate(device, args.packets)
+        p50, p95 = read_latency(device, inject)
+        print(f"{name:>9} {rate:>9.0f} {us:>8.1f} {p50:>12.0f} {p95:>12.0f}")
+        if name == 'usb':
+            assert device.device.packets == args.packets, "lost OUT packets"
+    print(f"\nOUT endpoint 0x{ENDPOINT_OUT:02x}; reports injected on endpoint 0x{ENDPOINTS[-1]:02x} "
+          f"of {len(ENDPOINTS)} polled endpoints")
+
+
+if __name__ == "__main__":
+    main()
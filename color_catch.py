@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+MiniKB Color Catch - Latency-compensated Rainbow + Freeze
+The timed catch of the RGB tab started Rainbow and scheduled FREEZE with
+root.after(); the caught color moved with Tk scheduling jitter and with the
+three blocking writes of each set_led_mode() call. Here:
+
+    latency      set_led_mode() calls are timed; the median duration is how
+                 long before its finish packet lands a call has to start
+    timer        FREEZE is timed by a PreciseTimer that sleeps until just
+                 before the deadline and spins the rest
+    lock         the device lock is held from Rainbow to FREEZE, so no other
+                 LED or programming write lands in between
+    phase        Rainbow runs from the end of its set_led_mode() call; the
+                 FREEZE call starts at rainbow end + phase - latency
+    calibration  {color: phase} in the Rainbow cycle, kept in a JSON file
+
+Usage:
+    python3 color_catch.py --calibrate
+    python3 color_catch.py --color Red
+    python3 color_catch.py --phase 0.8 --samples 10
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+RAINBOW_MODE = 2
+FREEZE_MODE = 3
+CALIBRATION_FILE = os.path.expanduser("~/.minikb_rainbow.json")
+SPIN_MARGIN = 0.002      # seconds before a deadline the timer stops sleeping and spins
+LATENCY_SAMPLES = 5      # set_led_mode() calls timed by measure()
+LATENCY_WINDOW = 16      # most recent call durations the latency estimate uses
+CALIBRATION_STEP = 0.25  # seconds between phases of a calibration sweep
+CALIBRATION_SPAN = 6.0
+
+CatchResult = namedtuple('CatchResult', 'phase caught latency timer_error')
+CatchResult.__doc__ = """One catch, all in seconds
+
+    phase        requested offset into the Rainbow cycle
+    caught       end of the Rainbow call to end of the FREEZE call
+    latency      compensation used for this catch
+    timer_error  how late the timer thread started the FREEZE call
+"""
+
+
+class PreciseTimer(threading.Thread):
+    """Calls callback at a time.perf_counter() deadline on its own thread
+    (start()), or on the calling thread (run())
+
+    Sleeps in an Event wait (so cancel() takes effect at once) until
+    SPIN_MARGIN before the deadline, then busy-waits the rest: sleep alone
+    wakes up late by the scheduler tick, spinning for the whole wait would
+    hold a CPU.
+    """
+
+    def __init__(self, deadline, callback, spin=SPIN_MARGIN):
+        super().__init__(daemon=True, name='PreciseTimer')
+        self.deadline = deadline
+        self.callback = callback
+        self.spin = spin
+        self.fired_at = None  # perf_counter() when callback was called
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        remaining = self.deadline - self.spin - time.perf_counter()
+        if remaining > 0 and self._cancelled.wait(remaining):
+            return
+        while time.perf_counter() < self.deadline:
+            if self._cancelled.is_set():
+                return
+        self.fired_at = time.perf_counter()
+        self.callback()
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """{color: phase in seconds} from a calibration file, {} if there is none"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {color: float(phase) for color, phase in data.get('colors', {}).items()}
+
+
+def save_calibration(colors, path=CALIBRATION_FILE):
+    with open(path, 'w') as f:
+        json.dump({'colors': {color: round(phase, 4) for color, phase in colors.items()}}, f, indent=2)
+
+
+def phases_from_sweep(observations):
+    """{color: phase} from (phase, color) sweep observations
+
+    A color seen at several consecutive phases gets the middle of its first
+    run, the point furthest from its neighbours. Empty colors are skipped.
+    """
+    runs = {}
+    previous = None
+    for phase, color in sorted(observations):
+        if color and color == previous:
+            runs[color][-1].append(phase)
+        elif color:
+            runs.setdefault(color, []).append([phase])
+        previous = color
+    return {color: (spans[0][0] + spans[0][-1]) / 2 for color, spans in runs.items()}
+
+
+class ColorCatcher:
+    """Catches a Rainbow phase on a MiniKBDevice with write-latency compensation"""
+
+    def __init__(self, device, calibration=None):
+        """
+        Args:
+            device: connected MiniKBDevice (or HidrawDevice)
+            calibration: {color: phase in seconds} for catch_color()
+        """
+        self.device = device
+        self.calibration = dict(calibration or {})
+        self.durations = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def latency(self):
+        """Median set_led_mode() duration in seconds, None before any call"""
+        return statistics.median(self.durations) if self.durations else None
+
+    def _set_mode(self, mode):
+        """set_led_mode(mode); returns (start, end) perf_counter() times"""
+        start = time.perf_counter()
+        self.device.set_led_mode(mode)
+        end = time.perf_counter()
+        self.durations.append(end - start)
+        return start, end
+
+    def measure(self, samples=LATENCY_SAMPLES):
+        """Time samples Rainbow writes; returns the latency estimate
+
+        Rainbow is what a catch writes first anyway. The per-call log lines
+        are suppressed while measuring.
+        """
+        level = self.device.rgb_log_level
+        self.device.rgb_log_level = logging.WARNING
+        try:
+            for _ in range(samples):
+                self._set_mode(RAINBOW_MODE)
+        finally:
+            self.device.rgb_log_level = level
+        return self.latency
+
+    def catch(self, phase):
+        """Start Rainbow and freeze it phase seconds later; blocks until frozen
+
+        Raises:
+            ValueError: if phase is negative
+        """
+        if phase < 0:
+            raise ValueError(f"Phase must not be negative: {phase}")
+        if self.latency is None:
+            self.measure()
+        latency = self.latency
+
+        ends = []
+        # Serialized with the other writers of the device: the timer runs on
+        # this thread, which holds the (reentrant) lock until FREEZE is sent
+        with getattr(self.device, 'lock', None) or contextlib.nullcontext():
+            _, rainbow_end = self._set_mode(RAINBOW_MODE)
+
+            def freeze():
+                ends.append(self._set_mode(FREEZE_MODE)[1])
+
+            # A phase shorter than the latency cannot be hit; freeze at once
+            timer = PreciseTimer(max(rainbow_end, rainbow_end + phase - latency), freeze)
+            timer.run()
+        return CatchResult(phase, ends[0] - rainbow_end, latency, timer.fired_at - timer.deadline)
+
+    def catch_color(self, color):
+        """catch() at the calibrated phase of color
+
+        Raises:
+            ValueError: if color is not calibrated
+        """
+        if color not in self.calibration:
+            known = ', '.join(self.calibration) or 'none, run --calibrate'
+            raise ValueError(f"Color {color!r} not calibrated (known: {known})")
+        return self.catch(self.calibration[color])
+
+    def sweep(self, ask, step=CALIBRATION_STEP, span=CALIBRATION_SPAN):
+        """Catch every step seconds up to span and ask which color shows
+
+        Args:
+            ask: called with each CatchResult, returns the color seen ('' to skip)
+
+        Returns:
+            {color: phase}, also merged into self.calibration
+        """
+        observations = []
+        phase = 0.0
+        while phase <= span + 1e-9:
+            result = self.catch(phase)
+            observations.append((result.caught, ask(result)))
+            phase += step
+        colors = phases_from_sweep(observations)
+        self.calibration.update(colors)
+        return colors
+
+
+def format_result(result):
+    return (f"phase {result.phase * 1000:.1f} ms -> caught {result.caught * 1000:.1f} ms "
+            f"(error {(result.caught - result.phase) * 1000:+.2f} ms, latency "
+            f"{result.latency * 1000:.2f} ms, timer {result.timer_error * 1e6:+.0f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catch a Rainbow color with latency compensation')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--color', help='Calibrated color to catch')
+    target.add_argument('--phase', type=float, help='Seconds into the Rainbow cycle to freeze at')
+    target.add_argument('--calibrate', action='store_true',
+                        help='Sweep the cycle and record the color seen at each phase')
+    target.add_argument('--measure', action='store_true', help='Only measure the LED write latency')
+    parser.add_argument('--calibration', default=CALIBRATION_FILE,
+                        help=f'Calibration file (default: {CALIBRATION_FILE})')
+    parser.add_argument('--samples', type=int, default=LATENCY_SAMPLES,
+                        help=f'Writes timed for the latency (default: {LATENCY_SAMPLES})')
+    parser.add_argument('--step', type=float, default=CALIBRATION_STEP,
+                        help=f'Calibration phase step in s (default: {CALIBRATION_STEP})')
+    parser.add_argument('--span', type=float, default=CALIBRATION_SPAN,
+                        help=f'Calibration sweep length in s (default: {CALIBRATION_SPAN:.0f})')
+    parser.add_argument('--transport', choices=['usb', 'hidraw'], default='usb',
+                        help='Device access: libusb (pyusb) or /dev/hidraw (default: usb)')
+    args = parser.parse_args()
+
+    from minikb_gui import HidrawDevice, MiniKBDevice
+    device = HidrawDevice() if args.transport == 'hidraw' else MiniKBDevice()
+    try:
+        device.connect()
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    catcher = ColorCatcher(device, load_calibration(args.calibration))
+    try:
+        latency = catcher.measure(args.samples)
+        print(f"LED write latency: {latency * 1000:.2f} ms median of {args.samples} "
+              f"({min(catcher.durations) * 1000:.2f}-{max(catcher.durations) * 1000:.2f} ms)")
+
+        if args.calibrate:
+            def ask(result):
+                return input(f"{result.phase:5.2f}s  color (Enter to skip): ").strip()
+
+            colors = catcher.sweep(ask, args.step, args.span)
+            save_calibration(catcher.calibration, args.calibration)
+            for color, phase in colors.items():
+                print(f"{color:>10}  {phase:.3f}s")
+            print(f"Saved to {args.calibration}")
+        elif args.color:
+            print(format_result(catcher.catch_color(args.color)))
+        elif args.phase is not None:
+            print(format_result(catcher.catch(args.phase)))
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        device.disconnect()
+
+
+if __name__ == "__main__":
+    main()
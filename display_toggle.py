@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+MiniKB Display Toggle - Switch the laptop screen on and off (KDE Plasma)
+Replaces the grep/awk/sed pipelines of toggle-display.sh: `kscreen-doctor -o`
+is run and parsed once, the new layout is computed in-process and applied
+with a single kscreen-doctor call.
+
+Layout: eDP-1 (left) -> third monitor (middle, if connected) -> HDMI-A-1 (right)
+    internal on   eDP-1 and the third monitor are disabled, HDMI-A-1 moves to 0,0
+    internal off  eDP-1 at 0,0, the third monitor next to it, HDMI-A-1 after both
+
+Usage:
+    python3 display_toggle.py
+    python3 display_toggle.py --dry-run --timing
+    python3 display_toggle.py --from-file kscreen-output.txt --dry-run
+
+Requires: kscreen-doctor (Plasma 5 or 6), notify-send for notifications
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+INTERNAL = 'eDP-1'
+EXTERNAL = 'HDMI-A-1'
+DEFAULT_WIDTH = 1920  # when an output reports no geometry
+
+Output = namedtuple('Output', 'id name enabled connected x y width height')
+
+_ANSI = re.compile(r'\x1b\[[0-9;]*m')
+_OUTPUT = re.compile(r'^Output:\s*(\d+)\s+(\S+)(.*?)(?=^Output:|\Z)', re.M | re.S)
+_GEOMETRY = re.compile(r'Geometry:\s*(-?\d+),(-?\d+)\s+(\d+)x(\d+)')
+
+
+def parse_outputs(text):
+    """Parse `kscreen-doctor -o` output into {name: Output}, in listed order
+
+    Handles the one-line-per-output format of Plasma 5 and the indented
+    multi-line format of Plasma 6, with or without color codes. Both list
+    enabled/disabled and connected/disconnected right after the name; later
+    fields such as 'HDR: enabled' are not the output state.
+    """
+    outputs = {}
+    for match in _OUTPUT.finditer(_ANSI.sub('', text)):
+        output_id, name, body = match.groups()
+        state = body.split()[:2]
+        geometry = _GEOMETRY.search(body)
+        x, y, width, height = map(int, geometry.groups()) if geometry else (0, 0, None, None)
+        outputs[name] = Output(int(output_id), name, 'enabled' in state, 'connected' in state,
+                               x, y, width, height)
+    return outputs
+
+
+def find_third(outputs, internal=INTERNAL, external=EXTERNAL):
+    """First connected output that is neither internal nor external, or None"""
+    for output in outputs.values():
+        if output.connected and output.name not in (internal, external):
+            return output
+    return None
+
+
+def plan_toggle(outputs, internal=INTERNAL, external=EXTERNAL):
+    """Compute the kscreen-doctor arguments for the next layout
+
+    Returns:
+        (list of kscreen-doctor arguments, notification message)
+
+    Raises:
+        ValueError: if the internal output is not listed
+    """
+    if internal not in outputs:
+        raise ValueError(f"Output {internal} not found")
+    third = find_third(outputs, internal, external)
+
+    if outputs[internal].enabled:
+        args = [f'output.{internal}.disable']
+        if third:
+            args.append(f'output.{third.name}.disable')
+        args.append(f'output.{external}.position.0,0')
+        message = "Internal + middle screen disabled" if third else "Internal screen disabled"
+        return args, message
+
+    x = outputs[internal].width or DEFAULT_WIDTH
+    args = [f'output.{internal}.enable', f'output.{internal}.position.0,0']
+    if third:
+        args += [f'output.{third.name}.enable', f'output.{third.name}.position.{x},0']
+        x += third.width or DEFAULT_WIDTH
+        message = f"3 screens: Internal | {third.name} | External"
+    else:
+        message = "Internal screen enabled (extended right)"
+    args.append(f'output.{external}.position.{x},0')
+    return args, message
+
+
+def notify(message, title='Display'):
+    """Show a desktop notification without waiting for it"""
+    try:
+        subprocess.Popen(['notify-send', title, message, '-i', 'video-display'],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+    except OSError:
+        pass
+
+
+def toggle(internal=INTERNAL, external=EXTERNAL, text=None, dry_run=False, notify_send=True):
+    """Toggle the internal screen
+
+    Args:
+        text: `kscreen-doctor -o` output to use instead of querying
+        dry_run: compute the layout but do not apply it
+
+    Returns:
+        (kscreen-doctor arguments, message, {phase: seconds})
+    """
+    timings = {}
+    start = time.perf_counter()
+    if text is None:
+        text = subprocess.run(['kscreen-doctor', '-o'], capture_output=True, text=True,
+                              check=True).stdout
+        timings['query'] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    args, message = plan_toggle(parse_outputs(text), internal, external)
+    timings['plan'] = time.perf_counter() - mark
+
+    if not dry_run:
+        mark = time.perf_counter()
+        subprocess.run(['kscreen-doctor'] + args, check=True)
+        timings['apply'] = time.perf_counter() - mark
+        if notify_send:
+            notify(message)
+    timings['total'] = time.perf_counter() - start
+    return args, message, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Toggle the laptop screen in a multi-monitor layout')
+    parser.add_argument('--internal', default=INTERNAL, help=f'Internal output (default: {INTERNAL})')
+    parser.add_argument('--external', default=EXTERNAL, help=f'External output (default: {EXTERNAL})')
+    parser.add_argument('--from-file', metavar='FILE', help='Use saved `kscreen-doctor -o` output')
+    parser.add_argument('--dry-run', action='store_true', help='Print the kscreen-doctor call only')
+    parser.add_argument('--no-notify', action='store_true', help='Do not show a notification')
+    parser.add_argument('--timing', action='store_true', help='Print per-phase latency')
+    args = parser.parse_args()
+
+    text = None
+    if args.from_file:
+        with open(args.from_file) as f:
+            text = f.read()
+
+    try:
+        command, message, timings = toggle(args.internal, args.external, text,
+                                           args.dry_run, not args.no_notify)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.dry_run:
+        print('kscreen-doctor ' + ' '.join(command))
+    print(message)
+    if args.timing:
+        print(' '.join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+MiniKB Event Bus - Live key events for any number of local subscribers
+minikb_filter.py publishes every event it forwards on a Unix socket; the GUI
+monitor, status bars, the notification blinker and scripts subscribe
+without touching the device.
+
+Usage:
+    python3 event_bus.py                       # print events
+    python3 event_bus.py --socket /tmp/minikb-events.sock
+
+Wire format (little endian), a stream of frames:
+    frame header  2 bytes   kind (u8), payload length (u8)
+    FRAME_HELLO   payload   b'MKBE', version (u8), queue size (u16)
+    FRAME_EVENT   payload   CLOCK_MONOTONIC timestamp in ns (u64), evdev type (u16),
+                            code (u16), value (i32), HID keycode (u8), modifier (u8)
+    FRAME_DROPPED payload   events dropped for this subscriber since its last frame (u32)
+Readers skip frame kinds they do not know.
+
+Backpressure: each subscriber has a bounded queue. publish() never waits;
+when a subscriber's queue is full its oldest event is dropped and counted,
+so a slow client cannot delay the filter's uinput forwarding.
+
+Access: the socket is 0o600 and belongs to the sudo caller when the filter
+runs under sudo; with a group it is 0o660 and members of the group subscribe.
+"""
+
+import argparse
+import asyncio
+import errno
+import grp
+import os
+import socket
+import stat
+import struct
+from collections import deque, namedtuple
+
+from keycodes import display_name, modifier_string
+from live_state import state_owner
+
+DEFAULT_SOCKET = '/run/minikb-events.sock'
+BUS_MAGIC = b'MKBE'
+BUS_VERSION = 1
+
+FRAME_HELLO = 0
+FRAME_EVENT = 1
+FRAME_DROPPED = 2
+
+QUEUE_SIZE = 256      # events per subscriber
+WRITE_BUFFER = 4096   # transport bytes before a subscriber counts as slow
+
+_FRAME = struct.Struct('<BB')
+_HELLO = struct.Struct('<4sBH')
+_EVENT = struct.Struct('<QHHiBB')
+_DROPPED = struct.Struct('<I')
+
+BusEvent = namedtuple('BusEvent', 'timestamp_ns type code value keycode modifier')
+
+
+def encode_event(timestamp_ns, type, code, value, keycode=0, modifier=0):
+    """One FRAME_EVENT frame"""
+    return _FRAME.pack(FRAME_EVENT, _EVENT.size) + _EVENT.pack(
+        timestamp_ns, type, code, value, keycode, modifier)
+
+
+class Subscriber:
+    """Per-connection queue and lag counters"""
+
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.task = asyncio.current_task()
+        self.queue = deque(maxlen=queue_size)
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.unreported = 0   # drops not yet announced with FRAME_DROPPED
+        self.max_queued = 0
+        self.pid = None
+        sock = writer.get_extra_info('socket')
+        if sock is not None and hasattr(socket, 'SO_PEERCRED'):
+            try:
+                self.pid = struct.unpack('3i', sock.getsockopt(
+                    socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))[0]
+            except OSError:
+                pass
+
+    def push(self, frame):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+            self.unreported += 1
+        self.queue.append(frame)
+        if len(self.queue) > self.max_queued:
+            self.max_queued = len(self.queue)
+        self.wakeup.set()
+
+    def stats(self):
+        return {'pid': self.pid, 'sent': self.sent, 'dropped': self.dropped,
+                'queued': len(self.queue), 'max_queued': self.max_queued}
+
+
+def group_id(group):
+    """gid of a group name or number
+
+    Raises:
+        ValueError: if there is no such group
+    """
+    if isinstance(group, int) or group.isdigit():
+        return int(group)
+    try:
+        return grp.getgrnam(group).gr_gid
+    except KeyError:
+        raise ValueError(f"Unknown group {group}") from None
+
+
+class EventBroadcaster:
+    """Unix socket server fanning events out to all subscribers (asyncio)"""
+
+    def __init__(self, path=DEFAULT_SOCKET, queue_size=QUEUE_SIZE, mode=None, group=None):
+        """
+        Args:
+            mode: permission bits of the socket (default: 0o660 with a group,
+                else 0o600)
+            group: group name or gid whose members may subscribe
+        """
+        self.path = path
+        self.queue_size = queue_size
+        self.mode = mode if mode is not None else 0o660 if group is not None else 0o600
+        self.gid = group_id(group) if group is not None else -1
+        self.subscribers = set()
+        self.published = 0
+        self._server = None
+
+    async def start(self):
+        """Listen on path, replacing a socket left by an earlier run
+
+        Raises:
+            OSError: if path exists and is not a socket, or cannot be bound
+        """
+        try:
+            st = os.lstat(self.path)
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(st.st_mode):
+                raise OSError(errno.EEXIST, f"{self.path} exists and is not a socket")
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, self.mode)
+        # A root filter started with sudo hands the socket to the caller
+        owner = state_owner()
+        uid = owner if owner != os.geteuid() else -1
+        if uid != -1 or self.gid != -1:
+            os.chown(self.path, uid, self.gid)
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Aborting ends each _serve loop; a graceful close would wait on slow readers
+        tasks = [subscriber.task for subscriber in self.subscribers]
+        for subscriber in list(self.subscribers):
+            subscriber.writer.transport.abort()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def publish(self, timestamp_ns, type, code, value, keycode=0, modifier=0):
+        """Queue one event for every subscriber; never blocks"""
+        self.published += 1
+        if not self.subscribers:
+            return
+        frame = encode_event(timestamp_ns, type, code, value, keycode, modifier)
+        for subscriber in self.subscribers:
+            subscriber.push(frame)
+
+    def stats(self):
+        """Lag counters, one dict per connected subscriber"""
+        return [subscriber.stats() for subscriber in self.subscribers]
+
+    @staticmethod
+    async def _wait_hangup(reader):
+        """Subscribers send nothing; EOF or an error on the read side means they left"""
+        try:
+            await reader.read()
+        except (ConnectionError, OSError):
+            pass
+
+    async def _serve(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        subscriber = Subscriber(writer, self.queue_size)
+        self.subscribers.add(subscriber)
+        hangup = asyncio.ensure_future(self._wait_hangup(reader))
+        try:
+            writer.write(_FRAME.pack(FRAME_HELLO, _HELLO.size)
+                         + _HELLO.pack(BUS_MAGIC, BUS_VERSION, self.queue_size))
+            while not hangup.done():
+                wakeup = asyncio.ensure_future(subscriber.wakeup.wait())
+                await asyncio.wait((wakeup, hangup), return_when=asyncio.FIRST_COMPLETED)
+                wakeup.cancel()
+                subscriber.wakeup.clear()
+
+                frames = []
+                if subscriber.unreported:
+                    frames.append(_FRAME.pack(FRAME_DROPPED, _DROPPED.size)
+                                  + _DROPPED.pack(subscriber.unreported))
+                    subscriber.unreported = 0
+                count = len(subscriber.queue)
+                frames.extend(subscriber.queue.popleft() for _ in range(count))
+                if frames:
+                    writer.write(b''.join(frames))
+                    subscriber.sent += count
+                    # Events published while this waits pile up in the bounded queue
+                    await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            hangup.cancel()
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+
+def subscribe(path=DEFAULT_SOCKET):
+    """Connected subscriber socket, for read_events()
+
+    Raises:
+        OSError: if the socket cannot be reached
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def read_events(path=DEFAULT_SOCKET, sock=None):
+    """Subscribe and yield BusEvent records, or ('dropped', count) tuples
+
+    Args:
+        path: bus socket
+        sock: socket from subscribe() to read instead; shutting it down from
+            another thread ends the iteration
+
+    Raises:
+        OSError: if the socket cannot be reached
+        ValueError: if the server speaks another protocol
+    """
+    with sock or subscribe(path) as sock:
+        buffer = b''
+        hello = False
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return
+            buffer += chunk
+            offset = 0
+            while offset + _FRAME.size <= len(buffer):
+                kind, length = _FRAME.unpack_from(buffer, offset)
+                end = offset + _FRAME.size + length
+                if end > len(buffer):
+                    break
+                payload = buffer[offset + _FRAME.size:end]
+                offset = end
+                if kind == FRAME_HELLO:
+                    magic, version, _ = _HELLO.unpack_from(payload)
+                    if magic != BUS_MAGIC or version != BUS_VERSION:
+                        raise ValueError(f"{path}: unsupported event bus {magic!r} v{version}")
+                    hello = True
+                elif not hello:
+                    raise ValueError(f"{path}: not a MiniKB event bus")
+                elif kind == FRAME_EVENT:
+                    yield BusEvent(*_EVENT.unpack_from(payload))
+                elif kind == FRAME_DROPPED:
+                    yield ('dropped', _DROPPED.unpack_from(payload)[0])
+            buffer = buffer[offset:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print live MiniKB events from the filter daemon')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f'Bus socket (default: {DEFAULT_SOCKET})')
+    args = parser.parse_args()
+
+    try:
+        for event in read_events(args.socket):
+            if isinstance(event, BusEvent):
+                if event.keycode:
+                    action = {0: 'RELEASE', 1: 'PRESS', 2: 'REPEAT'}.get(event.value, event.value)
+                    modifier = modifier_string(event.modifier)
+                    name = f"{modifier}+{display_name(event.keycode)}" if modifier else display_name(event.keycode)
+                    print(f"{event.timestamp_ns / 1e9:.6f} {action:8} {name}")
+                else:
+                    print(f"{event.timestamp_ns / 1e9:.6f} type={event.type} code={event.code} value={event.value}")
+            else:
+                print(f"-- {event[1]} event(s) dropped")
+    except OSError as e:
+        print(f"Cannot subscribe to {args.socket}: {e} (is minikb_filter.py running?)")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
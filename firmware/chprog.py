@@ -22,7 +22,7 @@
 #
 # Dependencies:
 # -------------
-# - pyusb
+# - pyusb (not needed with --simulate)
 #
 # Operating Instructions:
 # -----------------------
@@ -38,12 +38,28 @@
 # Then install the libusb-win32 driver.
 #
 # Connect the CH55x via USB to your PC. The CH55x must be in bootloader mode!
-# Run "python3 chprog.py firmware.bin".
+# Run "python3 chprog.py firmware.bin". Intel HEX (.hex/.ihx) and ELF images work
+# too; only populated address ranges are written, 0xFF ranges are left erased.
+#
+# Run "python3 chprog.py --verify-first firmware.bin" to skip erasing and writing
+# when the chip already holds the image; the chip is always read back to check.
+# Add --trust-cache to skip chips that this host flashed and verified with this
+# image before (remembered by unique ID in ~/.cache/chprog/flashed.json) without
+# reading them. Only use it when no other host or tool reflashes the boards.
+# --no-cache neither reads nor updates the cache.
+#
+# Run "python3 chprog.py --all firmware.bin" to flash every CH55x in boot mode at
+# once. Devices are named by USB bus/port path; a failing board does not stop the
+# others, and a summary lists the result of each device.
+#
+# Add --progress for a live progress line (bytes, KB/s, ETA) and --json FILE (or -)
+# for a machine-readable report with per-phase timings (detect, verify_first, erase,
+# write, verify, exit) of every device. With --json - all other output goes to
+# stderr, so stdout holds nothing but the report.
 
 
-import usb.core
-import usb.util
-import sys, struct
+import sys, os, re, mmap, time, struct, platform, argparse, hashlib, json
+import threading, contextlib, concurrent.futures
 
 
 # ===================================================================================
@@ -51,51 +67,494 @@ import sys, struct
 # ===================================================================================
 
 def _main():
-    if len(sys.argv) != 2:
+    parser = argparse.ArgumentParser(description='Programming tool for CH55x microcontrollers')
+    parser.add_argument('bin', nargs='?', help='firmware image (.bin, .hex/.ihx or .elf)')
+    parser.add_argument('--verify-first', action='store_true',
+                        help='skip erase and write if the chip already holds the image')
+    parser.add_argument('--trust-cache', action='store_true',
+                        help='with --verify-first, skip the verify pass for chips this host '
+                             'already flashed with the image')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='do not use or update the flashed image cache')
+    parser.add_argument('--simulate', metavar='CHIP[:VERSION][,...]',
+                        help='use simulated bootloaders instead of USB, e.g. CH552:2.31 '
+                             '(implies --no-cache)')
+    parser.add_argument('--all', action='store_true',
+                        help='flash every CH55x in boot mode concurrently')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='parallel workers for --all (default: one per device)')
+    parser.add_argument('--progress', action='store_true',
+                        help='show write and verify progress with rate and ETA')
+    parser.add_argument('--json', metavar='FILE',
+                        help='write a JSON report with per-phase timings to FILE (- for stdout)')
+    args = parser.parse_args()
+
+    if args.bin is None:
         sys.stderr.write('ERROR: No bin file selected!\n')
         sys.exit(1)
+    if args.simulate:
+        # Simulated chips report made-up unique IDs; keep them out of the cache
+        args.no_cache = True
 
+    try:
+        segments, imagehash = read_image(args.bin)
+    except Exception as ex:
+        sys.stderr.write('ERROR: ' + str(ex) + '!\n')
+        sys.exit(1)
+
+    # With --json -, stdout carries only the report; all other output goes to stderr
+    with contextlib.redirect_stdout(sys.stderr if args.json == '-' else sys.stdout):
+        if args.all:
+            status, results, elapsed = _flash_all(segments, imagehash, args)
+        else:
+            status, results, elapsed = _flash_one(segments, imagehash, args)
+    if args.json:
+        _report(args.json, args, segments, imagehash, results, elapsed)
+    sys.exit(status)
+
+def _flash_one(segments, imagehash, args):
+    # Returns (exit status, [_result() record], seconds)
+    isp = None
+    start = time.perf_counter()
     try:
         print('Connecting to device ...')
-        isp = Programmer()
-        isp.detect()
-        print('FOUND:', isp.chipname, 'with bootloader v' + isp.bootloader + '.')
-        print('Erasing chip ...')
-        isp.erase()
-        print('Flashing', sys.argv[1], 'to', isp.chipname, '...')
-        with open(sys.argv[1], 'rb') as f: data = f.read()
-        isp.flash_data(data)
-        print('SUCCESS:', len(data), 'bytes written.')
-        print('Verifying ...')
-        isp.verify_data(data)
-        print('SUCCESS:', len(data), 'bytes verified.')
-        isp.exit()
+        if args.simulate:
+            isp = Programmer(_simulator(args.simulate.split(',')[0]))
+        else:
+            isp = Programmer()
+        if args.progress:
+            isp.progress = _progressline
+        written = _flash(isp, segments, imagehash, args, print)
+        result = _result('sim0' if args.simulate else 'usb', isp, 'flashed' if written else 'current',
+                         time.perf_counter() - start)
     except Exception as ex:
         if str(ex) != '':
             sys.stderr.write('ERROR: ' + str(ex) + '!\n')
-        sys.exit(1)
+        result = _result('sim0' if args.simulate else 'usb', isp, 'failed',
+                         time.perf_counter() - start, str(ex))
+    if result['status'] == 'failed':
+        return 1, [result], result['seconds']
     print('DONE.')
-    sys.exit(0)
+    return 0, [result], result['seconds']
+
+def _simulator(spec):
+    from chsim import SimulatedBootloader
+    chip, _, version = spec.strip().upper().partition(':')
+    return SimulatedBootloader(chip, bootloader = version or '2.31')
+
+def _flash(isp, segments, imagehash, args, log):
+    # Detect, optionally verify first, erase, write, verify and exit one device.
+    # Returns True if the chip was written, False if it was already up to date.
+    size = sum(len(segment) for _, segment in segments)
+    isp.detect()
+    log('FOUND:', isp.chipname, 'with bootloader v' + isp.bootloader + '.')
+    cachekey = None if args.no_cache else _cache_key(isp)
+    uptodate = False
+    if args.verify_first:
+        # The cache only knows what this host flashed; a board reflashed
+        # elsewhere would be skipped, so it is consulted only on request
+        if args.trust_cache and cachekey is not None and _cache_get(cachekey) == imagehash:
+            log('Image already flashed to this chip (cached).')
+            uptodate = True
+        else:
+            log('Verifying ...')
+            try:
+                # Compare every byte, including 0xFF ranges, against the chip
+                isp.verify_data(image_bytes(segments))
+                log('Image already on', isp.chipname + '.')
+                uptodate = True
+            except Exception:
+                log('Image differs.')
+            # Keep this pass apart from the verify after writing
+            isp.timings['verify_first'] = isp.timings.pop('verify', 0.0)
+    if uptodate:
+        log('SKIPPED: erase and write.')
+    else:
+        log('Erasing chip ...')
+        isp.erase()
+        log('Flashing', args.bin, 'to', isp.chipname, '...')
+        isp.flash_segments(segments)
+        log('SUCCESS:', size, 'bytes written.')
+        log('Verifying ...')
+        isp.verify_segments(segments)
+        log('SUCCESS:', size, 'bytes verified.')
+    if cachekey is not None: _cache_put(cachekey, imagehash)
+    isp.exit()
+    return not uptodate
+
+# ===================================================================================
+# Progress and Reports
+# ===================================================================================
+
+def _progressline(progress):
+    # Programmer.progress callback for a single device: one updating line on stderr
+    eta = '--' if progress.eta is None else '%.1fs' % progress.eta
+    sys.stderr.write('\r  %-6s %3d%% %6d/%d bytes %7.1f KB/s (avg %.1f) ETA %-6s'
+                     % (progress.phase, progress.percent, progress.bytes_done, progress.bytes_total,
+                        progress.rate, progress.average, eta))
+    if progress.bytes_done >= progress.bytes_total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+def _result(path, isp, status, seconds, error = None):
+    # Machine-readable outcome of one device
+    return {
+        'path': path,
+        'status': status,
+        'seconds': round(seconds, 6),
+        'error': error,
+        'chip': isp.chipname if isp is not None and isp.chipversion else None,
+        'bootloader': isp.bootloader if isp is not None and isp.chipversion else None,
+        'uid': isp.chipuid if isp is not None else None,
+        'timings': {phase: round(t, 6) for phase, t in isp.timings.items()} if isp is not None else {},
+    }
+
+def _report(filename, args, segments, imagehash, results, elapsed):
+    report = {
+        'image': args.bin,
+        'sha256': imagehash,
+        'bytes': sum(len(segment) for _, segment in segments),
+        'segments': len(segments),
+        'seconds': round(elapsed, 6),
+        'devices': results,
+    }
+    text = json.dumps(report, indent=2) + '\n'
+    if filename == '-':
+        with _printlock:
+            sys.stdout.write(text)
+    else:
+        with open(filename, 'w') as f: f.write(text)
+
+# ===================================================================================
+# Parallel Flashing
+# ===================================================================================
+
+_printlock = threading.Lock()
+
+def find_devices():
+    # All CH55x in boot mode as (path, usb device); path is "bus-port.port..."
+    import usb.core
+    devices = []
+    for dev in usb.core.find(find_all = True, idVendor = CH_VID, idProduct = CH_PID):
+        ports = '.'.join(str(p) for p in (dev.port_numbers or ()))
+        devices.append((str(dev.bus) + '-' + (ports or str(dev.address)), dev))
+    return sorted(devices, key = lambda d: d[0])
+
+def _flash_all(segments, imagehash, args):
+    # Returns (exit status, _result() records in device order, seconds)
+    if args.simulate:
+        targets = [('sim' + str(i), spec) for i, spec in enumerate(args.simulate.split(','))]
+    else:
+        targets = find_devices()
+    if not targets:
+        sys.stderr.write('ERROR: No CH55x device found!\n')
+        return 1, [], 0.0
+    print('Found', len(targets), 'device(s):', ', '.join(path for path, _ in targets))
+
+    size = sum(len(segment) for _, segment in segments)
+    results = {}
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers = args.jobs or len(targets)) as pool:
+        futures = {pool.submit(_flash_target, path, target, segments, imagehash, args): path
+                   for path, target in targets}
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]] = future.result()
+    elapsed = time.perf_counter() - start
+
+    print('RESULTS:')
+    failed = 0
+    written = 0
+    for path, _ in targets:
+        result = results[path]
+        if result['status'] == 'failed':
+            failed += 1
+        elif result['status'] == 'flashed':
+            written += 1
+        print('  %-12s %-8s %6.2fs %s' % (path, result['status'].upper(), result['seconds'],
+                                          result['error'] or ''))
+    rate = written * size / 1024 / elapsed if elapsed > 0 else 0
+    print('%d flashed, %d up to date, %d failed in %.2fs (%.1f KB/s total).'
+          % (written, len(targets) - written - failed, failed, elapsed, rate))
+    return 1 if failed else 0, [results[path] for path, _ in targets], elapsed
+
+def _flash_target(path, target, segments, imagehash, args):
+    # Worker: flash one device, never raises; returns its _result() record
+    def log(*items):
+        with _printlock:
+            print('[' + path + ']', *items)
+
+    def progress(p):
+        # One log line per update; lines of concurrent devices would clash with \r
+        eta = '--' if p.eta is None else '%.1fs' % p.eta
+        log('%s %3d%% %.1f KB/s ETA %s' % (p.phase, p.percent, p.rate, eta))
+
+    isp = None
+    start = time.perf_counter()
+    try:
+        if args.simulate:
+            isp = Programmer(_simulator(target))
+        else:
+            isp = Programmer(device = target)
+        if args.progress:
+            isp.progress = progress
+            isp.progress_interval = 1.0
+        written = _flash(isp, segments, imagehash, args, log)
+        return _result(path, isp, 'flashed' if written else 'current', time.perf_counter() - start)
+    except Exception as ex:
+        log('ERROR:', str(ex) or 'device setup failed')
+        return _result(path, isp, 'failed', time.perf_counter() - start, str(ex))
+
+# ===================================================================================
+# Image Loading
+# ===================================================================================
+
+# Images are lists of (address, bytes) segments holding only populated ranges.
+# Runs of 0xFF are left out: erased flash already reads 0xFF, so only the
+# populated bytes need to go over USB. Files are read through mmap.
+
+GAP_SIZE = 64   # shorter 0xFF runs stay inside a segment (cheaper than a new packet)
+
+HEX_EXTENSIONS = ('.hex', '.ihx')
+BIN_EXTENSIONS = ('.bin',)
+
+def read_image(filename):
+    # Returns (segments, sha256 of the file). ELF is detected by its magic, Intel
+    # HEX by extension; a leading ':' only counts for unknown extensions, since
+    # raw binaries may start with 0x3A.
+    extension = os.path.splitext(filename)[1].lower()
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return [], hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            digest = hashlib.sha256(mm).hexdigest()
+            if mm[:4] == b'\x7fELF':
+                segments = _normalize(_elfsegments(mm))
+            elif extension in HEX_EXTENSIONS or (extension not in BIN_EXTENSIONS and mm[:1] == b':'):
+                segments = _normalize(_hexsegments(mm))
+            else:
+                segments = split_image(mm, 0)
+    return segments, digest
+
+def image_bytes(segments):
+    # Dense image from address 0 to the end of the last segment, gaps as 0xFF
+    if not segments:
+        return b''
+    end = max(addr + len(data) for addr, data in segments)
+    image = bytearray(b'\xff' * end)
+    for addr, data in segments:
+        image[addr:addr + len(data)] = data
+    return bytes(image)
+
+def split_image(data, base = 0, gap = GAP_SIZE):
+    # Split data (starting at address base) into segments without long 0xFF runs;
+    # segment bounds are kept 8-byte aligned relative to base
+    ranges = []
+    for m in re.finditer(rb'[^\xff]+', data):
+        start = m.start() & ~7
+        end = min((m.end() + 7) & ~7, len(data))
+        if ranges and start - ranges[-1][1] < gap:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return [(base + start, bytes(data[start:end])) for start, end in ranges]
+
+def _normalize(segments, gap = GAP_SIZE):
+    # Align segments to 8 bytes, merge close or overlapping ones (0xFF padding is
+    # ANDed away like on flash) and drop long 0xFF runs
+    merged = []
+    for addr, data in sorted(segments):
+        start = addr & ~7
+        data = b'\xff' * (addr - start) + bytes(data)
+        data += b'\xff' * (-len(data) % 8)
+        if merged and start - (merged[-1][0] + len(merged[-1][1])) < gap:
+            prevaddr, prev = merged[-1]
+            offset = start - prevaddr
+            if offset + len(data) > len(prev):
+                prev.extend(b'\xff' * (offset + len(data) - len(prev)))
+            cells = int.from_bytes(prev[offset:offset + len(data)], 'little') & int.from_bytes(data, 'little')
+            prev[offset:offset + len(data)] = cells.to_bytes(len(data), 'little')
+        else:
+            merged.append((start, bytearray(data)))
+    segments = []
+    for addr, data in merged:
+        segments.extend(split_image(data, addr, gap))
+    return segments
+
+def _hexsegments(mm):
+    # Intel HEX records: data (00), EOF (01), extended segment (02) and linear (04) address
+    segments = []
+    base = 0
+    for line in iter(mm.readline, b''):
+        line = line.strip()
+        if not line:
+            continue
+        if line[:1] != b':':
+            raise Exception('Invalid Intel HEX record')
+        record = bytes.fromhex(line[1:].decode('ascii'))
+        if len(record) < 5 or len(record) != record[0] + 5 or sum(record) & 0xff:
+            raise Exception('Invalid Intel HEX record')
+        length, addr, rectype = record[0], (record[1] << 8) | record[2], record[3]
+        if rectype == 0x00:
+            segments.append((base + addr, record[4:4 + length]))
+        elif rectype == 0x01:
+            break
+        elif rectype == 0x02:
+            base = int.from_bytes(record[4:6], 'big') << 4
+        elif rectype == 0x04:
+            base = int.from_bytes(record[4:6], 'big') << 16
+    return segments
+
+def _elfsegments(mm):
+    # PT_LOAD program headers with file contents, placed at their physical address
+    is64 = mm[4] == 2
+    endian = '<' if mm[5] == 1 else '>'
+    if is64:
+        phoff, = struct.unpack_from(endian + 'Q', mm, 0x20)
+        phentsize, phnum = struct.unpack_from(endian + 'HH', mm, 0x36)
+        phdr = endian + 'IIQQQQQQ'
+    else:
+        phoff, = struct.unpack_from(endian + 'I', mm, 0x1c)
+        phentsize, phnum = struct.unpack_from(endian + 'HH', mm, 0x2a)
+        phdr = endian + 'IIIIIIII'
+    segments = []
+    for i in range(phnum):
+        fields = struct.unpack_from(phdr, mm, phoff + i * phentsize)
+        if is64:
+            ptype, _, offset, _, paddr, filesz, _, _ = fields
+        else:
+            ptype, offset, _, paddr, filesz, _, _, _ = fields
+        if ptype == 1 and filesz > 0:
+            segments.append((paddr, mm[offset:offset + filesz]))
+    return segments
+
+# ===================================================================================
+# Flashed Image Cache
+# ===================================================================================
+
+# Maps chip unique ID -> SHA-256 of the image last flashed and verified on it.
+# Only bootloader v2 reports a unique ID; v1 chips are never cached.
+
+CACHE_FILE = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                          'chprog', 'flashed.json')
+
+_cachelock = threading.Lock()
+
+def _cache_key(isp):
+    if isp.chipuid is None:
+        return None
+    return isp.chipname + ':' + isp.chipuid
+
+def _cache_load():
+    try:
+        with open(CACHE_FILE, 'r') as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _cache_get(key):
+    return _cache_load().get(key)
+
+def _cache_put(key, imagehash):
+    # Workers of --all update the cache concurrently
+    with _cachelock:
+        cache = _cache_load()
+        cache[key] = imagehash
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+            tmpfile = CACHE_FILE + '.tmp'
+            with open(tmpfile, 'w') as f: json.dump(cache, f, indent=2)
+            os.replace(tmpfile, CACHE_FILE)
+        except OSError:
+            pass
+
+# ===================================================================================
+# Transfer Progress
+# ===================================================================================
+
+class Progress:
+    # Passed to Programmer.progress callbacks during write and verify. Rates are in
+    # KB/s: rate since the previous callback and average since the phase started.
+    def __init__(self, phase, total, interval):
+        self.phase = phase
+        self.bytes_total = total
+        self.bytes_done = 0
+        self.packets = 0
+        self.elapsed = 0.0
+        self.rate = 0.0
+        self.average = 0.0
+        self.eta = None
+        self.__interval = interval
+        self.__start = self.__last = time.perf_counter()
+        self.__lastbytes = 0
+
+    @property
+    def percent(self):
+        return 100 * self.bytes_done // self.bytes_total if self.bytes_total else 100
+
+    def _advance(self, nbytes, callback):
+        # Count one packet; call back at most every interval and always at the end
+        self.bytes_done += nbytes
+        self.packets += 1
+        now = time.perf_counter()
+        if now - self.__last >= self.__interval or self.bytes_done >= self.bytes_total:
+            self.elapsed = now - self.__start
+            if now > self.__last:
+                self.rate = (self.bytes_done - self.__lastbytes) / 1024 / (now - self.__last)
+            if self.elapsed > 0:
+                self.average = self.bytes_done / 1024 / self.elapsed
+            if self.average > 0:
+                self.eta = (self.bytes_total - self.bytes_done) / 1024 / self.average
+            self.__last = now
+            self.__lastbytes = self.bytes_done
+            callback(self)
 
 # ===================================================================================
 # Programmer Class
 # ===================================================================================
 
 class Programmer:
-    def __init__(self):
-        dev = usb.core.find(idVendor = CH_VID, idProduct = CH_PID)
+    def __init__(self, backend = None, device = None):
+        # backend: object with write()/read() standing in for both endpoints,
+        # e.g. chsim.SimulatedBootloader. device: pyusb device to program,
+        # see find_devices(). Default is the first USB device found.
+        if backend is not None:
+            self.epout = backend
+            self.epin = backend
+        else:
+            self.__openusb(device)
+
+        self.chipid = 0
+        self.chipuid = None
+        self.chipname = 'CH000'
+        self.bootloader = '0.0'
+        self.chipversion = 0
+        self.device_erase_size = 8
+        self.device_flash_size = 16
+        self.code_flash_size = 14336
+
+        # progress: callable taking a Progress, called during write and verify.
+        # timings: seconds spent per phase (detect, erase, write, verify, exit).
+        self.progress = None
+        self.progress_interval = 0.1
+        self.timings = {}
+
+
+    def __openusb(self, dev):
+        # pyusb is imported here so that simulated backends work without it
+        import usb.core
+        import usb.util
+        if dev is None:
+            dev = usb.core.find(idVendor = CH_VID, idProduct = CH_PID)
+        # Errors are raised, not printed: with --all the caller logs them
+        # under _printlock together with the device path
         if dev is None:
-            sys.stderr.write('ERROR: No CH55x device found!\n')
-            print('Check if device is in boot mode or check driver.')
-            raise Exception()
+            raise Exception('No CH55x device found (check if device is in boot mode or check driver)')
 
         try:
             dev.set_configuration()
         except usb.core.USBError as ex:
-            sys.stderr.write('ERROR: Could not access USB Device!\n')
             if str(ex).startswith('[Errno 13]') and platform.system() == 'Linux':
-                print('Configure udev or execute as root (sudo).')
-            raise Exception()
+                raise Exception('Could not access USB Device (configure udev or execute as root (sudo))')
+            raise Exception('Could not access USB Device: ' + str(ex))
 
         cfg = dev.get_active_configuration()
         intf = cfg[(0,0)]
@@ -105,25 +564,28 @@ class Programmer:
         assert self.epout is not None
         assert self.epin is not None
 
-        self.chipid = 0
-        self.chipname = 'CH000'
-        self.bootloader = '0.0'
-        self.chipversion = 0
-        self.device_erase_size = 8
-        self.device_flash_size = 16
-        self.code_flash_size = 14336
+
+    @contextlib.contextmanager
+    def __phase(self, name):
+        # Adds the time spent in the block to self.timings[name], even on failure
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
 
 
     def detect(self):
-        identanswer = self.__sendcmd(DETECT_CHIP_CMD_V2)
-        if len(identanswer) == 0:
-            raise Exception('Chip identification failed')
-        if len(identanswer) == 2:
-            self.chipversion = 1
-            self.__identchipv1()
-        else:
-            self.chipversion = 2
-            self.__identchipv2()
+        with self.__phase('detect'):
+            identanswer = self.__sendcmd(DETECT_CHIP_CMD_V2)
+            if len(identanswer) == 0:
+                raise Exception('Chip identification failed')
+            if len(identanswer) == 2:
+                self.chipversion = 1
+                self.__identchipv1()
+            else:
+                self.chipversion = 2
+                self.__identchipv2()
 
         self.chipname = 'CH5' + str(self.chipid - 30)
         if self.chipid == 0x51 or self.chipid == 0x53:
@@ -139,52 +601,66 @@ class Programmer:
 
 
     def erase(self):
-        if self.chipversion == 1:
-            self.__erasev1()
-        else:
-            self.__erasev2()
+        with self.__phase('erase'):
+            if self.chipversion == 1:
+                self.__erasev1()
+            else:
+                self.__erasev2()
 
 
     def flash_bin(self, filename):
-        with open(filename, 'rb') as f: data = f.read()
-        self.flash_data(data)
-        return len(data)
+        segments, _ = read_image(filename)
+        return self.flash_segments(segments)
 
     def verify_bin(self, filename):
-        with open(filename, 'rb') as f: data = f.read()
-        self.verify_data(data)
-        return len(data)
+        segments, _ = read_image(filename)
+        return self.verify_segments(segments)
 
     def flash_data(self, data):
+        # 0xFF ranges are skipped, writing them would not change erased flash
         if len(data) > self.code_flash_size:
             raise Exception('Not enough memory')
-        if self.chipversion == 1:
-            self.__writev1(data, MODE_WRITE_V1)
-        else:
-            self.__writev2(data, MODE_WRITE_V2)
+        self.flash_segments(split_image(data, 0))
 
     def verify_data(self, data):
         if len(data) > self.code_flash_size:
             raise Exception('Not enough memory')
-        if self.chipversion == 1:
-            self.__writev1(data, MODE_VERIFY_V1)
-        else:
-            self.__writev2(data, MODE_VERIFY_V2)
+        self.verify_segments([(0, data)])
+
+    def flash_segments(self, segments):
+        return self.__program(segments, MODE_WRITE_V1, MODE_WRITE_V2, 'write')
+
+    def verify_segments(self, segments):
+        # Only the given ranges are compared
+        return self.__program(segments, MODE_VERIFY_V1, MODE_VERIFY_V2, 'verify')
+
+    def __program(self, segments, modev1, modev2, phase):
+        if any(addr + len(data) > self.code_flash_size for addr, data in segments):
+            raise Exception('Not enough memory')
+        total = sum(len(data) for _, data in segments)
+        progress = None
+        if self.progress is not None:
+            progress = Progress(phase, total, self.progress_interval)
+        with self.__phase(phase):
+            for addr, data in segments:
+                if self.chipversion == 1:
+                    self.__writev1(data, modev1, addr, progress)
+                else:
+                    self.__writev2(data, modev2, addr, progress)
+        return total
 
 
     def exit(self):
-        if self.chipversion == 1:
-            self.__exitv1()
-        else:
-            self.__exitv2()
+        with self.__phase('exit'):
+            if self.chipversion == 1:
+                self.__exitv1()
+            else:
+                self.__exitv2()
 
 
     def __sendcmd(self, cmd):
         self.epout.write(cmd)
-        b = self.epin.read(64)
-        if len(b) == 2:
-            return struct.unpack('<H', b)[0]
-        return b
+        return self.epin.read(64)
 
 
     def __identchipv1(self):
@@ -214,6 +690,7 @@ class Programmer:
             outbuffer[0] = 0xa3
             outbuffer[1] = 0x30
             outbuffer[2] = 0x00
+            self.chipuid = bytes(cfganswer[22:26]).hex()
             checksum = cfganswer[22]
             checksum += cfganswer[23]
             checksum += cfganswer[24]
@@ -228,7 +705,7 @@ class Programmer:
     def __erasev1(self):
         self.__sendcmd((0xa6, 0x04, 0x00, 0x00, 0x00, 0x00))
         for x in range(self.device_flash_size):
-            buffer = __sendcmd((0xa9, 0x02, 0x00, x * 4))
+            buffer = self.__sendcmd((0xa9, 0x02, 0x00, x * 4))
             if buffer[0] != 0x00:
                 raise Exception('Erase failed')
 
@@ -245,65 +722,66 @@ class Programmer:
         self.epout.write((0xa2, 0x01, 0x00, 0x01))
 
 
-    def __writev1(self, data, mode):
-        rest = len(data)
-        curr_addr = 0
-        pkt_length = 0
+    def __packetsv1(self, data, mode, base = 0):
+        # Yields the same 64-byte buffer filled for each consecutive packet
+        view = memoryview(data)
         outbuffer = bytearray(64)
         outbuffer[0] = mode
-        while curr_addr < len(data):
-            if rest >= 0x3c:
-                pkt_length = 0x3c
-            else:
-                pkt_length = rest
+        for curr_addr in range(0, len(data), 0x3c):
+            pkt_length = min(len(data) - curr_addr, 0x3c)
             outbuffer[1] = pkt_length
-            outbuffer[2] = (curr_addr & 0xff)
-            outbuffer[3] = ((curr_addr >> 8) & 0xff)
-            for x in range(pkt_length):
-                outbuffer[x + 4] = data[curr_addr + x]
+            outbuffer[2] = ((base + curr_addr) & 0xff)
+            outbuffer[3] = (((base + curr_addr) >> 8) & 0xff)
+            outbuffer[4:4 + pkt_length] = view[curr_addr:curr_addr + pkt_length]
+            yield outbuffer
+
+    def __packetsv2(self, data, mode, base = 0):
+        # Scramble the whole image once: every 8th byte is XORed with the chip ID.
+        # Packets carry 56 data bytes after an 8 byte header, so data offset
+        # n % 8 == 7 is always packet offset x % 8 == 7.
+        xortable = bytes(x ^ self.chipid for x in range(256))
+        image = bytearray(data)
+        image[7::8] = image[7::8].translate(xortable)
+        view = memoryview(image)
+        outbuffer = bytearray(64)
+        outbuffer[0] = mode
+        outbuffer[2] = 0x00
+        outbuffer[5] = 0x00
+        outbuffer[6] = 0x00
+        for curr_addr in range(0, len(data), 0x38):
+            rest = len(data) - curr_addr
+            pkt_length = min(rest, 0x38)
+            outbuffer[1] = (pkt_length+5)
+            outbuffer[3] = ((base + curr_addr) & 0xff)
+            outbuffer[4] = (((base + curr_addr) >> 8) & 0xff)
+            outbuffer[7] = (rest & 0xff) ^ self.chipid
+            outbuffer[8:8 + pkt_length] = view[curr_addr:curr_addr + pkt_length]
+            yield outbuffer
+
+    def __writev1(self, data, mode, base = 0, progress = None):
+        for outbuffer in self.__packetsv1(data, mode, base):
             buffer = self.__sendcmd(outbuffer)
-            curr_addr += pkt_length
-            rest -= pkt_length
             if buffer is not None:
                 if buffer[0] != 0x00:
                     if mode == MODE_WRITE_V1:
                         raise Exception('Write failed')
                     elif mode == MODE_VERIFY_V1:
                         raise Exception('Verify failed')
+            if progress is not None:
+                progress._advance(outbuffer[1], self.progress)
         return len(data)
 
-    def __writev2(self, data, mode):
-        rest = len(data)
-        curr_addr = 0
-        pkt_length = 0
-        outbuffer = bytearray(64)
-        outbuffer[0] = mode
-        outbuffer[2] = 0x00
-        outbuffer[5] = 0x00
-        outbuffer[6] = 0x00
-        while curr_addr < len(data):
-            if rest >= 0x38:
-                pkt_length = 0x38
-            else:
-                pkt_length = rest
-            outbuffer[1] = (pkt_length+5)
-            outbuffer[3] = (curr_addr & 0xff)
-            outbuffer[4] = ((curr_addr >> 8) & 0xff)
-            outbuffer[7] = rest & 0xff
-            for x in range(pkt_length):
-                outbuffer[x + 8] = data[curr_addr + x]
-            for x in range(pkt_length + 8):
-                if x % 8 == 7:
-                    outbuffer[x] ^= self.chipid
+    def __writev2(self, data, mode, base = 0, progress = None):
+        for outbuffer in self.__packetsv2(data, mode, base):
             buffer = self.__sendcmd(outbuffer)
-            curr_addr += pkt_length
-            rest -= pkt_length
             if buffer is not None:
                 if buffer[4] != 0x00 and buffer[4] != 0xfe and buffer[4] != 0xf5:
                     if mode == MODE_WRITE_V2:
                         raise Exception('Write failed')
                     elif mode == MODE_VERIFY_V2:
                         raise Exception('Verify failed')
+            if progress is not None:
+                progress._advance(outbuffer[1] - 5, self.progress)
 
 
 # ===================================================================================
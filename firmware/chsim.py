@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# ===================================================================================
+# Project:   chsim - Simulated CH55x Bootloader
+# Year:      2026
+# License:   MIT License
+# ===================================================================================
+#
+# Description:
+# ------------
+# Software model of the CH55x USB bootloader (versions 1.x and 2.xx) as seen by
+# chprog. It stands in for both USB endpoints of the device, so chprog's
+# Programmer can detect, erase, write, verify and exit without hardware:
+#
+#   from chprog import Programmer
+#   from chsim import SimulatedBootloader
+#
+#   sim = SimulatedBootloader('CH552', bootloader='2.31', latency=0.001)
+#   isp = Programmer(sim)
+#   isp.detect(); isp.erase(); isp.flash_data(data); isp.verify_data(data)
+#   assert sim.image(len(data)) == data
+#
+# Flash sizes follow the chips' code flash limits. Writes can only clear bits, like
+# real flash, so writing without erasing first fails verification. The optional
+# latency is charged per USB transfer (OUT and IN).
+
+
+import time
+
+
+# ===================================================================================
+# Chip Table
+# ===================================================================================
+
+# chip name -> (chip id, code flash size, device flash size in KB)
+CHIPS = {
+    'CH551': (0x51, 10240, 16),
+    'CH552': (0x52, 14336, 16),
+    'CH553': (0x53, 10240, 16),
+    'CH554': (0x54, 14336, 16),
+    'CH558': (0x58, 32768, 64),
+    'CH559': (0x59, 61440, 64),
+}
+
+STATUS_OK    = 0x00
+STATUS_ERROR = 0x01
+
+
+# ===================================================================================
+# Simulated Bootloader Class
+# ===================================================================================
+
+class SimulatedBootloader:
+    def __init__(self, chip = 'CH552', bootloader = '2.31', uid = b'\x12\x34\x56\x78', latency = 0.0):
+        if chip not in CHIPS:
+            raise ValueError('Unknown chip ' + chip)
+        self.chipname = chip
+        self.chipid, self.code_flash_size, self.device_flash_size = CHIPS[chip]
+        self.bootloader = bootloader
+        self.version = int(bootloader.split('.')[0])
+        self.uid = bytes(uid)
+        self.latency = latency
+        self.flash = bytearray(b'\xff' * self.code_flash_size)
+        self.key = None
+        self.running = False
+        self.transfers = 0
+        self.__response = None
+
+
+    def image(self, length = None):
+        # Current flash content, up to length bytes
+        return bytes(self.flash[:self.code_flash_size if length is None else length])
+
+
+    # USB endpoint interface used by chprog --------------------------------------
+
+    def write(self, data, timeout = None):
+        self.__transfer()
+        if self.running:
+            raise IOError('Device left bootloader')
+        data = bytes(data)
+        if self.version == 1:
+            self.__response = self.__handlev1(data)
+        else:
+            self.__response = self.__handlev2(data)
+        return len(data)
+
+    def read(self, size, timeout = None):
+        self.__transfer()
+        if self.__response is None:
+            raise TimeoutError('No response pending')
+        response, self.__response = self.__response, None
+        return response[:size]
+
+    def __transfer(self):
+        self.transfers += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+    # Bootloader v1 ----------------------------------------------------------------
+
+    def __handlev1(self, data):
+        cmd = data[0]
+        if cmd == 0xa1:
+            # v2 detect command: v1 bootloaders answer with two bytes
+            return bytes((0x00, 0x00))
+        if cmd == 0xa2:
+            return bytes((self.chipid, 0x11))
+        if cmd == 0xbb:
+            major, minor = self.bootloader.split('.')
+            return bytes(((int(major) << 4) | (int(minor[0]) & 0xf), 0x00))
+        if cmd == 0xa6:
+            return bytes((STATUS_OK, 0x00))
+        if cmd == 0xa9:
+            # Erase the 1 KB block at address data[3] << 8; blocks above the
+            # code flash hold the bootloader and are left alone
+            start = data[3] << 8
+            if start >= self.device_flash_size * 1024:
+                return bytes((STATUS_ERROR, 0x00))
+            self.flash[start:start + 1024] = b'\xff' * len(self.flash[start:start + 1024])
+            return bytes((STATUS_OK, 0x00))
+        if cmd == 0xa8 or cmd == 0xa7:
+            length = data[1]
+            addr = data[2] | (data[3] << 8)
+            payload = data[4:4 + length]
+            return bytes((self.__program(addr, payload, cmd == 0xa8), 0x00))
+        if cmd == 0xa5:
+            self.running = True
+            return None
+        return bytes((STATUS_ERROR, 0x00))
+
+
+    # Bootloader v2 ----------------------------------------------------------------
+
+    def __handlev2(self, data):
+        cmd = data[0]
+        if cmd == 0xa1:
+            return bytes((0xa1, 0x00, 0x02, 0x00, self.chipid, 0x11))
+        if cmd == 0xa7:
+            answer = bytearray(30)
+            answer[0] = 0xa7
+            answer[2] = 0x1a
+            answer[4] = data[3]
+            digits = self.bootloader.replace('.', '')
+            answer[19] = int(digits[0])
+            answer[20] = int(digits[1])
+            answer[21] = int(digits[2])
+            answer[22:22 + len(self.uid[:4])] = self.uid[:4]
+            return bytes(answer)
+        if cmd == 0xa3:
+            # Key exchange: chprog sends the UID checksum, the data key is the chip ID
+            if any(b != (sum(self.uid[:4]) & 0xff) for b in data[3:3 + data[1]]):
+                return self.__statusv2(cmd, STATUS_ERROR)
+            self.key = self.chipid
+            self.__xortable = bytes(x ^ self.key for x in range(256))
+            return self.__statusv2(cmd, STATUS_OK)
+        if cmd == 0xa4:
+            self.flash[:] = b'\xff' * self.code_flash_size
+            return self.__statusv2(cmd, STATUS_OK)
+        if cmd == 0xa5 or cmd == 0xa6:
+            if self.key is None:
+                return self.__statusv2(cmd, STATUS_ERROR)
+            length = data[1] - 5
+            addr = data[3] | (data[4] << 8)
+            packet = bytearray(data[:8 + length])
+            packet[7::8] = packet[7::8].translate(self.__xortable)
+            return self.__statusv2(cmd, self.__program(addr, bytes(packet[8:]), cmd == 0xa5))
+        if cmd == 0xa2:
+            self.running = True
+            return None
+        return self.__statusv2(cmd, STATUS_ERROR)
+
+    def __statusv2(self, cmd, status):
+        return bytes((cmd, 0x00, 0x02, 0x00, status, 0x00))
+
+
+    # Flash model ------------------------------------------------------------------
+
+    def __program(self, addr, payload, write):
+        end = addr + len(payload)
+        if end > self.code_flash_size:
+            return STATUS_ERROR
+        if write:
+            # Flash cells can only go from 1 to 0 without an erase
+            cells = int.from_bytes(self.flash[addr:end], 'little') & int.from_bytes(payload, 'little')
+            self.flash[addr:end] = cells.to_bytes(len(payload), 'little')
+            return STATUS_OK
+        return STATUS_OK if self.flash[addr:end] == payload else STATUS_ERROR
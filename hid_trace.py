@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+MiniKB HID Trace - Record and replay raw interrupt-IN reports
+Traces make input reproducible: a recording from a misbehaving encoder can be
+replayed through InputMonitor._process_input at the original pace, faster,
+or as fast as the decoder runs.
+
+Usage:
+    python3 hid_trace.py record encoder.mkt
+    python3 hid_trace.py info encoder.mkt
+    python3 hid_trace.py replay encoder.mkt
+    python3 hid_trace.py replay encoder.mkt --speed 10
+    python3 hid_trace.py replay encoder.mkt --max --quiet
+
+File format (little endian, optionally gzip compressed):
+    header  8 bytes   b'MKBT', version (u8), 3 reserved bytes
+    record 10 bytes   monotonic timestamp in ns (u64), endpoint (u8), length (u8)
+           + length   report bytes
+
+TraceSink keeps a continuous debug trace of USB traffic (IN reports and OUT
+packets) in rotating files, written by a background thread.
+"""
+
+import argparse
+import gzip
+import io
+import os
+import queue
+import struct
+import threading
+import time
+
+TRACE_MAGIC = b'MKBT'
+TRACE_VERSION = 1
+
+_HEADER = struct.Struct('<4sB3x')
+_RECORD = struct.Struct('<QBB')
+
+# Buffered writes; a trace is flushed on close
+WRITE_BUFFER = 64 * 1024
+
+
+class TraceWriter:
+    """Appends (timestamp, endpoint, report) records to a trace file"""
+
+    def __init__(self, path, compress=False):
+        self.path = path
+        self.count = 0
+        if compress:
+            self._file = io.BufferedWriter(gzip.GzipFile(path, 'wb', compresslevel=6), WRITE_BUFFER)
+        else:
+            self._file = open(path, 'wb', buffering=WRITE_BUFFER)
+        self._file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+        self.size = _HEADER.size
+
+    def write(self, endpoint, data, timestamp_ns=None):
+        """Record one report; timestamp defaults to time.monotonic_ns()"""
+        if len(data) > 255:
+            raise ValueError(f"Report too long for trace: {len(data)} bytes")
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        self._file.write(_RECORD.pack(timestamp_ns, endpoint, len(data)))
+        self._file.write(data)
+        self.count += 1
+        self.size += _RECORD.size + len(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_trace(path):
+    """Yield (timestamp_ns, endpoint, report bytes) from a trace file"""
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    with (gzip.open(path, 'rb') if compressed else open(path, 'rb')) as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path}: not a MiniKB trace")
+        magic, version = _HEADER.unpack(header)
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"{path}: not a MiniKB trace")
+        if version != TRACE_VERSION:
+            raise ValueError(f"{path}: unsupported trace version {version}")
+
+        data = f.read()
+
+    offset = 0
+    end = len(data)
+    while offset < end:
+        if offset + _RECORD.size > end:
+            raise ValueError(f"{path}: truncated record at byte {offset + _HEADER.size}")
+        timestamp, endpoint, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > end:
+            raise ValueError(f"{path}: truncated record at byte {offset + _HEADER.size}")
+        yield timestamp, endpoint, data[offset:offset + length]
+        offset += length
+
+
+class TraceSink:
+    """Rotating trace of USB traffic, written from a background thread.
+
+    record() only enqueues, so the USB and UI threads never wait on the disk.
+    With sample=N only every Nth record is kept; when the writer falls more
+    than max_pending records behind, new records are dropped and counted.
+    A file is rotated after max_bytes of trace data (before compression):
+    it is renamed to path.1 .. path.<backups>, like
+    logging.handlers.RotatingFileHandler.
+    """
+
+    def __init__(self, path, max_bytes=8 * 1024 * 1024, backups=3, sample=1,
+                 compress=False, max_pending=10000):
+        if compress and not path.endswith('.gz'):
+            path += '.gz'
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample = max(1, sample)
+        self.compress = compress
+        self.seen = 0
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._writer = None
+        self._thread = threading.Thread(target=self._run, name='trace-sink', daemon=True)
+        self._thread.start()
+
+    def record(self, endpoint, data, timestamp_ns=None):
+        """Queue one report or packet; cheap enough for every transfer"""
+        self.seen += 1
+        if self.sample > 1 and self.seen % self.sample:
+            return
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        try:
+            self._queue.put_nowait((timestamp_ns, endpoint, bytes(data)))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write what is queued and close the current file"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                item = False
+            if item is None:
+                break
+            if item:
+                if self._writer is None:
+                    self._writer = TraceWriter(self.path, self.compress)
+                self._writer.write(item[1], item[2], item[0])
+                self.written += 1
+                if self._writer.size >= self.max_bytes:
+                    self._rotate()
+            # Flush about once a second so the trace survives a crash
+            if self._writer and (item is False or time.monotonic() - last_flush >= 1.0):
+                self._writer.flush()
+                last_flush = time.monotonic()
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def _rotate(self):
+        self._writer.close()
+        self._writer = None
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def is_in_endpoint(endpoint):
+    """True for an IN endpoint address (direction bit 0x80 set)"""
+    return bool(endpoint & 0x80)
+
+
+def replay(path, monitor, speed=1.0):
+    """Feed the IN reports of a trace through monitor._process_input.
+
+    OUT packets (programming and LED commands recorded by TraceSink) are
+    skipped, so a --trace-file capture replays only what the keyboard sent.
+
+    Args:
+        path: trace file
+        monitor: InputMonitor (or anything with _process_input(data, ep_addr))
+        speed: 1.0 = original timing, 10 = ten times faster, 0 = no delays
+
+    Returns:
+        (reports replayed, seconds)
+    """
+    records = [record for record in read_trace(path) if is_in_endpoint(record[1])]
+    start = time.monotonic()
+    if records:
+        first = records[0][0]
+        for timestamp, endpoint, data in records:
+            if speed:
+                # Schedule against the trace start so sleep overshoot does not add up
+                delay = start + (timestamp - first) / 1e9 / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            monitor._process_input(data, endpoint)
+    return len(records), time.monotonic() - start
+
+
+def trace_info(path):
+    """Summary of a trace: reports, duration, per-endpoint counts"""
+    reports = 0
+    first = last = None
+    endpoints = {}
+    for timestamp, endpoint, _ in read_trace(path):
+        if first is None:
+            first = timestamp
+        last = timestamp
+        reports += 1
+        endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+    duration = (last - first) / 1e9 if reports else 0.0
+    return {'reports': reports, 'duration': duration, 'endpoints': endpoints}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay MiniKB HID input traces')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help='Record device input until Ctrl+C')
+    rec.add_argument('trace', help='Trace file to write')
+
+    info = sub.add_parser('info', help='Summarize a trace')
+    info.add_argument('trace', help='Trace file')
+
+    rep = sub.add_parser('replay', help='Replay a trace through the input decoder')
+    rep.add_argument('trace', help='Trace file')
+    rep.add_argument('--speed', type=float, default=1.0, help='Replay speed factor (default: 1.0)')
+    rep.add_argument('--max', action='store_true', help='Replay without delays')
+    rep.add_argument('--quiet', action='store_true', help='Only print the summary')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        summary = trace_info(args.trace)
+        print(f"{summary['reports']} report(s) over {summary['duration']:.3f}s")
+        for endpoint, count in sorted(summary['endpoints'].items()):
+            print(f"  EP{endpoint:02x}: {count}")
+        return
+
+    from minikb_gui import InputMonitor
+
+    def show(event):
+        if args.quiet:
+            return
+        if event.type == 'raw':
+            print(f"RAW EP{event.endpoint:02x}: {event.hex}")
+        elif event.type in ('press', 'release'):
+            print(f"{event.type.upper():8} {event.key_name} (0x{event.keycode:02X})")
+        else:
+            print(f"Error: {event.message}")
+
+    if args.command == 'replay':
+        monitor = InputMonitor(None, show)
+        reports, seconds = replay(args.trace, monitor, 0 if args.max else args.speed)
+        rate = f", {reports / seconds:.0f} reports/s" if seconds > 0 else ""
+        print(f"Replayed {reports} report(s) in {seconds:.3f}s{rate}")
+        return
+
+    from minikb_gui import MiniKBDevice
+    device = MiniKBDevice()
+    device.connect()
+    monitor = InputMonitor(device, show)
+    monitor.start_recording(args.trace)
+    monitor.start()
+    print(f"Recording to {args.trace}, press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        count = monitor.stop_recording()
+        monitor.stop()
+        device.disconnect()
+    print(f"\nRecorded {count} report(s)")
+
+
+if __name__ == "__main__":
+    main()
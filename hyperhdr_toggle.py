@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+MiniKB HyperHDR Toggle - Start or stop HyperHDR without fixed sleeps
+Replaces the pgrep / pkill -9 / sleep of hyperhdr-toggle.sh:
+
+    start  spawn hyperhdr in its own session, remember it in a pidfile and
+           return as soon as /tmp/hyperhdr-domain accepts connections (or
+           the process dies)
+    stop   SIGTERM the remembered process (or any running hyperhdr), wait
+           for it to exit through a pidfd, SIGKILL only after --term-timeout
+
+Each toggle reports its latency on stdout and in the notification.
+
+Usage:
+    python3 hyperhdr_toggle.py
+    python3 hyperhdr_toggle.py --status
+    python3 hyperhdr_toggle.py --command 'python3 dummy.py' --socket /tmp/dummy.sock
+"""
+
+import argparse
+import os
+import select
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from display_toggle import notify
+
+HYPERHDR = 'hyperhdr'
+DOMAIN_SOCKET = '/tmp/hyperhdr-domain'
+START_TIMEOUT = 10.0   # seconds until the domain socket must accept
+TERM_TIMEOUT = 3.0     # seconds after SIGTERM before SIGKILL
+KILL_TIMEOUT = 2.0
+POLL_INTERVAL = 0.01   # readiness checks while waiting on the child
+
+
+def default_pidfile():
+    runtime = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(runtime, f'minikb-hyperhdr-{os.getuid()}.pid')
+
+
+def _starttime(pid):
+    """Process start time in clock ticks since boot, None if pid is gone"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Field 22; the command name in field 2 may contain spaces
+    return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+def find_processes(name):
+    """PIDs whose command name is name (like pgrep -x)"""
+    comm = name[:15]  # the kernel truncates comm to 15 characters
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/comm') as f:
+                if f.read().rstrip('\n') == comm:
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return pids
+
+
+def wait_exit(pid, timeout):
+    """Wait until pid exits; True if it did within timeout
+
+    Uses a pidfd, so the wait ends the moment the process is gone even
+    though it is not our child; falls back to polling without pidfd support.
+    """
+    try:
+        pidfd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True
+    except (AttributeError, OSError):
+        deadline = time.monotonic() + timeout
+        while _starttime(pid) is not None:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+    try:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        return bool(poller.poll(timeout * 1000))
+    finally:
+        os.close(pidfd)
+
+
+def socket_ready(path):
+    """True if a Unix stream socket at path accepts connections"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            return True
+        except OSError:
+            return False
+
+
+class HyperHDRSupervisor:
+    """Starts and stops one HyperHDR process, tracked through a pidfile"""
+
+    def __init__(self, command=(HYPERHDR,), socket_path=DOMAIN_SOCKET, pidfile=None, name=HYPERHDR):
+        """
+        Args:
+            command: argv to start
+            socket_path: domain socket that signals readiness
+            pidfile: where the started pid is remembered (default in XDG_RUNTIME_DIR)
+            name: command name of processes started elsewhere, which are stopped
+                too when the pidfile has none (None = only the pidfile counts)
+        """
+        self.command = list(command)
+        self.socket_path = socket_path
+        self.pidfile = pidfile or default_pidfile()
+        self.name = name
+
+    def _tracked(self):
+        """PID from the pidfile if that process still runs"""
+        try:
+            with open(self.pidfile) as f:
+                pid, starttime = (int(v) for v in f.read().split())
+        except (OSError, ValueError):
+            return None
+        # A recycled pid has another start time
+        return pid if _starttime(pid) == starttime else None
+
+    def running(self):
+        """PIDs of the running instance(s)"""
+        pid = self._tracked()
+        if pid is not None:
+            return [pid]
+        return find_processes(self.name) if self.name else []
+
+    def _remove_socket(self):
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def start(self, timeout=START_TIMEOUT):
+        """Start and wait for readiness
+
+        Returns:
+            (pid, state, seconds) with state 'ready', 'timeout' or 'exited'
+        """
+        start = time.monotonic()
+        # A stale socket would look ready before the new process is
+        self._remove_socket()
+        proc = subprocess.Popen(self.command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, start_new_session=True)
+        with open(self.pidfile, 'w') as f:
+            f.write(f"{proc.pid} {_starttime(proc.pid)}\n")
+
+        deadline = start + timeout
+        state = 'timeout'
+        while time.monotonic() < deadline:
+            if os.path.exists(self.socket_path) and socket_ready(self.socket_path):
+                state = 'ready'
+                break
+            # Returns at once if the child dies, else after POLL_INTERVAL
+            if wait_exit(proc.pid, POLL_INTERVAL):
+                proc.wait()
+                state = 'exited'
+                break
+        return proc.pid, state, time.monotonic() - start
+
+    def stop(self, term_timeout=TERM_TIMEOUT, kill_timeout=KILL_TIMEOUT):
+        """SIGTERM all running instances, SIGKILL the ones still alive after term_timeout
+
+        Returns:
+            (pids stopped, pids that needed SIGKILL, seconds)
+        """
+        start = time.monotonic()
+        pids = self.running()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        killed = []
+        deadline = start + term_timeout
+        for pid in pids:
+            if not wait_exit(pid, max(0.0, deadline - time.monotonic())):
+                killed.append(pid)
+        for pid in killed:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            wait_exit(pid, kill_timeout)
+        for pid in pids:
+            # Reap instances this process started itself
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                pass
+
+        self._remove_socket()
+        try:
+            os.remove(self.pidfile)
+        except FileNotFoundError:
+            pass
+        return pids, killed, time.monotonic() - start
+
+    def toggle(self, start_timeout=START_TIMEOUT, term_timeout=TERM_TIMEOUT):
+        """Stop if running, else start; returns (action, message, seconds)"""
+        if self.running():
+            pids, killed, seconds = self.stop(term_timeout)
+            note = f" (SIGKILL after {term_timeout:.0f}s)" if killed else ""
+            return 'stopped', f"Stopped in {seconds:.2f}s{note}", seconds
+
+        pid, state, seconds = self.start(start_timeout)
+        if state == 'ready':
+            message = f"Started in {seconds:.2f}s"
+        elif state == 'exited':
+            message = f"Exited during startup after {seconds:.2f}s"
+        else:
+            message = f"Started, not ready after {seconds:.0f}s"
+        return 'started', message, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Start or stop HyperHDR')
+    parser.add_argument('--command', help=f'Command to start (default: {HYPERHDR})')
+    parser.add_argument('--socket', default=DOMAIN_SOCKET,
+                        help=f'Readiness socket (default: {DOMAIN_SOCKET})')
+    parser.add_argument('--pidfile', help='Where to remember the started process')
+    parser.add_argument('--start-timeout', type=float, default=START_TIMEOUT,
+                        help=f'Seconds to wait for the socket (default: {START_TIMEOUT:.0f})')
+    parser.add_argument('--term-timeout', type=float, default=TERM_TIMEOUT,
+                        help=f'Seconds between SIGTERM and SIGKILL (default: {TERM_TIMEOUT:.0f})')
+    parser.add_argument('--status', action='store_true', help='Only print whether it runs')
+    parser.add_argument('--no-notify', action='store_true', help='Do not show a notification')
+    args = parser.parse_args()
+
+    if args.command:
+        # Other programs are only tracked through the pidfile
+        supervisor = HyperHDRSupervisor(shlex.split(args.command), args.socket, args.pidfile, name=None)
+    else:
+        supervisor = HyperHDRSupervisor(socket_path=args.socket, pidfile=args.pidfile)
+
+    if args.status:
+        pids = supervisor.running()
+        print(f"running (pid {', '.join(map(str, pids))})" if pids else "stopped")
+        return
+
+    try:
+        action, message, _ = supervisor.toggle(args.start_timeout, args.term_timeout)
+    except OSError as e:
+        print(f"Error: {e}")
+        if not args.no_notify:
+            notify(f"Error: {e}", 'HyperHDR')
+        sys.exit(1)
+
+    print(f"HyperHDR {action}: {message}")
+    if not args.no_notify:
+        notify(message, 'HyperHDR')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+MiniKB Input Statistics - Per-control counters for the Live Monitor
+Fixed-size, array-backed state for the 9 controls (6 keys + encoder). Every
+press and release updates it in O(1); summaries are computed only when the
+statistics view is refreshed or exported.
+
+Per control:
+    presses             total since reset
+    per_minute          presses in the last 60 s (one bucket per second)
+    hold avg/p95/max    over the last RING_SIZE holds
+    interval avg        between the last RING_SIZE consecutive presses
+Encoder:
+    detents_per_s       smoothed rotation rate, 0 after ENCODER_IDLE s
+    direction           'CW' or 'CCW' of the last detent, net CW - CCW detents
+"""
+
+import csv
+import json
+import math
+import time
+from array import array
+
+CONTROLS = ('Button 1', 'Button 2', 'Button 3', 'Button 4', 'Button 5', 'Button 6',
+            'Knob Left', 'Knob Press', 'Knob Right')
+CONTROL_INDEX = {name: i for i, name in enumerate(CONTROLS)}
+KNOB_LEFT = CONTROL_INDEX['Knob Left']
+KNOB_RIGHT = CONTROL_INDEX['Knob Right']
+
+RING_SIZE = 64         # hold durations / intervals kept per control
+MINUTE_BUCKETS = 60    # one-second press buckets
+ENCODER_IDLE = 1.0     # seconds without a detent before the rate drops to 0
+ENCODER_SMOOTHING = 0.3
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class _Ring:
+    """RING_SIZE float samples per control in one flat array, with running sums"""
+
+    def __init__(self, controls, size):
+        self.size = size
+        self.values = array('d', [0.0]) * (controls * size)
+        self.sums = array('d', [0.0]) * controls
+        self.pos = array('L', [0]) * controls
+        self.count = array('L', [0]) * controls
+
+    def add(self, control, value):
+        slot = control * self.size + self.pos[control]
+        self.sums[control] += value - self.values[slot]
+        self.values[slot] = value
+        self.pos[control] = (self.pos[control] + 1) % self.size
+        if self.count[control] < self.size:
+            self.count[control] += 1
+
+    def mean(self, control):
+        count = self.count[control]
+        return self.sums[control] / count if count else None
+
+    def samples(self, control):
+        """Samples oldest first"""
+        start = control * self.size
+        count = self.count[control]
+        pos = self.pos[control]
+        if count < self.size:
+            return list(self.values[start:start + count])
+        return list(self.values[start + pos:start + self.size]) + list(self.values[start:start + pos])
+
+
+class InputStats:
+    """Press/release statistics for the MiniKB controls"""
+
+    def __init__(self, ring_size=RING_SIZE, clock=time.monotonic):
+        self.ring_size = ring_size
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        n = len(CONTROLS)
+        self.started = self.clock()
+        self.presses = array('L', [0]) * n
+        self.pressed_at = array('d', [math.nan]) * n
+        self.last_press = array('d', [math.nan]) * n
+        self.holds = _Ring(n, self.ring_size)
+        self.intervals = _Ring(n, self.ring_size)
+        self.minute = array('L', [0]) * (n * MINUTE_BUCKETS)
+        self.minute_second = array('q', [-1]) * (n * MINUTE_BUCKETS)
+        self.detent_rate = 0.0
+        self.last_detent = math.nan
+        self.last_direction = 0   # +1 CW, -1 CCW
+        self.net_detents = 0
+
+    def press(self, control, timestamp=None):
+        t = self.clock() if timestamp is None else timestamp
+        self.presses[control] += 1
+
+        second = int(t)
+        bucket = control * MINUTE_BUCKETS + second % MINUTE_BUCKETS
+        if self.minute_second[bucket] != second:
+            self.minute_second[bucket] = second
+            self.minute[bucket] = 0
+        self.minute[bucket] += 1
+
+        last = self.last_press[control]
+        if not math.isnan(last):
+            self.intervals.add(control, t - last)
+        self.last_press[control] = t
+        self.pressed_at[control] = t
+
+        if control == KNOB_LEFT or control == KNOB_RIGHT:
+            self._detent(1 if control == KNOB_RIGHT else -1, t)
+
+    def release(self, control, timestamp=None):
+        t = self.clock() if timestamp is None else timestamp
+        start = self.pressed_at[control]
+        if not math.isnan(start):
+            self.holds.add(control, t - start)
+            self.pressed_at[control] = math.nan
+
+    def _detent(self, direction, t):
+        last = self.last_detent
+        if not math.isnan(last) and t - last < ENCODER_IDLE and t > last:
+            self.detent_rate += ENCODER_SMOOTHING * (1.0 / (t - last) - self.detent_rate)
+        else:
+            self.detent_rate = 0.0
+        self.last_detent = t
+        self.last_direction = direction
+        self.net_detents += direction
+
+    def per_minute(self, control, now=None):
+        """Presses in the 60 s before now"""
+        second = int(self.clock() if now is None else now)
+        start = control * MINUTE_BUCKETS
+        return sum(self.minute[start + i] for i in range(MINUTE_BUCKETS)
+                   if second - MINUTE_BUCKETS < self.minute_second[start + i] <= second)
+
+    def encoder(self, now=None):
+        """{'detents_per_s', 'direction', 'net'} for the rotary encoder"""
+        now = self.clock() if now is None else now
+        idle = math.isnan(self.last_detent) or now - self.last_detent >= ENCODER_IDLE
+        return {
+            'detents_per_s': 0.0 if idle else self.detent_rate,
+            'direction': {1: 'CW', -1: 'CCW'}.get(self.last_direction, ''),
+            'net': self.net_detents,
+        }
+
+    def summary(self, now=None):
+        """One dict per control; times in milliseconds, None without samples"""
+        now = self.clock() if now is None else now
+        rows = []
+        for control, name in enumerate(CONTROLS):
+            holds = sorted(self.holds.samples(control))
+            hold_avg = self.holds.mean(control)
+            interval_avg = self.intervals.mean(control)
+            rows.append({
+                'control': name,
+                'presses': self.presses[control],
+                'per_minute': self.per_minute(control, now),
+                'hold_avg_ms': _ms(hold_avg),
+                'hold_p95_ms': _ms(holds[int(0.95 * (len(holds) - 1))]) if holds else None,
+                'hold_max_ms': _ms(holds[-1]) if holds else None,
+                'interval_avg_ms': _ms(interval_avg),
+            })
+        return rows
+
+    def export(self, path):
+        """Write the summary to path: CSV for *.csv, otherwise JSON with raw samples"""
+        now = self.clock()
+        rows = self.summary(now)
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            return
+
+        for control, row in enumerate(rows):
+            row['holds_ms'] = [_ms(v) for v in self.holds.samples(control)]
+            row['intervals_ms'] = [_ms(v) for v in self.intervals.samples(control)]
+        with open(path, 'w') as f:
+            json.dump({
+                'seconds': now - self.started,
+                'encoder': self.encoder(now),
+                'controls': rows,
+            }, f, indent=2)
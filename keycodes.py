@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Keycode registry for MiniKB
+Single source of HID keycodes, key names, modifier bits and the macro
+length limit shared by the GUI, the CLI and the YAML parser.
+
+Lookups are O(1) in both directions:
+    name -> code   dict (canonical names, aliases and GUI display names)
+    code -> name   tuples of 256 entries indexed by keycode
+"""
+
+from functools import lru_cache
+
+# Longest keystroke sequence the 8890 firmware stores per button
+MAX_MACRO_LENGTH = 18
+
+# (keycode, canonical name, GUI display name, aliases)
+# Canonical names follow ch57x-keyboard-tool; display names are what the GUI
+# shows and stores in ~/.minikb_config.json. Order is the GUI list order.
+_KEYS = (
+    (0x00, 'none', 'None', ()),
+    (0x04, 'a', 'A', ()), (0x05, 'b', 'B', ()), (0x06, 'c', 'C', ()),
+    (0x07, 'd', 'D', ()), (0x08, 'e', 'E', ()), (0x09, 'f', 'F', ()),
+    (0x0a, 'g', 'G', ()), (0x0b, 'h', 'H', ()), (0x0c, 'i', 'I', ()),
+    (0x0d, 'j', 'J', ()), (0x0e, 'k', 'K', ()), (0x0f, 'l', 'L', ()),
+    (0x10, 'm', 'M', ()), (0x11, 'n', 'N', ()), (0x12, 'o', 'O', ()),
+    (0x13, 'p', 'P', ()), (0x14, 'q', 'Q', ()), (0x15, 'r', 'R', ()),
+    (0x16, 's', 'S', ()), (0x17, 't', 'T', ()), (0x18, 'u', 'U', ()),
+    (0x19, 'v', 'V', ()), (0x1a, 'w', 'W', ()), (0x1b, 'x', 'X', ()),
+    (0x1c, 'y', 'Y', ()), (0x1d, 'z', 'Z', ()),
+    (0x1e, '1', '1', ()), (0x1f, '2', '2', ()), (0x20, '3', '3', ()),
+    (0x21, '4', '4', ()), (0x22, '5', '5', ()), (0x23, '6', '6', ()),
+    (0x24, '7', '7', ()), (0x25, '8', '8', ()), (0x26, '9', '9', ()),
+    (0x27, '0', '0', ()),
+    (0x28, 'enter', 'Enter', ('return',)),
+    (0x29, 'escape', 'Escape', ('esc',)),
+    (0x2a, 'backspace', 'Backspace', ()),
+    (0x2b, 'tab', 'Tab', ()),
+    (0x2c, 'space', 'Space', ()),
+    (0x2d, 'minus', 'Minus', ()),
+    (0x2e, 'equal', 'Equal', ()),
+    (0x2f, 'leftbracket', 'Left Bracket', ()),
+    (0x30, 'rightbracket', 'Right Bracket', ()),
+    (0x31, 'backslash', 'Backslash', ()),
+    (0x33, 'semicolon', 'Semicolon', ()),
+    (0x34, 'quote', 'Apostrophe', ('apostrophe',)),
+    (0x35, 'grave', 'Grave', ()),
+    (0x36, 'comma', 'Comma', ()),
+    (0x37, 'dot', 'Period', ('period',)),
+    (0x38, 'slash', 'Slash', ()),
+    (0x39, 'capslock', 'Caps Lock', ()),
+    (0x3a, 'f1', 'F1', ()), (0x3b, 'f2', 'F2', ()), (0x3c, 'f3', 'F3', ()),
+    (0x3d, 'f4', 'F4', ()), (0x3e, 'f5', 'F5', ()), (0x3f, 'f6', 'F6', ()),
+    (0x40, 'f7', 'F7', ()), (0x41, 'f8', 'F8', ()), (0x42, 'f9', 'F9', ()),
+    (0x43, 'f10', 'F10', ()), (0x44, 'f11', 'F11', ()), (0x45, 'f12', 'F12', ()),
+    (0x46, 'printscreen', 'Print Screen', ('print',)),
+    (0x47, 'scrolllock', 'Scroll Lock', ()),
+    (0x48, 'pause', 'Pause', ()),
+    (0x49, 'insert', 'Insert', ()),
+    (0x4a, 'home', 'Home', ()),
+    (0x4b, 'pageup', 'Page Up', ('pgup',)),
+    (0x4c, 'delete', 'Delete', ('del',)),
+    (0x4d, 'end', 'End', ()),
+    (0x4e, 'pagedown', 'Page Down', ('pgdn',)),
+    (0x4f, 'right', 'Right Arrow', ()),
+    (0x50, 'left', 'Left Arrow', ()),
+    (0x51, 'down', 'Down Arrow', ()),
+    (0x52, 'up', 'Up Arrow', ()),
+    (0x53, 'numlock', 'Num Lock', ()),
+    (0x54, 'numpadslash', 'Numpad /', ()),
+    (0x55, 'numpadasterisk', 'Numpad *', ()),
+    (0x56, 'numpadminus', 'Numpad -', ()),
+    (0x57, 'numpadplus', 'Numpad +', ()),
+    (0x58, 'numpadenter', 'Numpad Enter', ()),
+    (0x59, 'numpad1', 'Numpad 1', ()), (0x5a, 'numpad2', 'Numpad 2', ()),
+    (0x5b, 'numpad3', 'Numpad 3', ()), (0x5c, 'numpad4', 'Numpad 4', ()),
+    (0x5d, 'numpad5', 'Numpad 5', ()), (0x5e, 'numpad6', 'Numpad 6', ()),
+    (0x5f, 'numpad7', 'Numpad 7', ()), (0x60, 'numpad8', 'Numpad 8', ()),
+    (0x61, 'numpad9', 'Numpad 9', ()), (0x62, 'numpad0', 'Numpad 0', ()),
+    (0x63, 'numpaddot', 'Numpad .', ()),
+    (0x68, 'f13', 'F13', ()), (0x69, 'f14', 'F14', ()), (0x6a, 'f15', 'F15', ()),
+    (0x6b, 'f16', 'F16', ()), (0x6c, 'f17', 'F17', ()), (0x6d, 'f18', 'F18', ()),
+    (0x6e, 'f19', 'F19', ()), (0x6f, 'f20', 'F20', ()), (0x70, 'f21', 'F21', ()),
+    (0x71, 'f22', 'F22', ()), (0x72, 'f23', 'F23', ()), (0x73, 'f24', 'F24', ()),
+    # Keyboard-page volume keys; most hosts ignore these, use the media keys below
+    (0x7f, 'kbmute', 'Mute', ()),
+    (0x80, 'kbvolumeup', 'Volume Up', ()),
+    (0x81, 'kbvolumedown', 'Volume Down', ()),
+    (0x7b, 'cut', 'Cut', ()),
+    (0x7c, 'copy', 'Copy', ()),
+    (0x7d, 'paste', 'Paste', ()),
+    # Media keys (what ch57x-keyboard-tool's mute/volume/play names mean)
+    (0xe8, 'play', 'Media Play/Pause', ('playpause',)),
+    (0xe9, 'stop', 'Media Stop', ()),
+    (0xea, 'previous', 'Media Prev', ('prev',)),
+    (0xeb, 'next', 'Media Next', ()),
+    (0xef, 'mute', 'Media Mute', ()),
+    (0xed, 'volumeup', 'Media Vol Up', ()),
+    (0xee, 'volumedown', 'Media Vol Down', ()),
+)
+
+# Modifier bits: (bit, canonical name, display name, aliases)
+_MODIFIERS = (
+    (0x01, 'ctrl', 'L-Ctrl', ('lctrl',)),
+    (0x02, 'shift', 'L-Shift', ('lshift',)),
+    (0x04, 'alt', 'L-Alt', ('lalt', 'opt')),  # Mac option = alt
+    (0x08, 'win', 'L-Meta', ('lwin', 'cmd', 'meta', 'super')),  # Mac command = win
+    (0x10, 'rctrl', 'R-Ctrl', ()),
+    (0x20, 'rshift', 'R-Shift', ()),
+    (0x40, 'ralt', 'R-Alt', ('ropt',)),
+    (0x80, 'rwin', 'R-Meta', ('rcmd', 'rmeta')),
+)
+
+
+# HID keyboard usage -> Linux input event code, as hid-input.c maps them
+# (0 = unmapped). Used to turn evdev key events back into HID keycodes.
+_HID_TO_EVDEV = (
+    0, 0, 0, 0, 30, 48, 46, 32, 18, 33, 34, 35, 23, 36, 37, 38,
+    50, 49, 24, 25, 16, 19, 31, 20, 22, 47, 17, 45, 21, 44, 2, 3,
+    4, 5, 6, 7, 8, 9, 10, 11, 28, 1, 14, 15, 57, 12, 13, 26,
+    27, 43, 43, 39, 40, 41, 51, 52, 53, 58, 59, 60, 61, 62, 63, 64,
+    65, 66, 67, 68, 87, 88, 99, 70, 119, 110, 102, 104, 111, 107, 109, 106,
+    105, 108, 103, 69, 98, 55, 74, 78, 96, 79, 80, 81, 75, 76, 77, 71,
+    72, 73, 82, 83, 86, 127, 116, 117, 183, 184, 185, 186, 187, 188, 189, 190,
+    191, 192, 193, 194, 134, 138, 130, 132, 128, 129, 131, 137, 133, 135, 136, 113,
+    115, 114, 0, 0, 0, 121, 0, 89, 93, 124, 92, 94, 95, 0, 0, 0,
+    122, 123, 90, 91, 85, 0, 0, 0, 0, 0, 0, 0, 111, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 179, 180, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 111, 0, 0, 0, 0, 0, 0, 0,
+    29, 42, 56, 125, 97, 54, 100, 126, 164, 166, 165, 163, 161, 115, 114, 113,
+    150, 158, 159, 128, 136, 177, 178, 176, 142, 152, 173, 140, 0, 0, 0, 0,
+)
+
+
+def _build_tables():
+    """Build the lookup tables from _KEYS and _MODIFIERS"""
+    names = {}
+    code_to_name = [None] * 256
+    code_to_display = [f"0x{code:02X}" for code in range(256)]
+    display_keycodes = {}
+
+    for code, name, display, aliases in _KEYS:
+        for alias in (name,) + aliases:
+            names[alias] = code
+        code_to_name[code] = name
+        code_to_display[code] = display
+        display_keycodes[display] = code
+
+    # Display names resolve too, unless they clash with a canonical name
+    # ('Mute' is the keyboard-page key, 'mute' the media key); keycode()
+    # checks the exact display name first, so 'Mute' still means 0x7f there
+    for code, _, display, _ in _KEYS:
+        names.setdefault(display.lower(), code)
+
+    modifier_bits = {}
+    for bit, name, display, aliases in _MODIFIERS:
+        for alias in (name,) + aliases:
+            modifier_bits[alias] = bit
+
+    modifier_strings = []
+    for mask in range(256):
+        modifier_strings.append("+".join(display for bit, _, display, _ in _MODIFIERS if mask & bit))
+
+    return (names, tuple(code_to_name), tuple(code_to_display), display_keycodes,
+            modifier_bits, tuple(modifier_strings))
+
+
+(KEY_NAMES,            # lowercase name/alias/display name -> keycode
+ KEYCODE_TO_NAME,      # keycode -> canonical name or None
+ KEYCODE_TO_DISPLAY,   # keycode -> display name ("0xNN" if unassigned)
+ DISPLAY_KEYCODES,     # display name -> keycode, in GUI order
+ MODIFIER_BITS,        # lowercase modifier name/alias -> bit
+ MODIFIER_STRINGS,     # modifier byte -> "L-Ctrl+L-Shift" style string
+ ) = _build_tables()
+
+# Modifier bit -> display name
+MODIFIER_NAMES = {bit: display for bit, _, display, _ in _MODIFIERS}
+
+# Display names in GUI order, shared by all key selection widgets
+DISPLAY_NAMES = tuple(DISPLAY_KEYCODES)
+
+
+def _build_evdev_tables():
+    """evdev code -> HID keycode, and evdev modifier code -> modifier bit"""
+    evdev_to_hid = {}
+    for code, ev in enumerate(_HID_TO_EVDEV[:0xe0]):
+        if ev:
+            evdev_to_hid.setdefault(ev, code)
+    # Mute/volume also exist on the keyboard page (0x7f-0x81); the media
+    # keys are what the keyboard sends for ch57x mute/volume/play
+    for code in range(0xe8, 0xf0):
+        evdev_to_hid[_HID_TO_EVDEV[code]] = code
+    for code in range(0xf0, 0x100):
+        if _HID_TO_EVDEV[code]:
+            evdev_to_hid.setdefault(_HID_TO_EVDEV[code], code)
+    modifier_bits = {_HID_TO_EVDEV[0xe0 + i]: 1 << i for i in range(8)}
+    return evdev_to_hid, modifier_bits
+
+
+(EVDEV_TO_HID,            # evdev KEY_* code -> HID keycode
+ EVDEV_MODIFIER_BITS,     # evdev KEY_LEFTCTRL etc. -> modifier bit
+ ) = _build_evdev_tables()
+
+
+def keycode(name, default=None):
+    """Look up a keycode by display name (exact case, as the GUI stores it),
+    then by canonical name, alias or display name in any case"""
+    code = DISPLAY_KEYCODES.get(name)
+    if code is None:
+        code = KEY_NAMES.get(name.lower(), default)
+    return code
+
+
+def key_name(code):
+    """Canonical name of a keycode, or None if unassigned"""
+    return KEYCODE_TO_NAME[code & 0xff]
+
+
+def display_name(code):
+    """GUI name of a keycode, "0xNN" if unassigned"""
+    return KEYCODE_TO_DISPLAY[code & 0xff]
+
+
+def modifier_string(modifier):
+    """Convert modifier byte to a string like 'L-Ctrl+L-Shift'"""
+    return MODIFIER_STRINGS[modifier & 0xff]
+
+
+@lru_cache(maxsize=1024)
+def parse_action(action):
+    """Parse a key action like 'ctrl-shift-c' into (keycode, modifier)
+
+    The last dash-separated part is the key, the others are modifiers.
+
+    Raises:
+        ValueError: if the key or one of the modifiers is unknown
+    """
+    parts = action.lower().split('-')
+
+    code = KEY_NAMES.get(parts[-1])
+    if code is None:
+        raise ValueError(f"Unknown key '{parts[-1]}' in action '{action}'")
+
+    modifier = 0x00
+    for mod in parts[:-1]:
+        bit = MODIFIER_BITS.get(mod)
+        if bit is None:
+            raise ValueError(f"Unknown modifier '{mod}' in action '{action}'")
+        modifier |= bit
+
+    return (code, modifier)
+
+
+if __name__ == "__main__":
+    import sys
+    for arg in sys.argv[1:]:
+        try:
+            code, modifier = parse_action(arg)
+            print(f"{arg}: keycode=0x{code:02x} modifier=0x{modifier:02x} "
+                  f"({modifier_string(modifier) or 'none'} + {display_name(code)})")
+        except ValueError as e:
+            print(f"{arg}: {e}")
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+MiniKB LED Patterns - Timed LED mode sequences on one timer-wheel thread
+Effects used to be blocking sleeps: try_all_led_modes() slept on the caller's
+thread and notification-blink.sh backgrounded a sleeping subshell per
+notification. Here an effect is a Pattern, a list of (mode, seconds) steps,
+and a PatternEngine plays any number of them from a single TimerWheel thread:
+
+    priority     the highest-priority active pattern owns the LED (the most
+                 recent one on a tie); the others keep their timeline and
+                 show through when it ends, then the base mode returns
+    coalescing   all step changes due in one tick end in at most one
+                 set_led_mode() call, and none if the mode stays the same
+
+Usage:
+    python3 led_patterns.py --list
+    python3 led_patterns.py --play notify error
+    python3 led_patterns.py --dbus-notify     # replaces notification-blink.sh
+"""
+
+import argparse
+import itertools
+import logging
+import math
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from color_catch import RAINBOW_MODE
+
+OFF_MODE = 0
+CYAN_MODE = 1
+TICK = 0.01          # timer wheel resolution in seconds
+WHEEL_SLOTS = 512    # one revolution = 5.12 s at TICK; longer timers wait whole rounds
+
+log = logging.getLogger('minikb.patterns')
+
+Step = namedtuple('Step', 'mode duration')
+Pattern = namedtuple('Pattern', 'name priority steps')
+
+PATTERNS = {
+    # notification-blink.sh: Rainbow for 2 s
+    'notify': Pattern('notify', 1, (Step(RAINBOW_MODE, 2.0),)),
+    'profile': Pattern('profile', 2, (Step(CYAN_MODE, 0.15), Step(OFF_MODE, 0.1), Step(CYAN_MODE, 0.15))),
+    'error': Pattern('error', 3, (Step(CYAN_MODE, 0.1), Step(OFF_MODE, 0.1)) * 4),
+}
+
+
+def mode_sweep(max_mode=20, delay=1.5, priority=0):
+    """Pattern stepping through LED modes 0..max_mode, as try_all_led_modes() does"""
+    return Pattern('sweep', priority, tuple(Step(mode, delay) for mode in range(max_mode + 1)))
+
+
+class TimerWheel:
+    """Hashed timing wheel driven by one thread
+
+    schedule() and cancel() are O(1): a timer goes into the slot its tick
+    falls in, with the number of whole revolutions left to wait. The thread
+    only ticks while timers are pending and sleeps on a condition otherwise.
+    Callbacks run on the wheel thread, outside the lock; after_tick (if set)
+    is called once after every tick that ran at least one callback.
+    """
+
+    def __init__(self, tick=TICK, slots=WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.position = 0  # next slot to expire
+        self.pending = 0
+        self.after_tick = None
+        self._next_tick = None  # perf_counter() of the next expiry, None while idle
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = None
+
+    def schedule(self, delay, callback):
+        """Call callback after delay seconds (at least one tick); returns a handle for cancel()"""
+        ticks = max(1, math.ceil(delay / self.tick - 1e-9))
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Timer wheel closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='TimerWheel')
+                self._thread.start()
+            if self._next_tick is None:
+                self._next_tick = time.perf_counter() + self.tick
+            entry = [(ticks - 1) // len(self.slots), callback]
+            self.slots[(self.position + ticks - 1) % len(self.slots)].append(entry)
+            self.pending += 1
+            self._cond.notify()
+        return entry
+
+    def cancel(self, entry):
+        """Cancel a scheduled callback; no-op if it already ran"""
+        with self._cond:
+            if entry[1] is not None:
+                entry[1] = None
+                self.pending -= 1
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _expire(self):
+        """Pop the callbacks due in the current slot (lock held)"""
+        slot = self.slots[self.position]
+        due = []
+        keep = []
+        for entry in slot:
+            if entry[1] is None:
+                continue
+            if entry[0]:
+                entry[0] -= 1
+                keep.append(entry)
+            else:
+                due.append(entry[1])
+                entry[1] = None
+        self.slots[self.position] = keep
+        self.position = (self.position + 1) % len(self.slots)
+        self.pending -= len(due)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self.pending:
+                    self._next_tick = None
+                    self._cond.wait()
+                if not self._running:
+                    return
+                remaining = self._next_tick - time.perf_counter()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                due = self._expire()
+                self._next_tick += self.tick
+
+            for callback in due:
+                try:
+                    callback()
+                except Exception:
+                    log.exception("Timer callback failed")
+            if due and self.after_tick:
+                self.after_tick()
+
+
+class _Playback:
+    """A pattern being played: current step and remaining repeats"""
+
+    def __init__(self, handle, pattern, repeat):
+        self.handle = handle
+        self.pattern = pattern
+        self.repeat = repeat  # 0 = until stopped
+        self.step = 0
+        self.round = 0
+        self.timer = None
+
+    @property
+    def mode(self):
+        return self.pattern.steps[self.step].mode
+
+
+class PatternEngine:
+    """Plays LED patterns on a device from one TimerWheel thread
+
+    play(), stop() and set_base() may be called from any thread; they only
+    schedule work, all pattern state lives on the wheel thread.
+    """
+
+    def __init__(self, device, base_mode=OFF_MODE, tick=TICK):
+        """
+        Args:
+            device: connected MiniKBDevice (or anything with set_led_mode(mode))
+            base_mode: LED mode shown when no pattern is active
+            tick: timer resolution in seconds; changes within one tick are coalesced
+        """
+        self.device = device
+        self.base_mode = base_mode
+        self.wheel = TimerWheel(tick)
+        self.wheel.after_tick = self._flush
+        self.active = {}  # handle -> _Playback
+        self.current = None  # last mode written, None = unknown
+        self.changes = 0  # pattern starts, steps and stops
+        self.writes = 0
+        self.errors = 0
+        self._handles = itertools.count(1)
+        self._dirty = False
+
+    def play(self, pattern, repeat=1):
+        """Start a pattern (a Pattern or a PATTERNS name); returns a handle for stop()
+
+        Raises:
+            ValueError: if pattern is an unknown name or has no steps
+        """
+        if isinstance(pattern, str):
+            if pattern not in PATTERNS:
+                raise ValueError(f"Unknown pattern {pattern!r} (known: {', '.join(PATTERNS)})")
+            pattern = PATTERNS[pattern]
+        if not pattern.steps:
+            raise ValueError(f"Pattern {pattern.name!r} has no steps")
+        playback = _Playback(next(self._handles), pattern, repeat)
+        self.wheel.schedule(0, lambda: self._start(playback))
+        return playback.handle
+
+    def stop(self, handle=None):
+        """Stop one pattern, or all of them with handle None"""
+        self.wheel.schedule(0, lambda: self._stop(handle))
+
+    def set_base(self, mode, applied=False):
+        """Change the mode shown when no pattern is active
+
+        Args:
+            applied: the caller already wrote mode to the device; it is only
+                rewritten if a pattern owns the LED
+        """
+        def apply():
+            self.base_mode = mode
+            if applied:
+                self.current = mode
+            self._changed()
+        self.wheel.schedule(0, apply)
+
+    def close(self):
+        """Stop the wheel thread; the LED keeps its current mode"""
+        self.wheel.close()
+
+    def wanted_mode(self):
+        """Mode of the owning pattern, or the base mode"""
+        if not self.active:
+            return self.base_mode
+        # Handles increase, so on a priority tie the newest pattern wins
+        owner = max(self.active.values(), key=lambda p: (p.pattern.priority, p.handle))
+        return owner.mode
+
+    def stats(self):
+        return {'active': len(self.active), 'changes': self.changes, 'writes': self.writes,
+                'coalesced': self.changes - self.writes, 'errors': self.errors}
+
+    def _changed(self):
+        self.changes += 1
+        self._dirty = True
+
+    def _start(self, playback):
+        self.active[playback.handle] = playback
+        self._enter(playback)
+
+    def _enter(self, playback):
+        """Show the current step and schedule the next one"""
+        self._changed()
+        duration = playback.pattern.steps[playback.step].duration
+        playback.timer = self.wheel.schedule(duration, lambda: self._advance(playback))
+
+    def _advance(self, playback):
+        playback.step += 1
+        if playback.step == len(playback.pattern.steps):
+            playback.step = 0
+            playback.round += 1
+            if playback.repeat and playback.round >= playback.repeat:
+                del self.active[playback.handle]
+                self._changed()
+                return
+        self._enter(playback)
+
+    def _stop(self, handle):
+        handles = list(self.active) if handle is None else [handle]
+        for h in handles:
+            playback = self.active.pop(h, None)
+            if playback:
+                self.wheel.cancel(playback.timer)
+                self._changed()
+
+    def _flush(self):
+        """Write the wanted mode once per tick, only if it differs"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        mode = self.wanted_mode()
+        if mode == self.current:
+            return
+        try:
+            self.device.set_led_mode(mode)
+        except Exception as e:
+            self.errors += 1
+            self.current = None  # retry with the next change
+            log.warning("LED mode %d failed: %s", mode, e)
+            return
+        self.writes += 1
+        self.current = mode
+
+
+def watch_notifications(engine, pattern='notify'):
+    """Play pattern on every org.freedesktop.Notifications Notify call
+
+    Runs one dbus-monitor process for the whole session instead of a
+    background subshell per notification.
+    """
+    proc = subprocess.Popen(
+        ['dbus-monitor', "interface='org.freedesktop.Notifications',member='Notify'"],
+        stdout=subprocess.PIPE, text=True, bufsize=1)
+    try:
+        for line in proc.stdout:
+            if 'member=Notify' in line and 'method call' in line:
+                engine.play(pattern)
+                print(f"[{time.strftime('%H:%M:%S')}] Notification -> {pattern}", flush=True)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play MiniKB LED patterns')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--list', action='store_true', help='List the built-in patterns')
+    action.add_argument('--play', nargs='+', metavar='PATTERN', help='Play patterns at once, then exit')
+    action.add_argument('--dbus-notify', action='store_true',
+                        help='Play a pattern on every desktop notification')
+    parser.add_argument('--pattern', default='notify', help='Pattern for --dbus-notify (default: notify)')
+    parser.add_argument('--base', type=int, default=OFF_MODE, help=f'Idle LED mode (default: {OFF_MODE})')
+    parser.add_argument('--transport', choices=['usb', 'hidraw'],
+                        help='Device access: libusb (pyusb) or /dev/hidraw '
+                             '(default: hidraw with --dbus-notify, else usb)')
+    args = parser.parse_args()
+
+    if args.list:
+        for pattern in PATTERNS.values():
+            steps = ' '.join(f"{step.mode}:{step.duration:g}s" for step in pattern.steps)
+            print(f"{pattern.name:>8}  priority {pattern.priority}  {steps}")
+        return
+
+    names = args.play or [args.pattern]
+    unknown = [name for name in names if name not in PATTERNS]
+    if unknown:
+        print(f"Error: unknown pattern(s) {', '.join(unknown)} (known: {', '.join(PATTERNS)})")
+        sys.exit(1)
+
+    # --dbus-notify holds the device for the whole session: over libusb the
+    # kernel drivers would stay detached and the macropad could not type
+    transport = args.transport or ('hidraw' if args.dbus_notify else 'usb')
+    from minikb_gui import HidrawDevice, MiniKBDevice
+    device = HidrawDevice() if transport == 'hidraw' else MiniKBDevice()
+    try:
+        device.connect()
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    engine = PatternEngine(device, args.base)
+    try:
+        if args.play:
+            for name in names:
+                engine.play(name)
+            # Longest pattern plus a few ticks of rounding for the last write
+            time.sleep(max(sum(s.duration for s in PATTERNS[n].steps) for n in names) + 5 * TICK)
+        else:
+            print("Monitoring notifications...")
+            watch_notifications(engine, args.pattern)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        engine.close()
+        stats = engine.stats()
+        print(f"{stats['writes']} LED write(s) for {stats['changes']} change(s), {stats['errors']} error(s)")
+        device.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+MiniKB Live State - Button, profile and LED state in shared memory
+A fixed 96 byte block in an mmap'd file. Writers are the filter daemon
+(keys held), the profile switcher (active profile) and the GUI/device code
+(LED mode, programmed keys); status bars and scripts map it read-only and
+sample it without a syscall per read.
+
+The file is per user, in the user's runtime directory
+(/run/user/UID/minikb-state). A root writer started with sudo uses the
+calling user's file and hands it to that user; a root service without sudo
+uses /run/minikb-state. Writers never follow symlinks and only map regular
+files owned by root or that user.
+
+Usage:
+    python3 live_state.py                 # print the current state
+    python3 live_state.py --watch 0.05    # print on every change
+    python3 live_state.py --format '{profile} {pressed}'
+
+Layout (little endian):
+    0   magic b'MKBS', version (u8), 3 reserved bytes
+    8   sequence (u64), odd while a writer is updating the block
+    16  last event time, CLOCK_MONOTONIC ns (u64)
+    24  held HID keycodes, 256 bit bitmap (32 bytes)
+    56  held controls, bit i = input_stats.CONTROLS[i] (u16)
+    58  modifier byte (u8)
+    59  LED mode byte (u8, 0xff = unknown)
+    60  profile id (i16, -1 = none), 2 reserved bytes
+    64  HID keycode programmed on each control, layer 0 (9 bytes), 7 reserved
+    80  profile name, UTF-8, NUL padded (16 bytes)
+
+Seqlock: a writer makes the sequence odd, updates the fields and makes it
+even again. A reader copies the block between two sequence reads and
+retries when they differ or are odd, so it never sees a torn update.
+Writers in different processes serialize on flock().
+"""
+
+import argparse
+import errno
+import fcntl
+import mmap
+import os
+import stat
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from input_stats import CONTROLS
+
+
+def state_owner():
+    """UID the state file belongs to: the sudo caller for a root writer"""
+    uid = os.geteuid()
+    sudo_uid = os.environ.get('SUDO_UID', '')
+    if uid == 0 and sudo_uid.isdigit():
+        return int(sudo_uid)
+    return uid
+
+
+def default_path():
+    """Per-user state file: the runtime directory of state_owner(),
+    /run for root, /dev/shm/minikb-state-UID without a runtime directory"""
+    uid = state_owner()
+    if uid == 0:
+        return '/run/minikb-state'
+    runtime = f'/run/user/{uid}'
+    if os.path.isdir(runtime):
+        return os.path.join(runtime, 'minikb-state')
+    return f'/dev/shm/minikb-state-{uid}'
+
+
+DEFAULT_PATH = default_path()
+STATE_MAGIC = b'MKBS'
+STATE_VERSION = 1
+LED_UNKNOWN = 0xff
+
+_BLOCK = struct.Struct('<4sB3xQQ32sHBBh2x9s7x16s')
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+STATE_SIZE = _BLOCK.size
+
+LiveState = namedtuple('LiveState', 'seq last_event_ns keys controls modifier led_mode '
+                                    'profile_id profile control_keycodes')
+
+
+def pressed_names(state):
+    """Names of the held controls"""
+    return [name for i, name in enumerate(CONTROLS) if state.controls & (1 << i)]
+
+
+def held_keycodes(state):
+    """HID keycodes held, in ascending order"""
+    return [code for code in range(256) if state.keys & (1 << code)]
+
+
+def _unpack(seq, block):
+    (_, _, _, last_event_ns, keys, controls, modifier, led_mode, profile_id,
+     control_keycodes, profile) = _BLOCK.unpack(block)
+    return LiveState(seq, last_event_ns, int.from_bytes(keys, 'little'), controls, modifier,
+                     led_mode, profile_id, profile.rstrip(b'\0').decode('utf-8', 'replace'),
+                     tuple(control_keycodes))
+
+
+class StateWriter:
+    """Read-write mapping of the state block
+
+    Every update is one seqlock write section. Creates and initializes the
+    file if it does not exist or has another layout.
+
+    Raises:
+        OSError: if path is a symlink, not a regular file, has other links
+            or belongs to someone other than root or state_owner()
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Writers may run as root: never follow a link planted at path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o644)
+        try:
+            st = os.fstat(self._fd)
+            if not stat.S_ISREG(st.st_mode):
+                raise OSError(errno.EINVAL, "Not a regular file", path)
+            if st.st_nlink != 1:
+                raise OSError(errno.EPERM, "State file has other hard links", path)
+            owner = state_owner()
+            if st.st_uid not in (0, os.geteuid(), owner):
+                raise OSError(errno.EPERM, f"State file belongs to uid {st.st_uid}", path)
+            if st.st_uid != owner and os.geteuid() == 0:
+                # Created by a sudo writer: the user's own writers need it too
+                os.fchown(self._fd, owner, -1)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if st.st_size < STATE_SIZE:
+                    os.ftruncate(self._fd, STATE_SIZE)
+                self._mm = mmap.mmap(self._fd, STATE_SIZE)
+                if self._mm[:5] != STATE_MAGIC + bytes((STATE_VERSION,)):
+                    self._mm[:] = _BLOCK.pack(STATE_MAGIC, STATE_VERSION, 0, 0, bytes(32), 0, 0,
+                                              LED_UNKNOWN, -1, bytes(9), b'')
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def close(self):
+        if self._fd >= 0:
+            self._mm.close()
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _update(self, fields):
+        """Apply {offset: packed bytes} inside one seqlock write section"""
+        mm = self._mm
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                seq = _SEQ.unpack_from(mm, _SEQ_OFFSET)[0]
+                # An odd sequence left by a crashed writer is already "writing"
+                _SEQ.pack_into(mm, _SEQ_OFFSET, seq | 1)
+                for offset, data in fields:
+                    mm[offset:offset + len(data)] = data
+                _SEQ.pack_into(mm, _SEQ_OFFSET, (seq | 1) + 1)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def set_keys(self, keycodes, modifier, timestamp_ns=None, control_keycodes=None):
+        """Publish the held keys; controls are derived from control_keycodes
+
+        Args:
+            keycodes: iterable of held HID keycodes
+            modifier: held modifier byte
+            timestamp_ns: event time on CLOCK_MONOTONIC (default: now)
+            control_keycodes: keycode per control, default the block's own
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        if control_keycodes is None:
+            control_keycodes = self._mm[64:64 + len(CONTROLS)]
+        keys = 0
+        for code in keycodes:
+            keys |= 1 << (code & 0xff)
+        controls = 0
+        for i, code in enumerate(control_keycodes):
+            if code and keys & (1 << code):
+                controls |= 1 << i
+        self._update(((16, struct.pack('<Q32sHB', timestamp_ns, keys.to_bytes(32, 'little'),
+                                       controls, modifier)),))
+
+    def set_led_mode(self, mode):
+        self._update(((59, bytes((mode & 0xff,))),))
+
+    def set_profile(self, profile_id, name=''):
+        encoded = name.encode('utf-8')[:16]
+        self._update(((60, struct.pack('<h', profile_id)), (80, encoded.ljust(16, b'\0'))))
+
+    def set_control_keycodes(self, keycodes):
+        """Record the programmed keycodes, {control index: keycode}"""
+        self._update(tuple((64 + index, bytes((code & 0xff,))) for index, code in keycodes.items()))
+
+
+class StateReader:
+    """Read-only mapping of the state block; read() makes no syscalls unless it
+    has to wait for a writer"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), STATE_SIZE, access=mmap.ACCESS_READ)
+        if self._mm[:5] != STATE_MAGIC + bytes((STATE_VERSION,)):
+            self._mm.close()
+            raise ValueError(f"{path}: not a MiniKB state block")
+        self.retries = 0  # reads repeated because a writer was active
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def seq(self):
+        """Current sequence number; changes with every update"""
+        return _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+
+    def read(self, timeout=0.1):
+        """Consistent LiveState snapshot
+
+        Raises:
+            TimeoutError: if a writer holds the block for timeout seconds
+                (crashed mid-update; the next update repairs it)
+        """
+        mm = self._mm
+        deadline = None
+        while True:
+            before = _SEQ.unpack_from(mm, _SEQ_OFFSET)[0]
+            if not before & 1:
+                block = mm[:STATE_SIZE]
+                if _SEQ.unpack_from(mm, _SEQ_OFFSET)[0] == before:
+                    return _unpack(before, block)
+            self.retries += 1
+            # The writer may be preempted mid-update; let it run
+            if deadline is None:
+                deadline = time.monotonic() + timeout
+            elif time.monotonic() > deadline:
+                raise TimeoutError(f"{self.path}: state block is being written")
+            os.sched_yield()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the MiniKB live state block')
+    parser.add_argument('--path', default=DEFAULT_PATH, help=f'State file (default: {DEFAULT_PATH})')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Poll at this interval and print every change')
+    parser.add_argument('--format', help='Output template, e.g. "{profile} {pressed}"; fields: '
+                        'pressed, keys, modifier, led_mode, profile, profile_id, age_ms, seq')
+    args = parser.parse_args()
+
+    try:
+        reader = StateReader(args.path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open state: {e}")
+        return
+
+    def show(state):
+        age = (time.monotonic_ns() - state.last_event_ns) / 1e6 if state.last_event_ns else None
+        fields = {
+            'pressed': ','.join(pressed_names(state)) or '-',
+            'keys': ','.join(f'0x{code:02x}' for code in held_keycodes(state)) or '-',
+            'modifier': f'0x{state.modifier:02x}',
+            'led_mode': '?' if state.led_mode == LED_UNKNOWN else state.led_mode,
+            'profile': state.profile or '-',
+            'profile_id': state.profile_id,
+            'age_ms': '-' if age is None else f'{age:.0f}',
+            'seq': state.seq,
+        }
+        if args.format:
+            print(args.format.format(**fields), flush=True)
+        else:
+            print(' '.join(f'{name}={value}' for name, value in fields.items()), flush=True)
+
+    with reader:
+        state = reader.read()
+        show(state)
+        if not args.watch:
+            return
+        try:
+            while True:
+                time.sleep(args.watch)
+                if reader.seq != state.seq:
+                    state = reader.read()
+                    show(state)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ import argparse
 import json
 import sys
 
+import keycodes
+
 try:
     import usb.core
     import usb.util
@@ -39,33 +41,6 @@ BUTTONS = {
     'knob_right': 0x0f,
 }
 
-# USB HID Key codes
-HID_KEYCODES = {
-    'none': 0x00,
-    'a': 0x04, 'b': 0x05, 'c': 0x06, 'd': 0x07, 'e': 0x08,
-    'f': 0x09, 'g': 0x0a, 'h': 0x0b, 'i': 0x0c, 'j': 0x0d,
-    'k': 0x0e, 'l': 0x0f, 'm': 0x10, 'n': 0x11, 'o': 0x12,
-    'p': 0x13, 'q': 0x14, 'r': 0x15, 's': 0x16, 't': 0x17,
-    'u': 0x18, 'v': 0x19, 'w': 0x1a, 'x': 0x1b, 'y': 0x1c, 'z': 0x1d,
-    '1': 0x1e, '2': 0x1f, '3': 0x20, '4': 0x21, '5': 0x22,
-    '6': 0x23, '7': 0x24, '8': 0x25, '9': 0x26, '0': 0x27,
-    'enter': 0x28, 'escape': 0x29, 'backspace': 0x2a, 'tab': 0x2b,
-    'space': 0x2c, 'minus': 0x2d, 'equal': 0x2e,
-    'f1': 0x3a, 'f2': 0x3b, 'f3': 0x3c, 'f4': 0x3d, 'f5': 0x3e, 'f6': 0x3f,
-    'f7': 0x40, 'f8': 0x41, 'f9': 0x42, 'f10': 0x43, 'f11': 0x44, 'f12': 0x45,
-    'printscreen': 0x46, 'scrolllock': 0x47, 'pause': 0x48,
-    'insert': 0x49, 'home': 0x4a, 'pageup': 0x4b,
-    'delete': 0x4c, 'end': 0x4d, 'pagedown': 0x4e,
-    'right': 0x4f, 'left': 0x50, 'down': 0x51, 'up': 0x52,
-    'f13': 0x68, 'f14': 0x69, 'f15': 0x6a, 'f16': 0x6b,
-    'f17': 0x6c, 'f18': 0x6d, 'f19': 0x6e, 'f20': 0x6f,
-    'f21': 0x70, 'f22': 0x71, 'f23': 0x72, 'f24': 0x73,
-    'mute': 0x7f, 'volumeup': 0x80, 'volumedown': 0x81,
-    'cut': 0x7b, 'copy': 0x7c, 'paste': 0x7d,
-    'playpause': 0xe8, 'stop': 0xe9, 'prev': 0xea, 'next': 0xeb,
-}
-
-
 class MiniKBDevice:
     """USB communication with the mini keyboard"""
 
@@ -127,7 +102,7 @@ def main():
 
     if args.list_keys:
         print("Available keys:")
-        for name in sorted(HID_KEYCODES.keys()):
+        for name in sorted(name for name in keycodes.KEYCODE_TO_NAME if name):
             print(f"  {name}")
         return
 
@@ -160,7 +135,8 @@ def main():
 
         for btn_name, key_name in config.items():
             btn_id = BUTTONS.get(btn_name.lower().replace(' ', '_').replace('-', '_'))
-            keycode = HID_KEYCODES.get(key_name.lower(), 0x00)
+            # Display names from GUI-saved configs resolve like in the GUI
+            keycode = keycodes.keycode(key_name, 0x00)
 
             if btn_id:
                 device.set_key(btn_id, keycode)
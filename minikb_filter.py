@@ -3,14 +3,25 @@
 MiniKB Filter - Removes hardcoded Ctrl modifier from mini keyboard
 Runs as a daemon, intercepts events and re-emits them without Ctrl
 
+Forwarded events are also published on a Unix socket (see event_bus.py)
+for the GUI monitor, status bars and scripts, and the held keys in the
+shared state block (see live_state.py).
+
 Usage:
     sudo python3 minikb_filter.py
+    sudo python3 minikb_filter.py --socket /run/minikb-events.sock --queue-size 512
+    sudo kill -USR1 $(pgrep -f minikb_filter.py)    # print subscriber lag counters
 
 Requires: pip install evdev
 """
 
 import sys
+import argparse
 import asyncio
+import fcntl
+import signal
+import struct
+import time
 
 try:
     import evdev
@@ -19,6 +30,10 @@ except ImportError:
     print("Error: evdev not installed. Run: pip install evdev")
     sys.exit(1)
 
+from event_bus import DEFAULT_SOCKET, QUEUE_SIZE, EventBroadcaster
+from keycodes import EVDEV_MODIFIER_BITS, EVDEV_TO_HID
+from live_state import DEFAULT_PATH as DEFAULT_STATE, StateWriter
+
 # USB ID of the mini keyboard
 VENDOR_ID = 0x1189
 PRODUCT_ID = 0x8890
@@ -26,6 +41,9 @@ PRODUCT_ID = 0x8890
 # Keys to filter out (Left Ctrl)
 FILTERED_KEYS = {ecodes.KEY_LEFTCTRL}
 
+# EVIOCSCLOCKID: event timestamps on CLOCK_MONOTONIC for the event bus
+EVIOCSCLOCKID = 0x400445a0
+
 
 def find_minikb_devices():
     """Find all input devices matching our keyboard"""
@@ -40,13 +58,24 @@ def find_minikb_devices():
     return devices
 
 
-async def filter_device(device, uinput):
-    """Filter events from one device"""
+async def filter_device(device, uinput, bus=None, state=None, held=None):
+    """Filter events from one device, publishing forwarded ones on bus
+
+    state (live_state.StateWriter) gets the HID keycodes in held, a set
+    shared by all devices of the keyboard.
+    """
     print(f"Filtering: {device.path} - {device.name}")
 
     # Grab the device so original events don't pass through
     device.grab()
 
+    try:
+        fcntl.ioctl(device.fd, EVIOCSCLOCKID, struct.pack('i', time.CLOCK_MONOTONIC))
+        clock_offset = 0
+    except OSError:
+        clock_offset = time.monotonic_ns() - time.time_ns()
+
+    modifier = 0x00
     try:
         async for event in device.async_read_loop():
             if event.type == ecodes.EV_KEY:
@@ -56,13 +85,32 @@ async def filter_device(device, uinput):
                 # Pass through other key events
                 uinput.write_event(event)
                 uinput.syn()
+                bit = EVDEV_MODIFIER_BITS.get(event.code, 0)
+                if bit:
+                    modifier = modifier | bit if event.value else modifier & ~bit
+                if state is not None and event.value != 2:
+                    keycode = EVDEV_TO_HID.get(event.code)
+                    if keycode:
+                        if event.value:
+                            held.add(keycode)
+                        else:
+                            held.discard(keycode)
+                    state.set_keys(held, modifier,
+                                   event.sec * 1_000_000_000 + event.usec * 1000 + clock_offset)
             elif event.type == ecodes.EV_SYN:
                 # Sync events
-                pass
+                continue
             else:
                 # Pass through other events (REL for encoder, etc)
                 uinput.write_event(event)
                 uinput.syn()
+
+            # Published after forwarding; publish() only queues
+            if bus is not None:
+                bus.publish(event.sec * 1_000_000_000 + event.usec * 1000 + clock_offset,
+                            event.type, event.code, event.value,
+                            EVDEV_TO_HID.get(event.code, 0) if event.type == ecodes.EV_KEY else 0,
+                            modifier)
     except OSError:
         print(f"Device disconnected: {device.path}")
     finally:
@@ -85,7 +133,16 @@ def create_virtual_keyboard():
     return ui
 
 
-async def main():
+def print_bus_stats(bus):
+    """Print event bus lag counters (SIGUSR1)"""
+    subscribers = bus.stats()
+    print(f"Event bus: {bus.published} event(s) published, {len(subscribers)} subscriber(s)")
+    for sub in subscribers:
+        print(f"  pid {sub['pid']}: sent={sub['sent']} dropped={sub['dropped']} "
+              f"queued={sub['queued']} max_queued={sub['max_queued']}")
+
+
+async def main(args):
     print("MiniKB Filter - Removes Ctrl modifier from keyboard events")
     print(f"Looking for device {VENDOR_ID:04x}:{PRODUCT_ID:04x}...")
 
@@ -103,17 +160,43 @@ async def main():
     # Create virtual keyboard for output
     uinput = create_virtual_keyboard()
 
+    bus = None
+    if not args.no_bus:
+        try:
+            bus = EventBroadcaster(args.socket, queue_size=args.queue_size,
+                                   mode=args.socket_mode, group=args.socket_group)
+            await bus.start()
+            print(f"Publishing events on {args.socket}")
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, print_bus_stats, bus)
+        except (OSError, ValueError) as e:
+            print(f"Event bus disabled: {e}")
+            bus = None
+
     print("\nFiltering started. Press Ctrl+C to stop.")
     print("Filtered keys: Left Ctrl")
 
     # Create tasks for all devices
-    tasks = [filter_device(dev, uinput) for dev in devices]
+    state = None
+    if not args.no_state:
+        try:
+            state = StateWriter(args.state)
+            print(f"Live state in {args.state}")
+        except OSError as e:
+            print(f"Live state disabled: {e}")
+
+    held = set()
+    tasks = [filter_device(dev, uinput, bus, state, held) for dev in devices]
 
     try:
         await asyncio.gather(*tasks)
     except KeyboardInterrupt:
         print("\nStopping...")
     finally:
+        if bus is not None:
+            await bus.close()
+        if state is not None:
+            state.set_keys((), 0)
+            state.close()
         uinput.close()
         for dev in devices:
             try:
@@ -127,4 +210,19 @@ if __name__ == "__main__":
         print("This script only works on Linux")
         sys.exit(1)
 
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description='Remove the hardcoded Ctrl modifier from the MiniKB')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f'Event bus socket (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--socket-mode', type=lambda value: int(value, 8),
+                        help='Event bus socket permissions, octal (default: 660 with --socket-group, else 600)')
+    parser.add_argument('--socket-group',
+                        help='Group allowed to subscribe (default: only the sudo caller)')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help=f'Events queued per subscriber before the oldest is dropped (default: {QUEUE_SIZE})')
+    parser.add_argument('--no-bus', action='store_true', help='Do not publish events')
+    parser.add_argument('--state', default=DEFAULT_STATE,
+                        help=f'Shared live state file (default: {DEFAULT_STATE})')
+    parser.add_argument('--no-state', action='store_true', help='Do not publish the live state')
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -6,12 +6,33 @@ USB ID: 1189:8890 (Acer Communications & Multimedia)
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import argparse
+import errno
+import fcntl
+import functools
+import glob
 import json
+import logging
 import os
+import select
+import socket
+import struct
 import threading
 import time
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime
 
+from keycodes import (DISPLAY_KEYCODES, DISPLAY_NAMES, EVDEV_MODIFIER_BITS, EVDEV_TO_HID,
+                      MAX_MACRO_LENGTH, display_name, modifier_string)
+from color_catch import ColorCatcher, format_result, load_calibration, save_calibration
+from event_bus import DEFAULT_SOCKET, BusEvent, read_events, subscribe
+from hid_trace import TraceSink, TraceWriter, replay
+from input_stats import CONTROL_INDEX, CONTROLS, InputStats
+from led_patterns import PATTERNS, PatternEngine, mode_sweep
+from live_state import DEFAULT_PATH as DEFAULT_STATE, StateWriter
+from transfer_trace import TransferTracer
+
 # YAML config support (ch57x-keyboard-tool compatible)
 try:
     from yaml_config import apply_yaml_to_device, parse_yaml_config
@@ -27,12 +48,59 @@ except ImportError:
     USB_AVAILABLE = False
     print("Warning: pyusb not installed. Run: pip install pyusb")
 
+# evdev monitor source (optional, Linux only)
+try:
+    import evdev
+    from evdev import ecodes
+    EVDEV_AVAILABLE = True
+except ImportError:
+    EVDEV_AVAILABLE = False
+
+log = logging.getLogger('minikb')
+
+# Log level below DEBUG for per-packet traffic (raw reports in the Live Monitor)
+RAW = 5
+logging.addLevelName(RAW, 'RAW')
+
+LOG_LEVELS = {
+    'raw': RAW,
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
 # USB device identifiers
 VENDOR_ID = 0x1189
 PRODUCT_ID = 0x8890
 ENDPOINT_OUT = 0x02
 ENDPOINT_IN = 0x81  # Interrupt IN endpoint for reading keypresses
 
+# uinput device created by minikb_filter.py
+FILTERED_DEVICE_NAME = "MiniKB Filtered"
+
+# EVIOCSCLOCKID: switch an evdev fd to CLOCK_MONOTONIC event timestamps
+EVIOCSCLOCKID = 0x400445a0
+
+INIT_PACKET = bytes([0x03] + [0x00] * 64)
+
+# Reconnect after a reset or replug: give up after RECONNECT_TIMEOUT seconds,
+# waiting RECONNECT_DELAYS between attempts (the last one repeats)
+RECONNECT_TIMEOUT = 10.0
+RECONNECT_DELAYS = (0.0, 0.01, 0.02, 0.05, 0.1, 0.25)
+# A write from the UI thread only waits this long inline; the rest of the
+# recovery continues in a background thread
+INTERACTIVE_RECONNECT_TIMEOUT = 0.3
+# ...and waits this long for a write of another thread (e.g. a color catch,
+# which holds the lock from Rainbow to FREEZE) before reporting it busy
+INTERACTIVE_LOCK_TIMEOUT = 0.5
+
+# errno of a failed transfer -> how the transport reacts (see classify_error)
+TRANSIENT_ERRNOS = frozenset({errno.ETIMEDOUT, errno.EPIPE, errno.EOVERFLOW, errno.EINTR,
+                              errno.EAGAIN, errno.EPROTO})
+DISCONNECT_ERRNOS = frozenset({errno.ENODEV, errno.ENOENT, errno.ENXIO, errno.EIO,
+                               errno.ESHUTDOWN, errno.EBADF})
+
 # Button identifiers for the device (6 keys + encoder with button)
 BUTTONS = {
     'Button 1': 0x01,
@@ -49,61 +117,6 @@ BUTTONS = {
 # Reverse lookup for button names
 BUTTON_ID_TO_NAME = {v: k for k, v in BUTTONS.items()}
 
-# USB HID Key codes
-HID_KEYCODES = {
-    'None': 0x00,
-    'A': 0x04, 'B': 0x05, 'C': 0x06, 'D': 0x07, 'E': 0x08,
-    'F': 0x09, 'G': 0x0a, 'H': 0x0b, 'I': 0x0c, 'J': 0x0d,
-    'K': 0x0e, 'L': 0x0f, 'M': 0x10, 'N': 0x11, 'O': 0x12,
-    'P': 0x13, 'Q': 0x14, 'R': 0x15, 'S': 0x16, 'T': 0x17,
-    'U': 0x18, 'V': 0x19, 'W': 0x1a, 'X': 0x1b, 'Y': 0x1c, 'Z': 0x1d,
-    '1': 0x1e, '2': 0x1f, '3': 0x20, '4': 0x21, '5': 0x22,
-    '6': 0x23, '7': 0x24, '8': 0x25, '9': 0x26, '0': 0x27,
-    'Enter': 0x28, 'Escape': 0x29, 'Backspace': 0x2a, 'Tab': 0x2b,
-    'Space': 0x2c, 'Minus': 0x2d, 'Equal': 0x2e,
-    'Left Bracket': 0x2f, 'Right Bracket': 0x30, 'Backslash': 0x31,
-    'Semicolon': 0x33, 'Apostrophe': 0x34, 'Grave': 0x35,
-    'Comma': 0x36, 'Period': 0x37, 'Slash': 0x38,
-    'Caps Lock': 0x39,
-    'F1': 0x3a, 'F2': 0x3b, 'F3': 0x3c, 'F4': 0x3d, 'F5': 0x3e, 'F6': 0x3f,
-    'F7': 0x40, 'F8': 0x41, 'F9': 0x42, 'F10': 0x43, 'F11': 0x44, 'F12': 0x45,
-    'Print Screen': 0x46, 'Scroll Lock': 0x47, 'Pause': 0x48,
-    'Insert': 0x49, 'Home': 0x4a, 'Page Up': 0x4b,
-    'Delete': 0x4c, 'End': 0x4d, 'Page Down': 0x4e,
-    'Right Arrow': 0x4f, 'Left Arrow': 0x50, 'Down Arrow': 0x51, 'Up Arrow': 0x52,
-    'Num Lock': 0x53,
-    'Numpad /': 0x54, 'Numpad *': 0x55, 'Numpad -': 0x56, 'Numpad +': 0x57,
-    'Numpad Enter': 0x58,
-    'Numpad 1': 0x59, 'Numpad 2': 0x5a, 'Numpad 3': 0x5b,
-    'Numpad 4': 0x5c, 'Numpad 5': 0x5d, 'Numpad 6': 0x5e,
-    'Numpad 7': 0x5f, 'Numpad 8': 0x60, 'Numpad 9': 0x61,
-    'Numpad 0': 0x62, 'Numpad .': 0x63,
-    'F13': 0x68, 'F14': 0x69, 'F15': 0x6a, 'F16': 0x6b,
-    'F17': 0x6c, 'F18': 0x6d, 'F19': 0x6e, 'F20': 0x6f,
-    'F21': 0x70, 'F22': 0x71, 'F23': 0x72, 'F24': 0x73,
-    'Mute': 0x7f, 'Volume Up': 0x80, 'Volume Down': 0x81,
-    'Cut': 0x7b, 'Copy': 0x7c, 'Paste': 0x7d,
-    'Media Play/Pause': 0xe8, 'Media Stop': 0xe9,
-    'Media Prev': 0xea, 'Media Next': 0xeb,
-    'Media Mute': 0xef, 'Media Vol Up': 0xed, 'Media Vol Down': 0xee,
-}
-
-# Reverse lookup
-KEYCODE_TO_NAME = {v: k for k, v in HID_KEYCODES.items()}
-
-# Modifier key names
-MODIFIER_NAMES = {
-    0x01: 'L-Ctrl',
-    0x02: 'L-Shift',
-    0x04: 'L-Alt',
-    0x08: 'L-Meta',
-    0x10: 'R-Ctrl',
-    0x20: 'R-Shift',
-    0x40: 'R-Alt',
-    0x80: 'R-Meta',
-}
-
-
 # LED colors supported by ch57x protocol (from ch57x-keyboard-tool)
 LED_COLORS = {
     'Off': 0,
@@ -127,6 +140,46 @@ LED_MODES = {
 }
 
 
+def classify_error(error):
+    """How to handle a failed transfer (pyusb USBError or OSError from hidraw)
+
+    Returns:
+        'transient' (retry the transfer), 'disconnected' (reconnect) or
+        'fatal' (e.g. permissions; report it)
+    """
+    code = getattr(error, 'errno', None)
+    if code in TRANSIENT_ERRNOS:
+        return 'transient'
+    if code in DISCONNECT_ERRNOS:
+        return 'disconnected'
+    return 'fatal'
+
+
+def led_mode_packets(mode):
+    """Init, mode and finish packets of the ch57x LED mode command"""
+    return (bytes([0x03, 0xa1, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]),
+            bytes([0x03, 0xb0, 0x18, mode, 0x00, 0x00, 0x00, 0x00, 0x00]),
+            bytes([0x03, 0xaa, 0xa1, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]))
+
+
+def _traced(keep_empty=True):
+    """Run a device operation in a span of the device's TransferTracer, if any
+
+    Args:
+        keep_empty: record the span even without transfers (False for polls)
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.tracer is None:
+                return method(self, *args, **kwargs)
+            detail = {'args': ', '.join(map(repr, args))[:80]} if args else {}
+            with self.tracer.span(method.__name__, keep_empty, **detail):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
 class MiniKBDevice:
     """USB communication with the mini keyboard"""
 
@@ -135,9 +188,44 @@ class MiniKBDevice:
         self.was_kernel_driver_active = {}
         self.interface_claimed = []
         self.rgb_log_callback = None
+        self.rgb_log_level = logging.INFO  # lowest level passed to rgb_log_callback
+        self.trace_sink = None  # hid_trace.TraceSink recording OUT packets
+        self.tracer = None  # transfer_trace.TransferTracer: every transfer, grouped by operation
+        self.state = None  # live_state.StateWriter for LED mode and layer 0 keys
+        # One packet session at a time: LED patterns write from their own thread
+        self.lock = threading.RLock()
+        self._recovered = threading.Condition(self.lock)  # notified when reconnect() ends
+        self.reconnect_timeout = RECONNECT_TIMEOUT  # 0 = report errors, never reconnect
+        # Thread that must not block for long (the Tk thread): its failed
+        # writes reconnect for INTERACTIVE_RECONNECT_TIMEOUT at most
+        self.interactive_thread = None
+        self.on_reconnect = None  # called with the recovery time in seconds
+        self.led_mode = None  # last mode set, restored after a reconnect
+        self.generation = 0  # bumped by every (re)connect
+        self.reconnects = 0
+        self.last_recovery = None
+        self._session = None  # packets of the open programming session
+        self._recovering = None  # thread running reconnect()
+        self._all_endpoints = []
 
+    @_traced()
     def connect(self):
         """Find and connect to the device"""
+        self._open()
+
+        # Find and cache all endpoints
+        self._all_endpoints = self.find_all_in_endpoints()
+        print(f"Found {len(self._all_endpoints)} IN endpoint(s)")
+        for ep_addr, ep_size, intf in self._all_endpoints:
+            print(f"  -> 0x{ep_addr:02x} size={ep_size} interface={intf}")
+
+        # Send init packet
+        self._send_packet(INIT_PACKET)
+        self.generation += 1
+        return True
+
+    def _open(self):
+        """Find the device, detach the kernel drivers and claim its interfaces"""
         if not USB_AVAILABLE:
             raise RuntimeError("pyusb not installed")
 
@@ -166,15 +254,15 @@ class MiniKBDevice:
             except usb.core.USBError:
                 pass
 
-        # Find and cache all endpoints
-        self._all_endpoints = self.find_all_in_endpoints()
-        print(f"Found {len(self._all_endpoints)} IN endpoint(s)")
-        for ep_addr, ep_size, intf in self._all_endpoints:
-            print(f"  -> 0x{ep_addr:02x} size={ep_size} interface={intf}")
-
-        # Send init packet
-        self._send_packet(bytes([0x03] + [0x00] * 64))
-        return True
+    def _dispose(self):
+        """Drop a dead handle without talking to the device"""
+        if self.device is not None:
+            try:
+                usb.util.dispose_resources(self.device)
+            except usb.core.USBError:
+                pass
+        self.device = None
+        self.interface_claimed = []
 
     def disconnect(self):
         """Disconnect from the device"""
@@ -205,8 +293,183 @@ class MiniKBDevice:
         """Send a 65-byte packet to the device"""
         if len(data) < 65:
             data = data + bytes(65 - len(data))
+        if self.trace_sink:
+            self.trace_sink.record(ENDPOINT_OUT, data)
+        if self._session is not None:
+            self._session.append(data)
+        generation = self.generation
+        try:
+            self._transfer_out(data)
+        except OSError as e:
+            self._recover(e, data, generation)
+
+    def _check_connected(self):
+        """Raise RuntimeError unless the device can take packets now"""
+        if self._recovering and self._recovering is not threading.current_thread():
+            raise RuntimeError("Device is reconnecting")
+        if self.device is None:
+            raise RuntimeError("Not connected")
+
+    def _acquire(self):
+        """Take the device lock; the interactive thread gives up instead of
+        waiting while another thread reconnects or holds it for long"""
+        if threading.current_thread() is not self.interactive_thread:
+            self.lock.acquire()
+            return
+        deadline = time.monotonic() + INTERACTIVE_LOCK_TIMEOUT
+        while not self.lock.acquire(timeout=0.05):
+            if self._recovering:
+                raise RuntimeError("Device is reconnecting")
+            if time.monotonic() > deadline:
+                raise RuntimeError("Device is busy (another write is in progress)")
+
+    @contextmanager
+    def _programming_session(self):
+        """Hold the device lock and remember the packets sent, so a session cut
+        by a reconnect can be replayed from its start packet"""
+        self._acquire()
+        try:
+            # The lock is free between reconnect attempts of another thread
+            self._check_connected()
+            self._session = []
+            try:
+                yield
+            finally:
+                self._session = None
+        finally:
+            self.lock.release()
+
+    def _recover(self, error, data, generation):
+        """Handle a failed write: retry a transient error once, reconnect
+        after a disconnect (which replays the open session), else re-raise"""
+        kind = classify_error(error)
+        if kind == 'transient' and not self._recovering:
+            try:
+                self._transfer_out(data)
+                return
+            except OSError as e:
+                error, kind = e, classify_error(e)
+        # generation 0: the first connect() has not finished, nothing to go back to
+        if kind == 'fatal' or self._recovering or not self.reconnect_timeout or not self.generation:
+            raise error
+
+        log.warning("Write failed (%s), reconnecting", error)
+        if threading.current_thread() is not self.interactive_thread:
+            self.reconnect(generation=generation)
+        else:
+            try:
+                self.reconnect(min(INTERACTIVE_RECONNECT_TIMEOUT, self.reconnect_timeout), generation)
+            except RuntimeError:
+                # Keep trying off the UI thread; this write fails now. The
+                # reconnect waits for the lock, i.e. until this session is
+                # abandoned, so it does not replay it.
+                threading.Thread(target=self._background_reconnect, args=(generation,),
+                                 daemon=True, name='reconnect').start()
+                raise
+        if self._session is None:
+            self._transfer_out(data)
+
+    def _background_reconnect(self, generation):
+        try:
+            self.reconnect(generation=generation)
+        except RuntimeError as e:
+            self._log_rgb(f"Reconnect failed: {e}", logging.ERROR)
+
+    @_traced()
+    def reconnect(self, timeout=None, generation=None):
+        """Reopen the device after it reset or was replugged
+
+        Retries with bounded backoff (RECONNECT_DELAYS), reusing the endpoint
+        layout found by connect(), then restores the last LED mode and replays
+        the packets of an interrupted programming session. The device lock
+        is only held for each attempt, unless the caller holds it for its
+        session; other writers fail with "Device is reconnecting" meanwhile
+        and a second reconnect() waits for the running one.
+
+        Args:
+            timeout: seconds to keep trying (default: reconnect_timeout)
+            generation: the generation the caller saw fail; if the device was
+                reconnected since, nothing is done
+
+        Returns:
+            seconds until the device was usable again (0 if nothing was done)
+
+        Raises:
+            RuntimeError: if the device is not back within timeout
+        """
+        timeout = self.reconnect_timeout if timeout is None else timeout
+        start = time.monotonic()
+        with self.lock:
+            while self._recovering:
+                remaining = start + timeout - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError("Device is reconnecting")
+                self._recovered.wait(remaining)
+            if generation is not None and generation != self.generation:
+                return 0.0
+            self._recovering = threading.current_thread()
+            self._dispose()
+
+        try:
+            attempt = 0
+            while True:
+                with self.lock:
+                    try:
+                        self._open()
+                        self._transfer_out(INIT_PACKET)
+                        if self.led_mode is not None:
+                            for packet in led_mode_packets(self.led_mode):
+                                self._transfer_out(packet + bytes(65 - len(packet)))
+                        for packet in self._session or ():
+                            self._transfer_out(packet)
+                        self.generation += 1
+                        break
+                    except (RuntimeError, OSError) as e:
+                        self._dispose()
+                        error = e
+                delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+                if time.monotonic() + delay - start > timeout:
+                    raise RuntimeError(f"Device not back after {timeout:.1f}s: {error}") from error
+                # Sleep without the lock (unless the caller's session holds it)
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            with self.lock:
+                self._recovering = None
+                self._recovered.notify_all()
+        replayed = f", {len(self._session)} session packet(s) replayed" if self._session else ""
+
+        seconds = time.monotonic() - start
+        self.reconnects += 1
+        self.last_recovery = seconds
+        self._log_rgb(f"Reconnected in {seconds * 1000:.0f} ms after {attempt + 1} attempt(s){replayed}",
+                      logging.WARNING)
+        if self.on_reconnect:
+            self.on_reconnect(seconds)
+        return seconds
+
+    def _write(self, data):
+        """Write one padded packet to the OUT endpoint"""
         self.device.write(ENDPOINT_OUT, data, timeout=1000)
 
+    def _transfer_out(self, data):
+        """_write() with the transfer recorded by the tracer"""
+        if self.tracer is None:
+            self._write(data)
+            return
+        start = time.monotonic_ns()
+        try:
+            self._write(data)
+        except Exception as e:
+            self.tracer.transfer('out', ENDPOINT_OUT, data, start, time.monotonic_ns(), e)
+            raise
+        self.tracer.transfer('out', ENDPOINT_OUT, data, start, time.monotonic_ns())
+
+    def _trace_in(self, endpoint, data, start_ns, error=None):
+        """Record an IN transfer that started at start_ns"""
+        if self.tracer is not None:
+            self.tracer.transfer('in', endpoint, data, start_ns, time.monotonic_ns(), error)
+
     def find_all_in_endpoints(self):
         """Find all interrupt IN endpoints"""
         endpoints = []
@@ -230,6 +493,7 @@ class MiniKBDevice:
             return endpoints[0][0], endpoints[0][1]
         return ENDPOINT_IN, 64
 
+    @_traced(keep_empty=False)
     def read_input(self, timeout=100):
         """Read input from all IN endpoints (non-blocking with timeout)"""
         if self.device is None:
@@ -237,16 +501,62 @@ class MiniKBDevice:
 
         results = []
         for ep_addr, ep_size, intf in self._all_endpoints:
+            start = time.monotonic_ns()
             try:
                 data = self.device.read(ep_addr, ep_size, timeout=timeout)
                 if data:
-                    results.append((ep_addr, bytes(data)))
+                    data = bytes(data)
+                    results.append((ep_addr, data))
+                    self._trace_in(ep_addr, data, start)
             except usb.core.USBError as e:
-                if e.errno not in (110, 75) and 'timeout' not in str(e).lower():
-                    pass  # ignore timeouts and overflows
+                # Timeouts and overflows just mean nothing to read
+                if classify_error(e) == 'disconnected':
+                    self._trace_in(ep_addr, b'', start, e)
+                    raise
 
         return results if results else None
 
+    def _begin_layer(self, layer):
+        """Send the start packet of a layer programming session"""
+        layer_byte = layer + 1  # layer 0 -> 1
+        start_packet = bytes([0x03, 0xfe, layer_byte, 0x01, 0x01, 0x00, 0x00, 0x00, 0x00])
+        self._send_packet(start_packet)
+
+    def _commit(self):
+        """Send the end/commit packet closing a programming session"""
+        end_packet = bytes([0x03, 0xaa, 0xaa, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+        self._send_packet(end_packet)
+
+    def _send_key(self, button_id, keycode, modifier, layer):
+        """Send the key packet(s) for one button inside an open session"""
+        self._send_macro(button_id, [(keycode, modifier)], layer)
+
+    def _send_macro(self, button_id, sequence, layer):
+        """Send the packets of a keystroke sequence inside an open session.
+
+        Each chord goes in its own packet, with byte 3 holding the sequence
+        length and byte 4 the chord index.
+        """
+        if len(sequence) > MAX_MACRO_LENGTH:
+            raise ValueError(f"Macro too long: {len(sequence)} keys (max {MAX_MACRO_LENGTH})")
+
+        layer_byte = layer + 1
+        sequence = [(keycode, modifier) for keycode, modifier in sequence if keycode or modifier]
+
+        if not sequence:
+            # Clear key - type byte with clear flag
+            clear_packet = bytes([0x03, button_id, (layer_byte << 4) | 0x00] + [0x00] * 62)
+            self._send_packet(clear_packet)
+            return
+
+        # Byte 2: ((layer+1)<<4)|0x01 for keyboard type
+        type_byte = (layer_byte << 4) | 0x01
+        length = len(sequence)
+        for index, (keycode, modifier) in enumerate(sequence):
+            key_packet = bytes([0x03, button_id, type_byte, length, index, modifier, keycode, 0x00, 0x00])
+            self._send_packet(key_packet)
+
+    @_traced()
     def set_key(self, button_id, keycode, modifier=0x00, layer=0):
         """Program a button with a specific keycode and modifier.
 
@@ -257,50 +567,62 @@ class MiniKBDevice:
 
         modifier: 0x00=none, 0x01=LCtrl, 0x02=LShift, 0x04=LAlt, etc.
         """
-        if self.device is None:
-            raise RuntimeError("Not connected")
+        self.set_macro(button_id, [(keycode, modifier)], layer)
 
-        layer_byte = layer + 1  # layer 0 -> 1
+    @_traced()
+    def set_macro(self, button_id, sequence, layer=0):
+        """Program a button with a sequence of (keycode, modifier) chords.
 
-        # Start sequence
-        start_packet = bytes([0x03, 0xfe, layer_byte, 0x01, 0x01, 0x00, 0x00, 0x00, 0x00])
-        self._send_packet(start_packet)
+        The whole sequence (up to MAX_MACRO_LENGTH chords) is written in one
+        session: start packet, one key packet per chord, commit packet.
+        """
+        self._check_connected()
 
-        if keycode == 0x00:
-            # Clear key - type byte with clear flag
-            clear_packet = bytes([0x03, button_id, (layer_byte << 4) | 0x00] + [0x00] * 62)
-            self._send_packet(clear_packet)
-        else:
-            # Set keyboard key
-            # Byte 2: ((layer+1)<<4)|0x01 for keyboard type
-            type_byte = (layer_byte << 4) | 0x01
-            # length=1 (single keypress), index=0 (first key)
-            key_packet = bytes([0x03, button_id, type_byte, 0x01, 0x00, modifier, keycode, 0x00, 0x00])
-            self._send_packet(key_packet)
+        with self._programming_session():
+            self._begin_layer(layer)
+            self._send_macro(button_id, sequence, layer)
+            self._commit()
 
-        # End/commit sequence
-        end_packet = bytes([0x03, 0xaa, 0xaa, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-        self._send_packet(end_packet)
+    @_traced()
+    def program_layer(self, bindings, layer=0):
+        """Program several buttons of one layer in a single session.
+
+        Sends one start packet, the key packets of every binding and one
+        commit packet, instead of a full start/key/end triple per button.
+
+        bindings: iterable of (button_id, [(keycode, modifier), ...])
+        """
+        self._check_connected()
+
+        bindings = list(bindings)
+        with self._programming_session():
+            self._begin_layer(layer)
+            for button_id, sequence in bindings:
+                self._send_macro(button_id, sequence, layer)
+            self._commit()
+
+        if self.state and layer == 0:
+            self.state.set_control_keycodes({
+                CONTROL_INDEX[BUTTON_ID_TO_NAME[button_id]]: sequence[0][0] if sequence else 0
+                for button_id, sequence in bindings if button_id in BUTTON_ID_TO_NAME})
 
     def program_all(self, config):
         """Program all buttons from a config dict"""
-        for button_name, button_id in BUTTONS.items():
-            keycode = config.get(button_name, 0x00)
-            self.set_key(button_id, keycode)
+        bindings = [(button_id, [(config.get(button_name, 0x00), 0x00)])
+                    for button_name, button_id in BUTTONS.items()]
+        self.program_layer(bindings)
 
-    def _log_rgb(self, message):
+    def _log_rgb(self, message, level=logging.INFO):
         """Log RGB-related messages"""
-        print(f"DEBUG RGB: {message}")
-        if self.rgb_log_callback:
+        log.log(level, "RGB: %s", message)
+        if self.rgb_log_callback and level >= self.rgb_log_level:
             self.rgb_log_callback(message)
 
     def _send_led_packet(self, data):
-        """Send LED control packet (9 bytes for ch57x protocol)"""
-        # Pad to 65 bytes for USB HID
-        if len(data) < 65:
-            data = data + bytes(65 - len(data))
-        self.device.write(ENDPOINT_OUT, data, timeout=1000)
+        """Send LED control packet (9 bytes for ch57x protocol, padded to 65)"""
+        self._send_packet(data)
 
+    @_traced()
     def set_led_mode(self, mode):
         """Set LED mode using ch57x protocol for 8890 keyboard.
 
@@ -309,27 +631,23 @@ class MiniKBDevice:
         2. Mode:   [0x03, 0xb0, 0x18, <mode>, 0, 0, 0, 0, 0]
         3. Finish: [0x03, 0xaa, 0xa1, 0, 0, 0, 0, 0, 0]
         """
-        if self.device is None:
-            raise RuntimeError("Not connected")
+        self._check_connected()
 
         self._log_rgb(f"Setting LED mode: {mode}")
 
-        # Init packet
-        init_packet = bytes([0x03, 0xa1, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-        self._log_rgb(f"  Init: {init_packet.hex()}")
-        self._send_led_packet(init_packet)
-
-        # Mode packet
-        mode_packet = bytes([0x03, 0xb0, 0x18, mode, 0x00, 0x00, 0x00, 0x00, 0x00])
-        self._log_rgb(f"  Mode: {mode_packet.hex()}")
-        self._send_led_packet(mode_packet)
-
-        # Finish packet
-        finish_packet = bytes([0x03, 0xaa, 0xa1, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-        self._log_rgb(f"  Finish: {finish_packet.hex()}")
-        self._send_led_packet(finish_packet)
+        init_packet, mode_packet, finish_packet = led_mode_packets(mode)
+        with self._programming_session():
+            self._log_rgb(f"  Init: {init_packet.hex()}", logging.DEBUG)
+            self._send_led_packet(init_packet)
+            self._log_rgb(f"  Mode: {mode_packet.hex()}", logging.DEBUG)
+            self._send_led_packet(mode_packet)
+            self._log_rgb(f"  Finish: {finish_packet.hex()}", logging.DEBUG)
+            self._send_led_packet(finish_packet)
+            self.led_mode = mode
 
         self._log_rgb(f"LED mode {mode} set successfully")
+        if self.state:
+            self.state.set_led_mode(mode)
         return True
 
     def set_led_color_mode(self, color_code, mode_code=1):
@@ -340,8 +658,7 @@ class MiniKBDevice:
 
         Combined mode byte might be: (color << 4) | mode
         """
-        if self.device is None:
-            raise RuntimeError("Not connected")
+        self._check_connected()
 
         # Try different encodings
         combined = (color_code << 4) | mode_code
@@ -349,22 +666,264 @@ class MiniKBDevice:
 
         return self.set_led_mode(combined)
 
-    def try_all_led_modes(self, max_mode=20, delay=1.5):
-        """Try all LED modes to find working ones"""
-        if self.device is None:
-            raise RuntimeError("Not connected")
+    def try_all_led_modes(self, max_mode=20, delay=1.5, engine=None):
+        """Try all LED modes to find working ones
+
+        Args:
+            engine: led_patterns.PatternEngine to play the sweep on; returns
+                its handle at once instead of sleeping on this thread
+        """
+        self._check_connected()
 
         self._log_rgb(f"Trying LED modes 0-{max_mode} with {delay}s delay...")
+        if engine:
+            return engine.play(mode_sweep(max_mode, delay))
         for mode in range(max_mode + 1):
             try:
-                self._log_rgb(f"=== MODE {mode} ===")
+                self._log_rgb(f"=== MODE {mode} ===", logging.DEBUG)
                 self.set_led_mode(mode)
                 time.sleep(delay)
             except Exception as e:
-                self._log_rgb(f"Mode {mode} error: {e}")
+                self._log_rgb(f"Mode {mode} error: {e}", logging.ERROR)
+
+        return True
+
+
+HidrawNode = namedtuple('HidrawNode', 'path interface endpoint has_output')
+
 
+def _has_output_report(descriptor):
+    """True if a HID report descriptor declares an Output item"""
+    i = 0
+    while i < len(descriptor):
+        prefix = descriptor[i]
+        if prefix == 0xfe:  # long item
+            i += 3 + (descriptor[i + 1] if i + 1 < len(descriptor) else 0)
+            continue
+        if prefix & 0xfc == 0x90:
+            return True
+        i += 1 + (0, 1, 2, 4)[prefix & 0x03]
+    return False
+
+
+def find_hidraw_nodes(vendor_id=VENDOR_ID, product_id=PRODUCT_ID):
+    """hidraw nodes of the keyboard, one per HID interface, from sysfs"""
+    hid_id = f"HID_ID=0003:{vendor_id:08X}:{product_id:08X}"
+    nodes = []
+    for sysdir in sorted(glob.glob('/sys/class/hidraw/hidraw*')):
+        try:
+            with open(os.path.join(sysdir, 'device', 'uevent')) as f:
+                if hid_id not in f.read().upper().split():
+                    continue
+            with open(os.path.join(sysdir, 'device', 'report_descriptor'), 'rb') as f:
+                has_output = _has_output_report(f.read())
+        except OSError:
+            continue
+
+        # USB interface directory (e.g. 1-2:1.2) holds the interface number and endpoints
+        intf_dir = os.path.realpath(os.path.join(sysdir, 'device', '..'))
+        interface, endpoint = len(nodes), ENDPOINT_IN
+        try:
+            with open(os.path.join(intf_dir, 'bInterfaceNumber')) as f:
+                interface = int(f.read(), 16)
+            for ep_dir in glob.glob(os.path.join(intf_dir, 'ep_*')):
+                address = int(os.path.basename(ep_dir)[3:], 16)
+                if address & 0x80:
+                    endpoint = address
+                    break
+        except (OSError, ValueError):
+            pass
+        nodes.append(HidrawNode('/dev/' + os.path.basename(sysdir), interface, endpoint, has_output))
+    return nodes
+
+
+class HidrawDevice(MiniKBDevice):
+    """MiniKBDevice over /dev/hidrawN instead of libusb.
+
+    The kernel HID driver stays bound: the keyboard keeps typing on the
+    desktop while connected, and connect/disconnect does not re-enumerate
+    the device. Packets go out with os.write on the node that has an output
+    report; read_input waits on every node with epoll.
+    """
+
+    READ_SIZE = 256  # hidraw returns one whole report per read
+
+    def __init__(self, node=None, endpoint=ENDPOINT_IN):
+        """
+        Args:
+            node: hidraw node to use instead of looking the keyboard up in
+                sysfs: a path, or a file descriptor open for reading and
+                writing (e.g. a pty in tests; disconnect leaves it open)
+            endpoint: endpoint address reported with input read from node
+        """
+        super().__init__()
+        self.node = node
+        self.node_endpoint = endpoint
+        self.out_fd = None
+        self.in_fds = {}  # fd -> endpoint address reported with the data
+        self._epoll = None
+        self._owned_fds = []
+
+    @_traced()
+    def connect(self):
+        """Find the keyboard's hidraw nodes and open them"""
+        nodes = self._open()
+        print(f"Found {len(nodes)} hidraw node(s)")
+        for node in nodes:
+            print(f"  -> {node.path} interface={node.interface} endpoint=0x{node.endpoint:02x}"
+                  f"{' (output)' if node.has_output else ''}")
+
+        # Send init packet
+        self._send_packet(INIT_PACKET)
+        self.generation += 1
         return True
 
+    def _open(self):
+        """Open every hidraw node of the keyboard; returns the nodes
+
+        Node numbers can change when the keyboard re-enumerates, so they are
+        looked up again each time (sysfs reads only).
+        """
+        if self.node is not None:
+            return self._open_node()
+        nodes = find_hidraw_nodes()
+        if not nodes:
+            raise RuntimeError(f"No hidraw node for {VENDOR_ID:04x}:{PRODUCT_ID:04x}")
+        out_node = next((node for node in nodes if node.has_output), None)
+        if out_node is None:
+            raise RuntimeError("No hidraw node of the device accepts output reports")
+
+        fds = {}
+        try:
+            for node in nodes:
+                fds[node.path] = os.open(node.path, os.O_RDWR | os.O_NONBLOCK)
+        except OSError as e:
+            for fd in fds.values():
+                os.close(fd)
+            raise RuntimeError(f"Cannot open {node.path}: {e}")
+
+        self.attach(fds[out_node.path], {fds[node.path]: node.endpoint for node in nodes},
+                    owned=fds.values())
+        self.device = out_node.path
+        return nodes
+
+    def _open_node(self):
+        """Open the node given to the constructor as the only node"""
+        if isinstance(self.node, int):
+            fd, path, owned = self.node, f"fd:{self.node}", ()
+        else:
+            path = self.node
+            try:
+                fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+            except OSError as e:
+                raise RuntimeError(f"Cannot open {path}: {e}")
+            owned = (fd,)
+        self.attach(fd, {fd: self.node_endpoint}, owned=owned)
+        self.device = path
+        return [HidrawNode(path, 0, self.node_endpoint, True)]
+
+    def _dispose(self):
+        self.disconnect()
+
+    def attach(self, out_fd, in_fds, owned=()):
+        """Use already open file descriptors, e.g. pipes or a SOCK_SEQPACKET
+        socketpair standing in for the device in tests.
+
+        Args:
+            out_fd: fd packets are written to
+            in_fds: {fd: endpoint address} to read reports from
+            owned: fds to close on disconnect
+        """
+        self.out_fd = out_fd
+        self.in_fds = dict(in_fds)
+        self._owned_fds = list(owned)
+        self._epoll = select.epoll()
+        for fd in self.in_fds:
+            self._epoll.register(fd, select.EPOLLIN)
+        if self.device is None:
+            self.device = f"fd:{out_fd}"
+
+    def disconnect(self):
+        """Close the hidraw nodes; the kernel driver was never detached"""
+        if self._epoll:
+            self._epoll.close()
+            self._epoll = None
+        for fd in self._owned_fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._owned_fds = []
+        self.out_fd = None
+        self.in_fds = {}
+        self.device = None
+
+    def _write(self, data):
+        written = os.write(self.out_fd, data)
+        if written != len(data):
+            raise OSError(f"Short write: {written} of {len(data)} bytes")
+
+    @_traced(keep_empty=False)
+    def read_input(self, timeout=100):
+        """Read the reports pending on all nodes, waiting up to timeout ms"""
+        if self.device is None:
+            return None
+
+        results = []
+        for fd, _ in self._epoll.poll(timeout / 1000):
+            start = time.monotonic_ns()
+            try:
+                data = os.read(fd, self.READ_SIZE)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                self._trace_in(self.in_fds[fd], b'', start, e)
+                raise
+            if not data:
+                raise OSError(errno.ENODEV, "Device closed")
+            results.append((self.in_fds[fd], data))
+            self._trace_in(self.in_fds[fd], data, start)
+
+        return results if results else None
+
+
+class InputEvent:
+    """Monitor event: 'raw', 'press', 'release' or 'error'.
+
+    Holds the report bytes as received; hex and name strings are only
+    formatted when a consumer reads them.
+    """
+
+    __slots__ = ('type', 'data', 'endpoint', 'keycode', 'modifier', 'message', 'timestamp')
+
+    def __init__(self, type, data=b'', endpoint=0, keycode=0, modifier=0, message=None, timestamp=None):
+        self.type = type
+        self.data = data
+        self.endpoint = endpoint
+        self.keycode = keycode
+        self.modifier = modifier
+        self.message = message
+        self.timestamp = timestamp  # time.monotonic() clock: decode time, or kernel time for evdev
+
+    @property
+    def hex(self):
+        return self.data.hex()
+
+    @property
+    def byte_list(self):
+        return list(self.data)
+
+    @property
+    def key_name(self):
+        return display_name(self.keycode)
+
+    @property
+    def modifier_str(self):
+        return modifier_string(self.modifier)
+
+    def __repr__(self):
+        return f"InputEvent({self.type!r}, {self.hex}, endpoint=0x{self.endpoint:02x})"
+
 
 class InputMonitor:
     """Monitor keyboard input in a background thread"""
@@ -375,6 +934,27 @@ class InputMonitor:
         self.running = False
         self.thread = None
         self.last_keys = set()
+        self.recorder = None
+        self._record_lock = threading.Lock()
+        self.sink = None  # hid_trace.TraceSink for the continuous debug trace
+        self.raw_events = True  # emit 'raw' events (one per report) to callback
+
+    def start_recording(self, path):
+        """Write every raw report to a trace file (see hid_trace.py)"""
+        writer = TraceWriter(path)
+        with self._record_lock:
+            previous, self.recorder = self.recorder, writer
+        if previous:
+            previous.close()
+
+    def stop_recording(self):
+        """Close the trace file; returns the number of reports recorded"""
+        with self._record_lock:
+            writer, self.recorder = self.recorder, None
+        if writer is None:
+            return 0
+        writer.close()
+        return writer.count
 
     def start(self):
         """Start monitoring"""
@@ -390,32 +970,48 @@ class InputMonitor:
         if self.thread:
             self.thread.join(timeout=0.5)
             self.thread = None
+        self.stop_recording()
 
     def _monitor_loop(self):
         """Main monitoring loop"""
         while self.running:
+            generation = self.device.generation
             try:
                 results = self.device.read_input(timeout=50)
                 if results:
+                    timestamp = time.monotonic_ns()
                     for ep_addr, data in results:
+                        if self.sink is not None:
+                            self.sink.record(ep_addr, data, timestamp)
+                        if self.recorder is not None:
+                            with self._record_lock:
+                                if self.recorder is not None:
+                                    self.recorder.write(ep_addr, data, timestamp)
                         self._process_input(data, ep_addr)
             except Exception as e:
-                if self.running:
-                    self.callback({'type': 'error', 'message': str(e)})
-                    time.sleep(0.5)
+                if not self.running:
+                    break
+                if (isinstance(e, OSError) and classify_error(e) == 'disconnected'
+                        and self.device.reconnect_timeout and generation):
+                    # Does nothing if a writer already reconnected
+                    self.callback(InputEvent('error', message=f"Device lost ({e}), reconnecting..."))
+                    try:
+                        self.device.reconnect(generation=generation)
+                        continue
+                    except RuntimeError as e2:
+                        e = e2
+                self.callback(InputEvent('error', message=str(e)))
+                time.sleep(0.5)
 
     def _process_input(self, data, ep_addr=0):
         """Process HID input data"""
         if len(data) < 1:
             return
 
-        # Always log raw data for debugging
-        self.callback({
-            'type': 'raw',
-            'endpoint': ep_addr,
-            'data': data.hex(),
-            'bytes': list(data)
-        })
+        timestamp = time.monotonic()
+
+        if self.raw_events:
+            self.callback(InputEvent('raw', data, ep_addr, timestamp=timestamp))
 
         # Standard HID keyboard report:
         # Byte 0: Modifier keys
@@ -429,36 +1025,221 @@ class InputMonitor:
         released_keys = self.last_keys - keys
 
         for keycode in new_keys:
-            key_name = KEYCODE_TO_NAME.get(keycode, f"0x{keycode:02X}")
-            mod_str = self._get_modifier_string(modifier)
-            self.callback({
-                'type': 'press',
-                'keycode': keycode,
-                'key_name': key_name,
-                'modifier': mod_str,
-                'raw': data.hex()
-            })
+            self.callback(InputEvent('press', data, ep_addr, keycode, modifier, timestamp=timestamp))
 
         for keycode in released_keys:
-            key_name = KEYCODE_TO_NAME.get(keycode, f"0x{keycode:02X}")
-            self.callback({
-                'type': 'release',
-                'keycode': keycode,
-                'key_name': key_name,
-                'raw': data.hex()
-            })
+            self.callback(InputEvent('release', data, ep_addr, keycode, timestamp=timestamp))
 
         self.last_keys = keys
 
-    def _get_modifier_string(self, modifier):
-        """Convert modifier byte to string"""
-        if modifier == 0:
-            return ""
-        mods = []
-        for bit, name in MODIFIER_NAMES.items():
-            if modifier & bit:
-                mods.append(name)
-        return "+".join(mods)
+
+def find_evdev_devices(source='auto'):
+    """Open the evdev input devices to monitor, without grabbing them.
+
+    Args:
+        source: 'device' for the keyboard's own input devices, 'filtered' for
+            the uinput device of minikb_filter.py, 'auto' for the filtered
+            device when the filter runs (it grabs the keyboard) else 'device'
+
+    Returns:
+        List of evdev.InputDevice
+    """
+    devices = []
+    filtered = []
+    for path in evdev.list_devices():
+        try:
+            dev = evdev.InputDevice(path)
+        except OSError:
+            continue
+        if dev.name == FILTERED_DEVICE_NAME:
+            filtered.append(dev)
+        elif (dev.info.vendor == VENDOR_ID and dev.info.product == PRODUCT_ID
+              and ecodes.EV_KEY in dev.capabilities()):
+            devices.append(dev)
+        else:
+            dev.close()
+
+    if source == 'filtered' or (source == 'auto' and filtered):
+        chosen, unused = filtered, devices
+    else:
+        chosen, unused = devices, filtered
+    for dev in unused:
+        dev.close()
+    return chosen
+
+
+class EvdevMonitor:
+    """Monitor keyboard input through evdev in a background thread.
+
+    Reads the kernel's input devices for the keyboard (or the filter's
+    uinput device) without a grab, so the desktop keeps the keys and the
+    USB transport stays free for programming. Events carry the kernel
+    timestamps on the time.monotonic() clock, like InputMonitor's.
+    Only presses and releases are reported; there are no raw HID reports
+    to trace.
+    """
+
+    def __init__(self, callback, source='auto'):
+        self.callback = callback
+        self.source = source
+        self.running = False
+        self.thread = None
+        self.devices = []
+        self.modifier = 0x00
+        self.recorder = None
+        self.sink = None
+        self.raw_events = False
+        self._clock_offset = {}  # fd -> seconds added to event times
+
+    def start_recording(self, path):
+        raise RuntimeError("Traces record USB reports; use the usb monitor source")
+
+    def stop_recording(self):
+        return 0
+
+    def start(self):
+        """Open the devices and start monitoring
+
+        Raises:
+            OSError: if no input device is found
+        """
+        if self.running:
+            return
+        self.devices = find_evdev_devices(self.source)
+        if not self.devices:
+            raise OSError(f"No {'filtered ' if self.source == 'filtered' else ''}MiniKB input device found")
+        for dev in self.devices:
+            try:
+                fcntl.ioctl(dev.fd, EVIOCSCLOCKID, struct.pack('i', time.CLOCK_MONOTONIC))
+                self._clock_offset[dev.fd] = 0.0
+            except OSError:
+                # Older kernels: realtime stamps, shifted onto the monotonic clock
+                self._clock_offset[dev.fd] = time.monotonic() - time.time()
+        self.running = True
+        self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop monitoring and close the devices"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=0.5)
+            self.thread = None
+        for dev in self.devices:
+            dev.close()
+        self.devices = []
+
+    @property
+    def device_names(self):
+        return sorted({dev.name for dev in self.devices})
+
+    def _monitor_loop(self):
+        """Main monitoring loop"""
+        poller = select.epoll()
+        devices = {dev.fd: dev for dev in self.devices}
+        for fd in devices:
+            poller.register(fd, select.EPOLLIN)
+        try:
+            while self.running and devices:
+                for fd, _ in poller.poll(0.05):
+                    try:
+                        for event in devices[fd].read():
+                            self._process_event(event, self._clock_offset[fd])
+                    except BlockingIOError:
+                        pass
+                    except OSError as e:
+                        poller.unregister(fd)
+                        del devices[fd]
+                        if self.running:
+                            self.callback(InputEvent('error', message=f"Input device closed: {e}"))
+        finally:
+            poller.close()
+
+    def _process_event(self, event, clock_offset=0.0):
+        """Turn an evdev key event into a press/release InputEvent"""
+        if event.type != ecodes.EV_KEY or event.value == 2:  # 2 = autorepeat
+            return
+
+        bit = EVDEV_MODIFIER_BITS.get(event.code)
+        if bit:
+            if event.value:
+                self.modifier |= bit
+            else:
+                self.modifier &= ~bit
+            return
+
+        keycode = EVDEV_TO_HID.get(event.code)
+        if keycode is None:
+            return
+
+        timestamp = event.sec + event.usec / 1e6 + clock_offset
+        if event.value:
+            self.callback(InputEvent('press', keycode=keycode, modifier=self.modifier, timestamp=timestamp))
+        else:
+            self.callback(InputEvent('release', keycode=keycode, timestamp=timestamp))
+
+
+class BusMonitor(EvdevMonitor):
+    """Monitor the events minikb_filter.py publishes on its event bus.
+
+    Needs no device access at all; any number of these can run next to
+    the filter. Timestamps are the filter's kernel timestamps.
+    """
+
+    def __init__(self, callback, path=DEFAULT_SOCKET):
+        super().__init__(callback)
+        self.path = path
+        self.sock = None
+
+    @property
+    def device_names(self):
+        return [self.path]
+
+    def start(self):
+        """Subscribe and start monitoring
+
+        Raises:
+            OSError: if the filter's socket cannot be reached
+        """
+        if self.running:
+            return
+        self.sock = subscribe(self.path)
+        self.running = True
+        self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop monitoring and unsubscribe"""
+        self.running = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.thread:
+            self.thread.join(timeout=0.5)
+            self.thread = None
+        self.sock = None
+
+    def _monitor_loop(self):
+        """Main monitoring loop"""
+        try:
+            for event in read_events(self.path, self.sock):
+                if not isinstance(event, BusEvent):
+                    self.callback(InputEvent('error', message=f"Event bus dropped {event[1]} event(s)"))
+                elif event.keycode and event.value != 2:
+                    timestamp = event.timestamp_ns / 1e9
+                    if event.value:
+                        self.callback(InputEvent('press', keycode=event.keycode, modifier=event.modifier,
+                                                 timestamp=timestamp))
+                    else:
+                        self.callback(InputEvent('release', keycode=event.keycode, timestamp=timestamp))
+        except (OSError, ValueError) as e:
+            if self.running:
+                self.callback(InputEvent('error', message=f"Event bus: {e}"))
+            return
+        if self.running:
+            self.callback(InputEvent('error', message="Event bus closed (filter stopped?)"))
 
 
 class MiniKBApp:
@@ -466,27 +1247,61 @@ class MiniKBApp:
 
     CONFIG_FILE = os.path.expanduser("~/.minikb_config.json")
 
-    def __init__(self, root):
+    def __init__(self, root, log_level=logging.INFO, trace_sink=None, transport='usb',
+                 monitor_source=None):
+        """
+        Args:
+            root: Tk root window
+            log_level: lowest level shown in the UI logs (RAW adds raw reports)
+            trace_sink: hid_trace.TraceSink receiving all USB traffic, or None
+            transport: 'usb' (pyusb, detaches the kernel driver) or 'hidraw'
+            monitor_source: Live Monitor input, 'evdev', 'bus' (minikb_filter.py's
+                event bus) or 'usb' (reads the connected device); default evdev
+                when python-evdev is installed
+        """
+        self.started = time.perf_counter()
         self.root = root
         self.root.title("MiniKB Configurator - 6 Keys + Encoder")
         self.root.geometry("750x650")
         self.root.resizable(True, True)
 
-        self.device = MiniKBDevice()
+        self.log_level = log_level
+        self.trace_sink = trace_sink
+        self.device = HidrawDevice() if transport == 'hidraw' else MiniKBDevice()
+        self.device.rgb_log_level = log_level
+        self.device.trace_sink = trace_sink
+        self.device.on_reconnect = lambda seconds: self.root.after(0, self._on_reconnected, seconds)
+        # Failed UI writes reconnect briefly, then hand over to a background thread
+        self.device.interactive_thread = threading.current_thread()
         self.connected = False
         self.config = {}
         self.key_combos = {}
         self.monitor = None
         self.monitoring = False
+        self.monitor_source = tk.StringVar(
+            value=monitor_source or ('evdev' if EVDEV_AVAILABLE else 'usb'))
+        self.stats = InputStats()
+        # LED effects; the timer thread starts with the first pattern played
+        self.patterns = PatternEngine(self.device)
 
         # Button state indicators
         self.button_indicators = {}
 
+        # Key list as one Tcl list string, formatted once for all comboboxes
+        self.key_values = self.root.tk.call('format', '%s', DISPLAY_NAMES)
+
+        # Tabs built the first time they are selected: frame path -> builder
+        self._lazy_tabs = {}
+
+        # Startup milestones in seconds since `started` (see main --startup-report)
+        self.startup_times = {}
+        self.on_interactive = None
+
         self._create_ui()
+        self.startup_times['ui_built'] = time.perf_counter() - self.started
 
-        # Load saved config, or use defaults if no saved config
-        if not self._load_config():
-            self._set_detected_config()
+        # Saved config is loaded once the window has been painted
+        self.root.bind('<Map>', self._on_first_map, add='+')
 
     def _create_ui(self):
         """Create the user interface"""
@@ -522,15 +1337,21 @@ class MiniKBApp:
         self.notebook.add(encoder_frame, text="Encoder Configuration")
         self._create_encoder_tab(encoder_frame)
 
-        # Monitor tab
+        # Monitor, statistics and RGB tabs are built on first selection
         monitor_frame = ttk.Frame(self.notebook, padding="10")
         self.notebook.add(monitor_frame, text="Live Monitor")
-        self._create_monitor_tab(monitor_frame)
+        self._lazy_tabs[str(monitor_frame)] = self._create_monitor_tab
+
+        stats_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(stats_frame, text="Statistics")
+        self.stats_frame = stats_frame
+        self._lazy_tabs[str(stats_frame)] = self._create_stats_tab
 
-        # RGB tab
         rgb_frame = ttk.Frame(self.notebook, padding="10")
         self.notebook.add(rgb_frame, text="RGB Control")
-        self._create_rgb_tab(rgb_frame)
+        self._lazy_tabs[str(rgb_frame)] = self._create_rgb_tab
+
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
 
         # Action buttons
         btn_frame = ttk.Frame(main_frame)
@@ -541,12 +1362,32 @@ class MiniKBApp:
         ttk.Button(btn_frame, text="Load Config", command=self._load_config_file).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Reset to Default", command=self._reset_config).pack(side="right", padx=5)
 
+    def _on_tab_changed(self, event=None):
+        """Build the selected tab if it has not been built yet"""
+        frame = self.notebook.select()
+        builder = self._lazy_tabs.pop(frame, None)
+        if builder:
+            builder(self.notebook.nametowidget(frame))
+
+    def _on_first_map(self, event):
+        """Window is on screen: load the config when Tk is idle again"""
+        if event.widget is not self.root or 'first_paint' in self.startup_times:
+            return
+        self.startup_times['first_paint'] = time.perf_counter() - self.started
+        self.root.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        """Load saved config, or use defaults if no saved config"""
+        if not self._load_config():
+            self._set_detected_config()
+        self.startup_times['interactive'] = time.perf_counter() - self.started
+        if self.on_interactive:
+            self.on_interactive(self.startup_times)
+
     def _create_keys_tab(self, parent):
         """Create the keys configuration tab"""
         # Grid of 6 buttons (2 rows x 3 columns)
         key_names = ['Button 1', 'Button 2', 'Button 3', 'Button 4', 'Button 5', 'Button 6']
-        sorted_keys = list(HID_KEYCODES.keys())
-
         for i, name in enumerate(key_names):
             row = i // 3
             col = i % 3
@@ -556,7 +1397,7 @@ class MiniKBApp:
             parent.columnconfigure(col, weight=1)
             parent.rowconfigure(row, weight=1)
 
-            combo = ttk.Combobox(frame, values=sorted_keys, state="readonly", width=15)
+            combo = ttk.Combobox(frame, values=self.key_values, state="readonly", width=15)
             combo.set("None")
             combo.pack(fill="x")
             self.key_combos[name] = combo
@@ -568,14 +1409,12 @@ class MiniKBApp:
             ('Knob Press', 'Press (Click)'),
             ('Knob Right', 'Rotate CW (Right)'),
         ]
-        sorted_keys = list(HID_KEYCODES.keys())
-
-        for i, (key_name, display_name) in enumerate(encoder_items):
-            frame = ttk.LabelFrame(parent, text=display_name, padding="10")
+        for i, (key_name, label) in enumerate(encoder_items):
+            frame = ttk.LabelFrame(parent, text=label, padding="10")
             frame.grid(row=i, column=0, padx=10, pady=10, sticky="ew")
             parent.columnconfigure(0, weight=1)
 
-            combo = ttk.Combobox(frame, values=sorted_keys, state="readonly", width=20)
+            combo = ttk.Combobox(frame, values=self.key_values, state="readonly", width=20)
             combo.set("None")
             combo.pack(fill="x")
             self.key_combos[key_name] = combo
@@ -594,6 +1433,14 @@ class MiniKBApp:
 
         ttk.Button(ctrl_frame, text="Clear Log", command=self._clear_log).pack(side="left", padx=10)
 
+        self.record_btn = ttk.Button(ctrl_frame, text="Record Trace...", command=self._toggle_recording)
+        self.record_btn.pack(side="left")
+        ttk.Button(ctrl_frame, text="Replay Trace...", command=self._replay_trace).pack(side="left", padx=10)
+
+        ttk.Label(ctrl_frame, text="Source:").pack(side="left")
+        ttk.Combobox(ctrl_frame, textvariable=self.monitor_source, values=('evdev', 'bus', 'usb'),
+                     state="readonly", width=6).pack(side="left", padx=(5, 0))
+
         self.monitor_status = ttk.Label(ctrl_frame, text="Stopped", foreground="gray")
         self.monitor_status.pack(side="right")
 
@@ -640,6 +1487,75 @@ class MiniKBApp:
         self.log_text.tag_configure("time", foreground="gray")
         self.log_text.tag_configure("raw", foreground="blue")
 
+    def _create_stats_tab(self, parent):
+        """Create the input statistics tab"""
+        parent.columnconfigure(0, weight=1)
+        parent.rowconfigure(1, weight=1)
+
+        ctrl_frame = ttk.Frame(parent)
+        ctrl_frame.grid(row=0, column=0, sticky="ew", pady=(0, 10))
+        ttk.Button(ctrl_frame, text="Reset", command=self._reset_stats).pack(side="left")
+        ttk.Button(ctrl_frame, text="Export...", command=self._export_stats).pack(side="left", padx=10)
+        self.encoder_stats_label = ttk.Label(ctrl_frame, text="Encoder: idle")
+        self.encoder_stats_label.pack(side="right")
+
+        columns = [
+            ('presses', 'Presses', 70),
+            ('per_minute', 'Per min', 70),
+            ('hold_avg_ms', 'Hold avg ms', 90),
+            ('hold_p95_ms', 'Hold p95 ms', 90),
+            ('hold_max_ms', 'Hold max ms', 90),
+            ('interval_avg_ms', 'Interval avg ms', 110),
+        ]
+        self.stats_tree = ttk.Treeview(parent, columns=[c[0] for c in columns], height=len(CONTROLS))
+        self.stats_tree.heading('#0', text='Control')
+        self.stats_tree.column('#0', width=100)
+        for key, title, width in columns:
+            self.stats_tree.heading(key, text=title)
+            self.stats_tree.column(key, width=width, anchor="e")
+        for name in CONTROLS:
+            self.stats_tree.insert('', 'end', iid=name, text=name)
+        self.stats_tree.grid(row=1, column=0, sticky="nsew")
+        self.stats_columns = [c[0] for c in columns]
+
+        self.root.after(500, self._refresh_stats)
+
+    def _refresh_stats(self):
+        """Redraw the statistics table while its tab is shown"""
+        if self.notebook.select() == str(self.stats_frame):
+            for row in self.stats.summary():
+                values = ['-' if row[k] is None else (f"{row[k]:.1f}" if isinstance(row[k], float) else row[k])
+                          for k in self.stats_columns]
+                self.stats_tree.item(row['control'], values=values)
+            encoder = self.stats.encoder()
+            if encoder['detents_per_s']:
+                text = f"Encoder: {encoder['detents_per_s']:.1f} detents/s {encoder['direction']}"
+            else:
+                text = "Encoder: idle"
+            self.encoder_stats_label.config(text=f"{text}  (net {encoder['net']:+d})")
+        self.root.after(500, self._refresh_stats)
+
+    def _reset_stats(self):
+        """Clear all statistics"""
+        self.stats.reset()
+        for name in CONTROLS:
+            self.stats_tree.item(name, values=())
+
+    def _export_stats(self):
+        """Export statistics to CSV or JSON"""
+        filepath = filedialog.asksaveasfilename(
+            title="Export Statistics",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not filepath:
+            return
+        try:
+            self.stats.export(filepath)
+            messagebox.showinfo("Success", f"Statistics exported to:\n{filepath}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export statistics: {e}")
+
     def _create_rgb_tab(self, parent):
         """Create the RGB LED control tab"""
         parent.columnconfigure(0, weight=1)
@@ -670,6 +1586,16 @@ class MiniKBApp:
         ttk.Button(known_row, text="Rainbow", width=8, command=lambda: self._set_led_mode_quick(2)).pack(side="left", padx=3)
         ttk.Button(known_row, text="FREEZE", width=8, command=lambda: self._set_led_mode_quick(3)).pack(side="left", padx=3)
 
+        # Timed patterns, played on the pattern engine's timer thread
+        pattern_row = ttk.Frame(modes_frame)
+        pattern_row.pack(fill="x", pady=5)
+        ttk.Label(pattern_row, text="Patterns:").pack(side="left", padx=3)
+        for name in PATTERNS:
+            ttk.Button(pattern_row, text=name.capitalize(), width=8,
+                       command=lambda n=name: self._play_pattern(n)).pack(side="left", padx=3)
+        ttk.Button(pattern_row, text="Sweep", width=8, command=self._play_mode_sweep).pack(side="left", padx=3)
+        ttk.Button(pattern_row, text="Stop", width=6, command=self._stop_patterns).pack(side="left", padx=3)
+
         # Auto-catch color by timing
         catch_frame = ttk.LabelFrame(color_frame, text="Color Picker (Rainbow + timed Freeze)", padding="5")
         catch_frame.pack(fill="x", pady=10)
@@ -686,6 +1612,26 @@ class MiniKBApp:
         ttk.Label(row3, text="sec").pack(side="left")
         ttk.Button(row3, text="Catch!", width=8, command=self._auto_catch_color).pack(side="left", padx=10)
 
+        # Calibrated colors: the delay (phase into the Rainbow cycle) that froze on each
+        try:
+            calibration = load_calibration()
+        except ValueError as e:
+            log.warning("Ignoring color calibration: %s", e)
+            calibration = {}
+        self.catcher = ColorCatcher(self.device, calibration)
+        self.catching = False
+        row4 = ttk.Frame(catch_frame)
+        row4.pack(fill="x", pady=5)
+        ttk.Label(row4, text="Color:").pack(side="left", padx=5)
+        self.catch_color_var = tk.StringVar()
+        self.catch_color_combo = ttk.Combobox(row4, textvariable=self.catch_color_var, width=10,
+                                              values=sorted(self.catcher.calibration))
+        self.catch_color_combo.pack(side="left", padx=5)
+        self.catch_color_combo.bind("<<ComboboxSelected>>", self._on_catch_color_selected)
+        ttk.Button(row4, text="Save Delay", width=10, command=self._save_catch_color).pack(side="left", padx=3)
+        ttk.Button(row4, text="Measure", width=8, command=self._measure_catch_latency).pack(side="left", padx=3)
+        self.catch_latency_label = ttk.Label(row4, text="Latency: -")
+        self.catch_latency_label.pack(side="left", padx=10)
 
         # RGB log
         log_frame = ttk.LabelFrame(parent, text="RGB Command Log", padding="5")
@@ -706,9 +1652,16 @@ class MiniKBApp:
         self.device.rgb_log_callback = self._rgb_log
 
     def _rgb_log(self, message):
-        """Log RGB message"""
+        """Log RGB message; may be called from the color catch thread"""
         timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        self.rgb_log.insert("end", f"[{timestamp}] {message}\n")
+        line = f"[{timestamp}] {message}\n"
+        if threading.current_thread() is threading.main_thread():
+            self._append_rgb_log(line)
+        else:
+            self.root.after(0, self._append_rgb_log, line)
+
+    def _append_rgb_log(self, line):
+        self.rgb_log.insert("end", line)
         self.rgb_log.see("end")
 
     def _set_led_mode_quick(self, mode):
@@ -723,34 +1676,97 @@ class MiniKBApp:
             self._rgb_log(f"Mode {mode} set!")
         except Exception as e:
             self._rgb_log(f"Error: {e}")
+            return
+        # Patterns return to this mode when they end
+        self.patterns.set_base(mode, applied=True)
+
+    def _play_pattern(self, name):
+        if not self.connected:
+            messagebox.showwarning("Not Connected", "Please connect to the device first.")
+            return
+        self.patterns.play(name)
+        self._rgb_log(f"Pattern {name} started")
+
+    def _play_mode_sweep(self):
+        """Step through LED modes 0-20 without blocking the UI"""
+        if not self.connected:
+            messagebox.showwarning("Not Connected", "Please connect to the device first.")
+            return
+        self.device.try_all_led_modes(engine=self.patterns)
+
+    def _stop_patterns(self):
+        self.patterns.stop()
+        stats = self.patterns.stats()
+        self._rgb_log(f"Patterns stopped ({stats['writes']} writes for {stats['changes']} changes)")
 
     def _auto_catch_color(self):
-        """Start Rainbow, wait delay, then Freeze to catch color"""
+        """Start Rainbow and freeze it after the delay, compensating the LED write latency"""
         if not self.connected:
             messagebox.showwarning("Not Connected", "Please connect first.")
             return
+        if self.catching:
+            return
 
         delay = self.catch_delay_var.get()
-        self._rgb_log(f"Auto-catch: Rainbow -> wait {delay:.1f}s -> Freeze")
+        self._rgb_log(f"Auto-catch: Rainbow -> freeze at {delay:.3f}s")
+        self.catching = True
+        # The writes block; the freeze is timed by the catcher's own timer thread
+        threading.Thread(target=self._catch_worker, args=(delay,), daemon=True).start()
 
+    def _catch_worker(self, delay):
+        """Run one catch off the Tk thread"""
         try:
-            # Start rainbow
-            self.device.set_led_mode(2)
-            self._rgb_log("Rainbow started...")
-
-            # Schedule freeze after delay
-            self.root.after(int(delay * 1000), self._do_freeze)
+            message = f"Freeze! Color caught: {format_result(self.catcher.catch(delay))}"
         except Exception as e:
-            self._rgb_log(f"Error: {e}")
+            message = f"Catch error: {e}"
+        self.root.after(0, self._catch_done, message)
+
+    def _catch_done(self, message):
+        self.catching = False
+        self._rgb_log(message)
+        self._show_catch_latency()
 
-    def _do_freeze(self):
-        """Execute freeze after delay"""
+    def _show_catch_latency(self):
+        latency = self.catcher.latency
+        text = "Latency: -" if latency is None else f"Latency: {latency * 1000:.1f} ms"
+        self.catch_latency_label.config(text=text)
+
+    def _measure_catch_latency(self):
+        """Time a few Rainbow writes for the catch compensation"""
+        if not self.connected:
+            messagebox.showwarning("Not Connected", "Please connect first.")
+            return
+        if self.catching:
+            return
         try:
-            self.device.set_led_mode(3)
-            self._rgb_log("Freeze! Color caught.")
+            latency = self.catcher.measure()
         except Exception as e:
-            self._rgb_log(f"Freeze error: {e}")
-
+            self._rgb_log(f"Measure error: {e}")
+            return
+        self._rgb_log(f"LED write latency: {latency * 1000:.2f} ms "
+                      f"(median of {len(self.catcher.durations)} writes)")
+        self._show_catch_latency()
+
+    def _on_catch_color_selected(self, event=None):
+        phase = self.catcher.calibration.get(self.catch_color_var.get())
+        if phase is not None:
+            self.catch_delay_var.set(round(phase, 3))
+
+    def _save_catch_color(self):
+        """Remember the current delay as the phase of the color in the combobox"""
+        color = self.catch_color_var.get().strip()
+        if not color:
+            messagebox.showwarning("No Color", "Type the name of the caught color first.")
+            return
+        delay = self.catch_delay_var.get()
+        self.catcher.calibration[color] = delay
+        try:
+            save_calibration(self.catcher.calibration)
+        except OSError as e:
+            self._rgb_log(f"Cannot save calibration: {e}")
+            return
+        self.catch_color_combo.config(values=sorted(self.catcher.calibration))
+        self._rgb_log(f"Calibration: {color} = {delay:.3f}s")
 
     def _toggle_monitoring(self):
         """Toggle input monitoring"""
@@ -761,20 +1777,48 @@ class MiniKBApp:
 
     def _start_monitoring(self):
         """Start monitoring keyboard input"""
-        if not self.connected:
-            messagebox.showwarning("Not Connected", "Please connect to the device first.")
-            return
-
-        self.monitor = InputMonitor(self.device, self._on_input_event)
-        self.monitor.start()
+        source = self.monitor_source.get()
+        if source == 'evdev':
+            if not EVDEV_AVAILABLE:
+                messagebox.showerror("Error", "python-evdev not installed. Run: pip install evdev\n"
+                                              "or select the usb monitor source.")
+                return
+            monitor = EvdevMonitor(self._on_input_event)
+            try:
+                monitor.start()
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to open input devices: {e}")
+                return
+            started = f"Monitoring started (evdev: {', '.join(monitor.device_names)})"
+        elif source == 'bus':
+            monitor = BusMonitor(self._on_input_event)
+            try:
+                monitor.start()
+            except OSError as e:
+                messagebox.showerror("Error", f"Cannot subscribe to {monitor.path}: {e}\n"
+                                              "Is minikb_filter.py running?")
+                return
+            started = f"Monitoring started (event bus: {monitor.path})"
+        else:
+            if not self.connected:
+                messagebox.showwarning("Not Connected", "Please connect to the device first.")
+                return
+            monitor = InputMonitor(self.device, self._on_input_event)
+            monitor.sink = self.trace_sink
+            monitor.raw_events = self.log_level <= RAW
+            monitor.start()
+            started = "Monitoring started"
+
+        self.monitor = monitor
         self.monitoring = True
         self.monitor_btn.config(text="Stop Monitoring")
         self.monitor_status.config(text="Monitoring...", foreground="green")
-        self._log_event("Monitoring started", "info")
+        self._log_event(started, "info")
 
     def _stop_monitoring(self):
         """Stop monitoring keyboard input"""
         if self.monitor:
+            self._stop_recording()
             self.monitor.stop()
             self.monitor = None
         self.monitoring = False
@@ -786,6 +1830,60 @@ class MiniKBApp:
         for indicator in self.button_indicators.values():
             indicator.config(bg="lightgray")
 
+    def _toggle_recording(self):
+        """Start or stop recording raw reports to a trace file"""
+        if self.monitor and self.monitor.recorder:
+            self._stop_recording()
+            return
+        if not self.monitoring:
+            messagebox.showwarning("Not Monitoring", "Start monitoring before recording a trace.")
+            return
+        filepath = filedialog.asksaveasfilename(
+            title="Record HID Trace",
+            defaultextension=".mkt",
+            filetypes=[("MiniKB trace", "*.mkt"), ("All files", "*.*")]
+        )
+        if not filepath:
+            return
+        try:
+            self.monitor.start_recording(filepath)
+        except (OSError, RuntimeError) as e:
+            messagebox.showerror("Error", f"Failed to create trace: {e}")
+            return
+        self.record_btn.config(text="Stop Recording")
+        self._log_event(f"Recording to {os.path.basename(filepath)}", "info")
+
+    def _stop_recording(self):
+        """Close the trace file if one is being recorded"""
+        if not (self.monitor and self.monitor.recorder):
+            return
+        count = self.monitor.stop_recording()
+        self.record_btn.config(text="Record Trace...")
+        self._log_event(f"Recording stopped: {count} report(s)", "info")
+
+    def _replay_trace(self):
+        """Replay a recorded trace through the decoder at original speed"""
+        filepath = filedialog.askopenfilename(
+            title="Replay HID Trace",
+            filetypes=[("MiniKB trace", "*.mkt"), ("All files", "*.*")]
+        )
+        if not filepath:
+            return
+
+        def worker():
+            # Own monitor, so key state does not mix with live input
+            monitor = InputMonitor(None, self._on_input_event)
+            monitor.raw_events = self.log_level <= RAW
+            try:
+                reports, seconds = replay(filepath, monitor)
+                message = f"Replay done: {reports} report(s) in {seconds:.2f}s"
+                self.root.after(0, lambda: self._log_event(message, "info"))
+            except (OSError, ValueError) as e:
+                self._on_input_event(InputEvent('error', message=f"Replay failed: {e}"))
+
+        self._log_event(f"Replaying {os.path.basename(filepath)}", "info")
+        threading.Thread(target=worker, daemon=True).start()
+
     def _on_input_event(self, event):
         """Handle input event from monitor thread"""
         # Schedule UI update on main thread
@@ -793,24 +1891,21 @@ class MiniKBApp:
 
     def _process_event(self, event):
         """Process input event on main thread"""
-        event_type = event.get('type')
+        event_type = event.type
 
         if event_type == 'error':
-            self._log_event(f"Error: {event.get('message')}", "error")
+            self._log_event(f"Error: {event.message}", "error")
             return
 
         if event_type == 'raw':
             # Debug output - show all raw packets
-            ep = event.get('endpoint', 0)
-            data = event.get('data', '')
-            bytes_list = event.get('bytes', [])
-            self._log_event(f"RAW EP{ep:02x}: {data}  bytes: {bytes_list}", "raw")
+            self._log_event(f"RAW EP{event.endpoint:02x}: {event.hex}  bytes: {event.byte_list}", "raw")
             return
 
-        key_name = event.get('key_name', '?')
-        keycode = event.get('keycode', 0)
-        modifier = event.get('modifier', '')
-        raw = event.get('raw', '')
+        key_name = event.key_name
+        keycode = event.keycode
+        modifier = event.modifier_str
+        raw = event.hex
 
         # Build display string
         if modifier:
@@ -818,27 +1913,25 @@ class MiniKBApp:
         else:
             display = key_name
 
+        button_names = self._buttons_for_keycode(keycode)
         if event_type == 'press':
             self._log_event(f"PRESS:   {display:20} (0x{keycode:02X})  raw: {raw}", "press")
-            self._highlight_button(keycode, True)
+            self._highlight_button(button_names, True)
+            for button_name in button_names:
+                self.stats.press(CONTROL_INDEX[button_name], event.timestamp)
         elif event_type == 'release':
             self._log_event(f"RELEASE: {display:20} (0x{keycode:02X})", "release")
-            self._highlight_button(keycode, False)
+            self._highlight_button(button_names, False)
+            for button_name in button_names:
+                self.stats.release(CONTROL_INDEX[button_name], event.timestamp)
 
-    def _highlight_button(self, keycode, pressed):
-        """Highlight button indicator based on keycode and current config"""
-        # Build dynamic mapping from current UI config
-        key_to_buttons = {}
-        for btn_name, combo in self.key_combos.items():
-            key_name = combo.get()
-            kc = HID_KEYCODES.get(key_name, 0)
-            if kc != 0:
-                if kc not in key_to_buttons:
-                    key_to_buttons[kc] = []
-                key_to_buttons[kc].append(btn_name)
-
-        # Highlight all buttons that match this keycode
-        button_names = key_to_buttons.get(keycode, [])
+    def _buttons_for_keycode(self, keycode):
+        """Names of the buttons currently configured to send keycode"""
+        return [btn_name for btn_name, combo in self.key_combos.items()
+                if keycode and DISPLAY_KEYCODES.get(combo.get(), 0) == keycode]
+
+    def _highlight_button(self, button_names, pressed):
+        """Highlight the indicators of the given buttons"""
         for button_name in button_names:
             if button_name in self.button_indicators:
                 indicator = self.button_indicators[button_name]
@@ -881,10 +1974,20 @@ class MiniKBApp:
         except Exception as e:
             messagebox.showerror("Connection Error", f"Failed to connect:\n{e}\n\nMake sure:\n1. Device is plugged in\n2. You have permissions (try running with sudo)")
 
+    def _on_reconnected(self, seconds):
+        """The device reset or was replugged and the transport recovered
+
+        The details went to the RGB log and the 'minikb' logger already.
+        """
+        self.status_label.config(text=f"Connected: {VENDOR_ID:04x}:{PRODUCT_ID:04x} "
+                                      f"(recovered in {seconds * 1000:.0f} ms, "
+                                      f"{self.device.reconnects} reconnect(s))", foreground="green")
+
     def _disconnect(self):
         """Disconnect from the device"""
         if self.monitoring:
             self._stop_monitoring()
+        self.patterns.stop()
         self.device.disconnect()
         self.connected = False
         self.status_label.config(text="Disconnected", foreground="red")
@@ -895,7 +1998,7 @@ class MiniKBApp:
         config = {}
         for name, combo in self.key_combos.items():
             key_name = combo.get()
-            config[name] = HID_KEYCODES.get(key_name, 0x00)
+            config[name] = DISPLAY_KEYCODES.get(key_name, 0x00)
         return config
 
     def _apply_config(self):
@@ -906,10 +2009,7 @@ class MiniKBApp:
 
         config = self._get_current_config()
         try:
-            for button_name, keycode in config.items():
-                button_id = BUTTONS.get(button_name)
-                if button_id:
-                    self.device.set_key(button_id, keycode)
+            self.device.program_all(config)
             messagebox.showinfo("Success", "Configuration applied to device!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to apply configuration:\n{e}")
@@ -957,8 +2057,10 @@ class MiniKBApp:
                         return
 
                     if self.device and self.device.device:
-                        apply_yaml_to_device(self.device, filepath)
-                        messagebox.showinfo("Success", "YAML config uploaded to device!\n(ch57x-keyboard-tool format)")
+                        timings = apply_yaml_to_device(self.device, filepath)
+                        summary = "\n".join(f"Layer {layer}: {count} keys in {secs * 1000:.0f} ms"
+                                            for layer, count, secs in timings)
+                        messagebox.showinfo("Success", "YAML config uploaded to device!\n(ch57x-keyboard-tool format)\n\n" + summary)
                     else:
                         messagebox.showerror("Error", "Device not connected!")
                 else:
@@ -974,7 +2076,7 @@ class MiniKBApp:
         """Apply config dict to UI elements"""
         for name, combo in self.key_combos.items():
             key_name = config.get(name, "None")
-            if key_name in HID_KEYCODES:
+            if key_name in DISPLAY_KEYCODES:
                 combo.set(key_name)
 
     def _set_detected_config(self):
@@ -998,6 +2100,43 @@ class MiniKBApp:
 
 
 def main():
+    parser = argparse.ArgumentParser(description='MiniKB configuration GUI')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='Print startup milestones (ms) as JSON once interactive, then exit')
+    parser.add_argument('--transport', choices=['usb', 'hidraw'], default='usb',
+                        help='usb detaches the kernel driver; hidraw keeps the keyboard typing (default: usb)')
+    parser.add_argument('--monitor-source', choices=['evdev', 'bus', 'usb'],
+                        help='Live Monitor input: evdev (no grab, works while programming), '
+                             'bus (minikb_filter.py events) or usb (reports from the connected '
+                             'device); default evdev if installed')
+    parser.add_argument('--log-level', choices=list(LOG_LEVELS), default='info',
+                        help='UI and console log level; raw also shows every report (default: info)')
+    parser.add_argument('--trace-file', metavar='PATH',
+                        help='Record all USB traffic to a rotating binary trace (see hid_trace.py)')
+    parser.add_argument('--trace-sample', type=int, default=1, metavar='N',
+                        help='Keep every Nth transfer in the trace (default: 1)')
+    parser.add_argument('--trace-compress', action='store_true', help='gzip the trace files')
+    parser.add_argument('--trace-max-mb', type=float, default=8.0,
+                        help='Rotate the trace after this many MB (default: 8)')
+    parser.add_argument('--trace-backups', type=int, default=3,
+                        help='Rotated trace files to keep (default: 3)')
+    parser.add_argument('--chrome-trace', metavar='PATH',
+                        help='On exit, write every transfer grouped by operation as Chrome '
+                             'trace-event JSON (see transfer_trace.py)')
+    parser.add_argument('--state-file', default=DEFAULT_STATE, metavar='PATH',
+                        help=f'Publish LED mode and programmed keys to the live state block '
+                             f'(default: {DEFAULT_STATE}); empty to disable')
+    args = parser.parse_args()
+
+    level = LOG_LEVELS[args.log_level]
+    logging.basicConfig(level=level, format='%(levelname)s %(name)s: %(message)s')
+
+    trace_sink = None
+    if args.trace_file:
+        trace_sink = TraceSink(args.trace_file, max_bytes=int(args.trace_max_mb * 1024 * 1024),
+                               backups=args.trace_backups, sample=args.trace_sample,
+                               compress=args.trace_compress)
+
     root = tk.Tk()
 
     # Set theme
@@ -1007,10 +2146,28 @@ def main():
     except tk.TclError:
         pass
 
-    app = MiniKBApp(root)
+    app = MiniKBApp(root, log_level=level, trace_sink=trace_sink, transport=args.transport,
+                    monitor_source=args.monitor_source)
+
+    state = None
+    if args.state_file:
+        try:
+            state = StateWriter(args.state_file)
+        except OSError as e:
+            log.warning("Live state disabled: %s", e)
+    app.device.state = state
+    tracer = TransferTracer() if args.chrome_trace else None
+    app.device.tracer = tracer
+
+    if args.startup_report:
+        def report(times):
+            print(json.dumps({name: round(t * 1000, 1) for name, t in times.items()}), flush=True)
+            root.after_idle(root.destroy)
+        app.on_interactive = report
 
     # Handle window close
     def on_close():
+        app.patterns.close()
         if app.monitoring:
             app._stop_monitoring()
         if app.connected:
@@ -1020,6 +2177,16 @@ def main():
     root.protocol("WM_DELETE_WINDOW", on_close)
     root.mainloop()
 
+    if state:
+        state.close()
+    if tracer:
+        events = tracer.export_chrome(args.chrome_trace)
+        print(f"Chrome trace: {tracer.transfers} transfer(s), {events} event(s) written to {args.chrome_trace}")
+    if trace_sink:
+        trace_sink.close()
+        print(f"Trace: {trace_sink.written} transfer(s) written to {trace_sink.path}"
+              f" ({trace_sink.dropped} dropped)")
+
 
 if __name__ == "__main__":
     main()
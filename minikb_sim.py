@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+MiniKB Simulator - A keyboard model for testing without hardware
+SimulatedKeyboard applies LED commands and key programming sessions like the
+8890 firmware and takes injected faults; SimulatedDevice is a MiniKBDevice
+whose bus is such a keyboard:
+
+    keyboard = SimulatedKeyboard(reenumerate=0.1)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    keyboard.inject('reset', after=3)   # drop off the bus on the 4th OUT packet
+    device.program_layer(bindings)      # reconnects and replays the session
+    assert keyboard.led_mode == device.led_mode
+
+Faults:
+    stall    one OUT transfer fails with EPIPE (retried, no reconnect)
+    reset    the device drops off the bus in the middle of a transfer and
+             re-enumerates after reenumerate s, forgetting the open
+             session and its LED mode (keys already committed stay)
+    gone     the device stays away for 10 s
+"""
+
+import errno
+import time
+
+from minikb_gui import BUTTONS, INIT_PACKET, MiniKBDevice
+
+
+class SimulatedKeyboard:
+    """Keyboard model with fault injection
+
+    Handles from before a reset are dead (ENODEV); open() fails until the
+    device has re-enumerated.
+    """
+
+    def __init__(self, reenumerate):
+        self.reenumerate = reenumerate
+        self.led_mode = 0
+        self.keys = {}  # (layer, button_id) -> [(keycode, modifier), ...]
+        self.epoch = 0
+        self.back_at = 0.0
+        self.reset_at = None
+        self.fault = None
+        self.fail_in = None  # OUT transfers until the fault
+        self.reports = []
+        self.packets = []  # every OUT packet that reached the keyboard
+        self._led = None
+        self._session = None
+
+    def inject(self, fault, after=0):
+        self.fault, self.fail_in = fault, after
+
+    def reset(self, away=None):
+        self.epoch += 1
+        self.reset_at = time.monotonic()
+        self.back_at = self.reset_at + (self.reenumerate if away is None else away)
+        self.led_mode = 0
+        self._led = self._session = None
+
+    def open(self):
+        if time.monotonic() < self.back_at:
+            raise RuntimeError("Device 1189:8890 not found")
+        return SimulatedHandle(self, self.epoch)
+
+    def write(self, epoch, data):
+        if epoch != self.epoch:
+            raise OSError(errno.ENODEV, "No such device (it may have been disconnected)")
+        if self.fail_in is not None:
+            if self.fail_in == 0:
+                fault, self.fail_in = self.fault, None
+                if fault == 'stall':
+                    raise OSError(errno.EPIPE, "Pipe error")
+                self.reset(away=10.0 if fault == 'gone' else None)
+                raise OSError(errno.ENODEV, "No such device (it may have been disconnected)")
+            self.fail_in -= 1
+        self.packets.append(bytes(data))
+        self._apply(bytes(data))
+
+    def read(self, epoch, timeout):
+        if epoch != self.epoch:
+            raise OSError(errno.ENODEV, "No such device (it may have been disconnected)")
+        time.sleep(min(timeout, 0.001))
+        if self.reports:
+            return [(0x81, self.reports.pop(0))]
+        return None
+
+    def _apply(self, data):
+        if data[0] != 0x03:
+            return
+        command, arg = data[1], data[2]
+        if command == 0xa1:
+            self._led = None
+        elif command == 0xb0:
+            self._led = data[3]
+        elif command == 0xaa and arg == 0xa1 and self._led is not None:
+            self.led_mode, self._led = self._led, None
+        elif command == 0xfe:
+            self._session = (arg - 1, {})
+        elif command == 0xaa and arg == 0xaa and self._session:
+            layer, buttons = self._session
+            for button_id, chords in buttons.items():
+                self.keys[(layer, button_id)] = [chords[i] for i in sorted(chords)]
+            self._session = None
+        elif self._session and command in BUTTONS.values():
+            chords = self._session[1].setdefault(command, {})
+            if arg & 0x0f:
+                chords[data[4]] = (data[6], data[5])
+
+
+class SimulatedHandle:
+    """What pyusb's find() returns, bound to one enumeration of the keyboard"""
+
+    def __init__(self, keyboard, epoch):
+        self.keyboard = keyboard
+        self.epoch = epoch
+
+    def write(self, endpoint, data, timeout=None):
+        self.keyboard.write(self.epoch, data)
+        return len(data)
+
+
+class SimulatedDevice(MiniKBDevice):
+    """MiniKBDevice whose bus is the simulated keyboard"""
+
+    def __init__(self, keyboard):
+        super().__init__()
+        self.keyboard = keyboard
+        self.rgb_log_level = 100  # no per-packet logging in the timings
+
+    def _open(self):
+        self.device = self.keyboard.open()
+
+    def _dispose(self):
+        self.device = None
+
+    def connect(self):
+        self._open()
+        self._send_packet(INIT_PACKET)
+        self.generation += 1
+
+    def read_input(self, timeout=100):
+        if self.device is None:
+            return None
+        return self.keyboard.read(self.device.epoch, timeout / 1000)
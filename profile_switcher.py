@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+MiniKB Profile Switcher - Applies a mapping profile per focused application
+Follows the active window (X11 _NET_ACTIVE_WINDOW) and uploads the profile
+mapped to its window class. Only keys that differ from what the device
+already holds are sent.
+
+The keyboard keeps typing while the switcher runs: by default it talks to
+the device through /dev/hidraw, which leaves the kernel driver bound. With
+--transport usb (libusb detaches the kernel driver) it connects for each
+switch only and disconnects after the commit.
+
+Usage:
+    python3 profile_switcher.py profiles.yaml
+    python3 profile_switcher.py profiles.yaml --dry-run
+    python3 profile_switcher.py profiles.yaml --dry-run --simulate firefox,konsole
+    python3 profile_switcher.py profiles.yaml --transport usb
+
+Example profiles.yaml:
+    default: test
+    profiles:
+      media: mapping-media.yaml
+      ssh: mapping-ssh.yaml
+      test: mapping.yaml
+    applications:
+      firefox: media
+      konsole: ssh
+
+Requires: pip install pyyaml python-xlib
+"""
+
+import argparse
+import contextlib
+import os
+import queue
+import time
+
+from led_patterns import PatternEngine
+from live_state import DEFAULT_PATH as DEFAULT_STATE, StateWriter
+from transfer_trace import TransferTracer
+from yaml_config import parse_yaml_config, layer_bindings
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+try:
+    from Xlib import X, display as xdisplay
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+# Focus change -> device commit budget
+SWITCH_BUDGET = 0.100
+
+
+class X11WindowSource:
+    """Yields (timestamp, (instance, class)) when the active window changes"""
+
+    def __init__(self):
+        if not XLIB_AVAILABLE:
+            raise RuntimeError("python-xlib not installed. Run: pip install python-xlib")
+        self.display = xdisplay.Display()
+        self.root = self.display.screen().root
+        self.active_atom = self.display.intern_atom('_NET_ACTIVE_WINDOW')
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+
+    def _active_class(self):
+        """WM_CLASS of the active window, or None"""
+        prop = self.root.get_full_property(self.active_atom, X.AnyPropertyType)
+        if not prop or not prop.value or not prop.value[0]:
+            return None
+        window = self.display.create_resource_object('window', prop.value[0])
+        try:
+            return window.get_wm_class()
+        except Exception:
+            # Window may be gone already
+            return None
+
+    def events(self):
+        last = self._active_class()
+        if last:
+            yield time.monotonic(), last
+        while True:
+            event = self.display.next_event()
+            if event.type != X.PropertyNotify or event.atom != self.active_atom:
+                continue
+            timestamp = time.monotonic()
+            wm_class = self._active_class()
+            if wm_class and wm_class != last:
+                last = wm_class
+                yield timestamp, wm_class
+
+
+class FakeWindowSource:
+    """Window source fed by hand, for headless runs and tests"""
+
+    def __init__(self, classes=()):
+        self._queue = queue.Queue()
+        for wm_class in classes:
+            self.push(wm_class)
+
+    def push(self, wm_class):
+        """Report a focus change to a window of class wm_class"""
+        if isinstance(wm_class, str):
+            wm_class = (wm_class.lower(), wm_class)
+        self._queue.put((time.monotonic(), wm_class))
+
+    def close(self):
+        """End the event stream"""
+        self._queue.put(None)
+
+    def events(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            yield item
+
+
+class RecordingDevice:
+    """Device stand-in for --dry-run that only records programmed layers"""
+
+    def __init__(self):
+        self.sessions = []
+
+    def program_layer(self, bindings, layer=0):
+        self.sessions.append((layer, list(bindings)))
+
+
+def compile_profile(yaml_path):
+    """Compile a mapping file into {(layer, button_id): (chord, ...)}"""
+    config = parse_yaml_config(yaml_path)
+    compiled = {}
+    for layer_num, layer in enumerate(config['layers']):
+        for button_id, sequence in layer_bindings(layer):
+            compiled[(layer_num, button_id)] = tuple(sequence)
+    return compiled
+
+
+class ProfileSwitcher:
+    """Maps window classes to profiles and applies them as diffs"""
+
+    def __init__(self, device, profiles, applications, default=None, live_state=None, patterns=None,
+                 connect_per_switch=False):
+        """
+        Args:
+            device: object with program_layer(bindings, layer)
+            profiles: {profile name: mapping yaml path}
+            applications: {window class: profile name}
+            default: profile for windows without a rule (None = keep current)
+            live_state: live_state.StateWriter to publish the active profile to
+            patterns: led_patterns.PatternEngine to flash the LED on switches
+            connect_per_switch: connect the device for each switch and
+                disconnect after the commit, instead of holding it open
+        """
+        self.device = device
+        self.connect_per_switch = connect_per_switch
+        self.live_state = live_state
+        self.patterns = patterns
+        self.profiles = profiles
+        self.applications = {k.lower(): v for k, v in applications.items()}
+        self.default = default
+        self.active = None
+        self.state = {}  # (layer, button_id) -> sequence currently on device
+        self._cache = {}  # path -> (mtime, compiled)
+
+    def _compiled(self, name):
+        """Compiled profile, recompiled only when the file changed"""
+        path = self.profiles[name]
+        mtime = os.path.getmtime(path)
+        cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        compiled = compile_profile(path)
+        self._cache[path] = (mtime, compiled)
+        return compiled
+
+    def preload(self):
+        """Compile every profile up front so switches never parse YAML"""
+        for name in self.profiles:
+            self._compiled(name)
+
+    def profile_for(self, wm_class):
+        """Profile name for a (instance, class) pair or class string"""
+        names = (wm_class,) if isinstance(wm_class, str) else wm_class
+        for name in names:
+            profile = self.applications.get(name.lower())
+            if profile:
+                return profile
+        return self.default
+
+    def diff(self, compiled):
+        """{layer: [(button_id, sequence), ...]} of keys not yet on the device"""
+        changes = {}
+        for (layer, button_id), sequence in compiled.items():
+            if self.state.get((layer, button_id)) != sequence:
+                changes.setdefault(layer, []).append((button_id, list(sequence)))
+        return changes
+
+    @contextlib.contextmanager
+    def _connection(self, needed):
+        """Hold the device connection for one switch if connect_per_switch"""
+        if not (self.connect_per_switch and needed):
+            yield
+            return
+        self.device.connect()
+        try:
+            yield
+        finally:
+            self.device.disconnect()
+
+    def switch(self, name):
+        """Apply profile name; returns the number of keys written"""
+        compiled = self._compiled(name)
+        changes = self.diff(compiled)
+        tracer = getattr(self.device, 'tracer', None)
+        try:
+            with self._connection(bool(changes)), \
+                    tracer.span('switch', profile=name) if tracer else contextlib.nullcontext():
+                for layer, bindings in sorted(changes.items()):
+                    self.device.program_layer(bindings, layer=layer)
+        except Exception:
+            # Device state is unknown now, rewrite everything next time
+            self.state = {}
+            self.active = None
+            raise
+        self.state.update(compiled)
+        self.active = name
+        if self.live_state:
+            # Profile id = position in profiles.yaml
+            self.live_state.set_profile(list(self.profiles).index(name), name)
+        if self.patterns:
+            self.patterns.play('profile')
+        return sum(len(b) for b in changes.values())
+
+    def on_focus(self, wm_class, timestamp=None):
+        """Handle a focus change; returns (profile, keys, seconds) or None"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        name = self.profile_for(wm_class)
+        if name is None or name == self.active:
+            return None
+
+        keys = self.switch(name)
+        elapsed = time.monotonic() - timestamp
+        app = wm_class if isinstance(wm_class, str) else wm_class[-1]
+        note = "" if elapsed <= SWITCH_BUDGET else f" (over {SWITCH_BUDGET * 1000:.0f} ms budget)"
+        print(f"Profile '{name}' for {app}: {keys} key(s) in {elapsed * 1000:.1f} ms{note}")
+        return name, keys, elapsed
+
+    def run(self, source):
+        """Follow focus changes from source until it ends"""
+        for timestamp, wm_class in source.events():
+            try:
+                self.on_focus(wm_class, timestamp)
+            except Exception as e:
+                print(f"Error switching profile: {e}")
+
+
+def load_profiles(path):
+    """Load profiles.yaml; profile paths are relative to the file"""
+    if not YAML_AVAILABLE:
+        raise RuntimeError("pyyaml not installed. Run: pip install pyyaml")
+
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+
+    base = os.path.dirname(os.path.abspath(path))
+    profiles = {name: os.path.join(base, os.path.expanduser(p))
+                for name, p in (config.get('profiles') or {}).items()}
+    applications = config.get('applications') or {}
+    default = config.get('default')
+
+    for app, name in list(applications.items()) + [('default', default)]:
+        if name is not None and name not in profiles:
+            raise ValueError(f"Unknown profile '{name}' for '{app}'")
+
+    return profiles, applications, default
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Switch MiniKB profiles by focused application')
+    parser.add_argument('profiles', help='profiles.yaml with profiles and application rules')
+    parser.add_argument('--dry-run', action='store_true', help='Do not touch the device')
+    parser.add_argument('--simulate', type=str,
+                        help='Comma-separated window classes to feed instead of X11')
+    parser.add_argument('--state-file', default=DEFAULT_STATE, metavar='PATH',
+                        help=f'Publish the active profile to the live state block '
+                             f'(default: {DEFAULT_STATE}); empty to disable')
+    parser.add_argument('--chrome-trace', metavar='PATH',
+                        help='On exit, write every USB transfer per switch as Chrome trace-event JSON')
+    parser.add_argument('--flash', action='store_true', help='Flash the LED on every profile switch (LED off afterwards)')
+    parser.add_argument('--transport', choices=['usb', 'hidraw'], default='hidraw',
+                        help='hidraw keeps the keyboard typing; usb detaches the kernel driver, '
+                             'so it is connected only while a switch is written (default: hidraw)')
+    args = parser.parse_args()
+    if args.flash and args.transport == 'usb' and not args.dry_run:
+        # The flash plays after the commit, when the device is already released
+        parser.error("--flash needs --transport hidraw")
+
+    profiles, applications, default = load_profiles(args.profiles)
+
+    live_state = None
+    if args.state_file and not args.dry_run:
+        try:
+            live_state = StateWriter(args.state_file)
+        except OSError as e:
+            print(f"Live state disabled: {e}")
+
+    patterns = None
+    if args.dry_run:
+        device = RecordingDevice()
+    else:
+        from minikb_gui import HidrawDevice, MiniKBDevice
+        device = HidrawDevice() if args.transport == 'hidraw' else MiniKBDevice()
+        device.state = live_state
+        if args.chrome_trace:
+            device.tracer = TransferTracer()
+        if args.transport == 'hidraw':
+            device.connect()
+        if args.flash:
+            patterns = PatternEngine(device)
+
+    switcher = ProfileSwitcher(device, profiles, applications, default, live_state, patterns,
+                               connect_per_switch=not args.dry_run and args.transport == 'usb')
+
+    switcher.preload()
+
+    if args.simulate:
+        source = FakeWindowSource(args.simulate.split(','))
+        source.close()
+    else:
+        source = X11WindowSource()
+
+    try:
+        switcher.run(source)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        if patterns:
+            patterns.close()
+        if not args.dry_run:
+            device.disconnect()
+            if device.tracer:
+                device.tracer.export_chrome(args.chrome_trace)
+                print(f"Chrome trace: {device.tracer.transfers} transfer(s) written to {args.chrome_trace}")
+        if live_state:
+            live_state.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,7 @@ echo
 
 # Тест 1: Запуск
 echo "2. Эмуляция нажатия кнопки (должен запустить)..."
-./hyperhdr-toggle.sh
-sleep 1
+./hyperhdr-toggle.sh --no-notify
 if pgrep hyperhdr > /dev/null 2>&1; then
     echo "Состояние после 1 нажатия: running"
     echo "✓ OK: Запустился"
@@ -34,8 +33,7 @@ echo
 
 # Тест 2: Остановка
 echo "3. Эмуляция нажатия кнопки (должен остановить)..."
-./hyperhdr-toggle.sh
-sleep 1
+./hyperhdr-toggle.sh --no-notify
 if pgrep hyperhdr > /dev/null 2>&1; then
     echo "Состояние после 2 нажатия: running"
     echo "✗ FAIL: Не остановился"
@@ -47,8 +45,7 @@ echo
 
 # Тест 3: Повторный запуск
 echo "4. Эмуляция нажатия кнопки (должен запустить снова)..."
-./hyperhdr-toggle.sh
-sleep 1
+./hyperhdr-toggle.sh --no-notify
 if pgrep hyperhdr > /dev/null 2>&1; then
     echo "Состояние после 3 нажатия: running"
     echo "✓ OK: Запустился снова"
@@ -60,8 +57,7 @@ echo
 
 # Тест 4: Повторная остановка
 echo "5. Эмуляция нажатия кнопки (должен остановить снова)..."
-./hyperhdr-toggle.sh
-sleep 1
+./hyperhdr-toggle.sh --no-notify
 if pgrep hyperhdr > /dev/null 2>&1; then
     echo "Состояние после 4 нажатия: running"
     echo "✗ FAIL: Не остановился"
@@ -0,0 +1,233 @@
+"""chprog against the simulated v1 and v2 bootloaders (no pyusb needed)"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+FIRMWARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'firmware')
+sys.path.insert(0, FIRMWARE)
+
+import chprog  # noqa: E402
+from chprog import Programmer  # noqa: E402
+from chsim import SimulatedBootloader  # noqa: E402
+
+# Two segments: several full packets plus a short tail, and one above 256
+SEGMENTS = [(0x0000, bytes((i * 37 + 11) & 0xff for i in range(200))),
+            (0x0400, bytes((i * 13 + 5) & 0xff for i in range(72)))]
+
+BOOTLOADERS = ['1.1', '2.31']
+
+
+class RecordingEndpoint:
+    """Both endpoints of a SimulatedBootloader, keeping a copy of every OUT packet"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.packets = []
+
+    def write(self, data, timeout=None):
+        # Programmer refills one buffer per packet, so copy it
+        self.packets.append(bytes(data))
+        return self.sim.write(data, timeout)
+
+    def read(self, size, timeout=None):
+        return self.sim.read(size, timeout)
+
+    def sent(self, mode):
+        return [packet for packet in self.packets if packet[0] == mode]
+
+
+def expected_v1(mode, segments):
+    # mode, length, address (little endian), up to 60 plain data bytes
+    packets = []
+    for addr, data in segments:
+        for offset in range(0, len(data), 0x3c):
+            chunk = data[offset:offset + 0x3c]
+            start = addr + offset
+            packets.append(bytes([mode, len(chunk), start & 0xff, start >> 8]) + chunk)
+    return packets
+
+
+def expected_v2(mode, segments, chipid):
+    # mode, length + 5, 0, address (little endian), 0, 0, remaining length ^ chip ID,
+    # then up to 56 data bytes with every 8th byte XORed with the chip ID
+    packets = []
+    for addr, data in segments:
+        for offset in range(0, len(data), 0x38):
+            chunk = bytearray(data[offset:offset + 0x38])
+            chunk[7::8] = bytes(b ^ chipid for b in chunk[7::8])
+            start = addr + offset
+            rest = len(data) - offset
+            header = bytes([mode, len(chunk) + 5, 0, start & 0xff, start >> 8, 0, 0,
+                            (rest & 0xff) ^ chipid])
+            packets.append(header + bytes(chunk))
+    return packets
+
+
+def payloads(packets, version):
+    # The meaningful prefix of each packet; the buffer tail holds stale bytes
+    if version == 1:
+        return [packet[:4 + packet[1]] for packet in packets]
+    return [packet[:3 + packet[1]] for packet in packets]
+
+
+def connect(bootloader):
+    sim = SimulatedBootloader('CH552', bootloader=bootloader)
+    endpoint = RecordingEndpoint(sim)
+    isp = Programmer(endpoint)
+    isp.detect()
+    return sim, endpoint, isp
+
+
+def flash_args(**kwargs):
+    args = dict(bin='test.bin', verify_first=False, trust_cache=False, no_cache=True)
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_v1_packets_match_protocol():
+    sim, endpoint, isp = connect('1.1')
+    assert (isp.chipversion, isp.chipname, isp.bootloader) == (1, 'CH552', '1.1')
+
+    isp.erase()
+    isp.flash_segments(SEGMENTS)
+    isp.verify_segments(SEGMENTS)
+
+    for mode in (chprog.MODE_WRITE_V1, chprog.MODE_VERIFY_V1):
+        assert payloads(endpoint.sent(mode), 1) == expected_v1(mode, SEGMENTS)
+    for addr, data in SEGMENTS:
+        assert sim.image()[addr:addr + len(data)] == data
+
+
+def test_v2_packets_are_scrambled_byte_for_byte():
+    sim, endpoint, isp = connect('2.31')
+    assert (isp.chipversion, isp.chipname, isp.bootloader) == (2, 'CH552', '2.31')
+    assert isp.chipid == 0x52
+
+    isp.erase()
+    isp.flash_segments(SEGMENTS)
+    isp.verify_segments(SEGMENTS)
+
+    for mode in (chprog.MODE_WRITE_V2, chprog.MODE_VERIFY_V2):
+        sent = payloads(endpoint.sent(mode), 2)
+        assert sent == expected_v2(mode, SEGMENTS, 0x52)
+        # The scrambling really changes the data bytes on the wire
+        assert sent[0][8:] != SEGMENTS[0][1][:0x38]
+    for addr, data in SEGMENTS:
+        assert sim.image()[addr:addr + len(data)] == data
+
+
+@pytest.mark.parametrize('bootloader', BOOTLOADERS)
+def test_verify_fails_on_wrong_data(bootloader):
+    _, _, isp = connect(bootloader)
+    isp.erase()
+    isp.flash_segments(SEGMENTS)
+
+    wrong = [(SEGMENTS[0][0], bytes(b ^ 0x01 for b in SEGMENTS[0][1]))]
+    with pytest.raises(Exception, match='Verify failed'):
+        isp.verify_segments(wrong)
+
+
+@pytest.mark.parametrize('bootloader', BOOTLOADERS)
+def test_flash_writes_blank_chip(bootloader):
+    sim, endpoint, isp = connect(bootloader)
+    version = isp.chipversion
+    write = chprog.MODE_WRITE_V1 if version == 1 else chprog.MODE_WRITE_V2
+
+    assert chprog._flash(isp, SEGMENTS, 'hash', flash_args(verify_first=True), lambda *items: None)
+
+    assert endpoint.sent(write)
+    assert 'verify_first' in isp.timings
+    assert sim.running
+    assert sim.image(len(chprog.image_bytes(SEGMENTS))) == chprog.image_bytes(SEGMENTS)
+
+
+@pytest.mark.parametrize('bootloader', BOOTLOADERS)
+def test_verify_first_skips_current_chip(bootloader):
+    sim = SimulatedBootloader('CH552', bootloader=bootloader)
+    image = chprog.image_bytes(SEGMENTS)
+    sim.flash[:len(image)] = image
+    endpoint = RecordingEndpoint(sim)
+    isp = Programmer(endpoint)
+    isp.detect()
+    log = []
+
+    written = chprog._flash(isp, SEGMENTS, 'hash', flash_args(verify_first=True),
+                            lambda *items: log.append(' '.join(map(str, items))))
+
+    assert not written
+    assert 'SKIPPED: erase and write.' in log
+    erase = 0xa6 if isp.chipversion == 1 else 0xa4
+    write = chprog.MODE_WRITE_V1 if isp.chipversion == 1 else chprog.MODE_WRITE_V2
+    assert not endpoint.sent(erase) and not endpoint.sent(write)
+    assert sim.running
+
+
+@pytest.mark.parametrize('bootloader', BOOTLOADERS)
+def test_cli_simulate_runs_without_pyusb(tmp_path, bootloader):
+    path = tmp_path / 'firmware.bin'
+    path.write_bytes(chprog.image_bytes(SEGMENTS))
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / 'cache'))
+
+    for extra in ([], ['--verify-first']):
+        result = subprocess.run([sys.executable, os.path.join(FIRMWARE, 'chprog.py'),
+                                 '--simulate', 'CH552:' + bootloader, *extra, str(path)],
+                                capture_output=True, text=True, env=env)
+        assert result.returncode == 0, result.stderr
+        assert 'FOUND: CH552 with bootloader v' + bootloader + '.' in result.stdout
+        assert 'bytes verified.' in result.stdout
+    # --simulate never touches the flashed image cache
+    assert not (tmp_path / 'cache').exists()
+
+
+@pytest.mark.parametrize('extra', [[], ['--all']], ids=['one', 'all'])
+def test_json_to_stdout_keeps_other_output_off_stdout(tmp_path, extra):
+    path = tmp_path / 'firmware.bin'
+    path.write_bytes(chprog.image_bytes(SEGMENTS))
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / 'cache'))
+
+    result = subprocess.run([sys.executable, os.path.join(FIRMWARE, 'chprog.py'), '--simulate',
+                             'CH552:1.1,CH552:2.31', '--progress', '--json', '-', *extra, str(path)],
+                            capture_output=True, text=True, env=env)
+
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert [device['status'] for device in report['devices']] == ['flashed'] * (2 if extra else 1)
+    assert 'FOUND: CH552' in result.stderr
+    assert 'bytes verified.' in result.stderr
+
+
+HEX = b':0400000001023A0BB4\n:00000001FF\n'
+
+
+@pytest.mark.parametrize('name, segments', [
+    ('firmware.hex', [(0, b'\x01\x02\x3a\x0b\xff\xff\xff\xff')]),
+    ('firmware.IHX', [(0, b'\x01\x02\x3a\x0b\xff\xff\xff\xff')]),
+    ('firmware.img', [(0, b'\x01\x02\x3a\x0b\xff\xff\xff\xff')]),
+    # Raw bytes that happen to start with ':' (0x3A)
+    ('firmware.bin', [(0, HEX)]),
+])
+def test_read_image_format_by_extension(tmp_path, name, segments):
+    path = tmp_path / name
+    path.write_bytes(HEX)
+
+    assert chprog.read_image(str(path))[0] == segments
+
+
+def test_all_logs_device_errors_with_their_path(tmp_path):
+    path = tmp_path / 'firmware.bin'
+    path.write_bytes(chprog.image_bytes(SEGMENTS))
+
+    result = subprocess.run([sys.executable, os.path.join(FIRMWARE, 'chprog.py'), '--all',
+                             '--simulate', 'CH552:2.31,CH999', str(path)],
+                            capture_output=True, text=True)
+
+    assert result.returncode == 1
+    lines = result.stdout.splitlines()
+    assert '[sim1] ERROR: Unknown chip CH999' in lines
+    assert '[sim0] SUCCESS: %d bytes verified.' % sum(len(data) for _, data in SEGMENTS) in lines
+    assert result.stderr == ''
@@ -0,0 +1,104 @@
+"""kscreen-doctor parsing and toggle planning on captured outputs"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from display_toggle import Output, parse_outputs, plan_toggle  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'data')
+
+
+def capture(name):
+    with open(os.path.join(DATA, name)) as f:
+        return parse_outputs(f.read())
+
+
+def two_screens(internal_enabled):
+    """eDP-1 and HDMI-A-1 only, a disconnected DP-1 listed between them"""
+    return {
+        'eDP-1': Output(1, 'eDP-1', internal_enabled, True, 0, 0, 1920, 1080),
+        'DP-1': Output(2, 'DP-1', False, False, 0, 0, None, None),
+        'HDMI-A-1': Output(3, 'HDMI-A-1', True, True, 1920 if internal_enabled else 0, 0, 2560, 1440),
+    }
+
+
+def test_parse_plasma5_internal_off():
+    outputs = capture('kscreen-plasma5-internal-off.txt')
+
+    assert list(outputs) == ['eDP-1', 'DP-1', 'HDMI-A-1']
+    assert outputs['eDP-1'] == Output(65, 'eDP-1', False, True, 0, 0, 1920, 1080)
+    assert outputs['DP-1'] == Output(66, 'DP-1', False, False, 0, 0, 0, 0)
+    assert outputs['HDMI-A-1'] == Output(67, 'HDMI-A-1', True, True, 0, 0, 2560, 1440)
+
+
+def test_parse_plasma6_internal_off():
+    outputs = capture('kscreen-plasma6-internal-off.txt')
+
+    assert list(outputs) == ['eDP-1', 'DP-1', 'DP-2', 'HDMI-A-1']
+    assert outputs['eDP-1'] == Output(1, 'eDP-1', False, True, 0, 0, 1440, 900)
+    # No Geometry line for the disconnected output
+    assert outputs['DP-1'] == Output(2, 'DP-1', False, False, 0, 0, None, None)
+    assert outputs['DP-2'] == Output(3, 'DP-2', False, True, 1440, 0, 2560, 1440)
+    # 'HDR: enabled' further down is not the output state
+    assert outputs['HDMI-A-1'] == Output(4, 'HDMI-A-1', True, True, 0, 0, 2560, 1440)
+
+
+def test_parse_plasma6_three_on_with_color_codes():
+    outputs = capture('kscreen-plasma6-three-on.txt')
+
+    assert list(outputs) == ['eDP-1', 'DP-2', 'HDMI-A-1']
+    assert outputs['eDP-1'] == Output(1, 'eDP-1', True, True, 0, 0, 1440, 900)
+    assert outputs['DP-2'] == Output(2, 'DP-2', True, True, 1440, 0, 2560, 1440)
+    assert outputs['HDMI-A-1'] == Output(3, 'HDMI-A-1', True, True, 4000, 0, 2560, 1440)
+
+
+def test_plan_on_to_off_with_third_monitor():
+    args, message = plan_toggle(capture('kscreen-plasma6-three-on.txt'))
+
+    assert args == ['output.eDP-1.disable', 'output.DP-2.disable', 'output.HDMI-A-1.position.0,0']
+    assert message == "Internal + middle screen disabled"
+
+
+def test_plan_on_to_off_without_third_monitor():
+    args, message = plan_toggle(two_screens(internal_enabled=True))
+
+    assert args == ['output.eDP-1.disable', 'output.HDMI-A-1.position.0,0']
+    assert message == "Internal screen disabled"
+
+
+def test_plan_off_to_on_with_third_monitor():
+    # DP-1 is listed first but disconnected; DP-2 becomes the middle screen
+    args, message = plan_toggle(capture('kscreen-plasma6-internal-off.txt'))
+
+    assert args == ['output.eDP-1.enable', 'output.eDP-1.position.0,0',
+                    'output.DP-2.enable', 'output.DP-2.position.1440,0',
+                    'output.HDMI-A-1.position.4000,0']
+    assert message == "3 screens: Internal | DP-2 | External"
+
+
+def test_plan_off_to_on_without_third_monitor():
+    args, message = plan_toggle(capture('kscreen-plasma5-internal-off.txt'))
+
+    assert args == ['output.eDP-1.enable', 'output.eDP-1.position.0,0',
+                    'output.HDMI-A-1.position.1920,0']
+    assert message == "Internal screen enabled (extended right)"
+
+
+def test_plan_off_to_on_without_geometry_uses_default_width():
+    outputs = two_screens(internal_enabled=False)
+    outputs['eDP-1'] = outputs['eDP-1']._replace(width=None, height=None)
+
+    args, _ = plan_toggle(outputs)
+
+    assert args[-1] == 'output.HDMI-A-1.position.1920,0'
+
+
+def test_plan_missing_internal_output():
+    outputs = capture('kscreen-plasma5-internal-off.txt')
+
+    with pytest.raises(ValueError, match='eDP-2'):
+        plan_toggle(outputs, internal='eDP-2')
@@ -0,0 +1,79 @@
+"""Event bus socket permissions and startup"""
+
+import asyncio
+import os
+import stat
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from event_bus import EventBroadcaster, subscribe  # noqa: E402
+
+
+def started(bus):
+    """Start bus, return the stat of its socket, close it again"""
+    async def run():
+        await bus.start()
+        try:
+            return os.stat(bus.path)
+        finally:
+            await bus.close()
+    return asyncio.run(run())
+
+
+def test_socket_is_private_by_default(tmp_path):
+    st = started(EventBroadcaster(str(tmp_path / 'bus.sock')))
+
+    assert stat.S_ISSOCK(st.st_mode)
+    assert stat.S_IMODE(st.st_mode) == 0o600
+
+
+def test_group_socket_is_group_writable(tmp_path):
+    st = started(EventBroadcaster(str(tmp_path / 'bus.sock'), group=str(os.getgid())))
+
+    assert stat.S_IMODE(st.st_mode) == 0o660
+    assert st.st_gid == os.getgid()
+
+
+def test_explicit_mode(tmp_path):
+    st = started(EventBroadcaster(str(tmp_path / 'bus.sock'), mode=0o640, group=os.getgid()))
+
+    assert stat.S_IMODE(st.st_mode) == 0o640
+
+
+def test_unknown_group_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='no-such-group'):
+        EventBroadcaster(str(tmp_path / 'bus.sock'), group='no-such-group')
+
+
+def test_start_replaces_a_stale_socket(tmp_path):
+    path = str(tmp_path / 'bus.sock')
+
+    async def run():
+        stale = EventBroadcaster(path)
+        await stale.start()
+        # The socket file stays behind, like after a crash
+        stale._server.close()
+        await stale._server.wait_closed()
+        bus = EventBroadcaster(path)
+        await bus.start()
+        try:
+            sock = await asyncio.to_thread(subscribe, path)
+            sock.close()
+        finally:
+            await bus.close()
+
+    asyncio.run(run())
+    assert not os.path.exists(path)
+
+
+def test_start_refuses_to_remove_other_files(tmp_path):
+    path = tmp_path / 'bus.sock'
+    path.write_text('not a socket')
+    bus = EventBroadcaster(str(path))
+
+    with pytest.raises(OSError, match='not a socket'):
+        asyncio.run(bus.start())
+    assert path.read_text() == 'not a socket'
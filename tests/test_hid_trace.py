@@ -0,0 +1,53 @@
+"""Replay of traces that mix IN reports and OUT packets (--trace-file captures)"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hid_trace import TraceWriter, replay  # noqa: E402
+from minikb_gui import ENDPOINT_OUT, InputMonitor  # noqa: E402
+
+F13 = 0x68
+
+
+def write_mixed_trace(path):
+    """A key press and release with programming and LED packets in between"""
+    with TraceWriter(path) as writer:
+        writer.write(ENDPOINT_OUT, bytes([0x03] + [0x00] * 64), 1000)
+        writer.write(0x81, bytes([0, 0, F13, 0, 0, 0, 0, 0]), 2000)
+        # Set key / LED mode packets: as input these would read as presses
+        writer.write(ENDPOINT_OUT, bytes([0x03, 0xfe, 0x01, 0x01] + [0x00] * 61), 3000)
+        writer.write(ENDPOINT_OUT, bytes([0x03, 0xb0, 0x18, 0x02] + [0x00] * 61), 4000)
+        writer.write(0x81, bytes(8), 5000)
+
+
+class Recorder:
+    def __init__(self):
+        self.reports = []
+
+    def _process_input(self, data, ep_addr=0):
+        self.reports.append((ep_addr, data))
+
+
+def test_replay_skips_out_packets(tmp_path):
+    path = str(tmp_path / 'mixed.mkt')
+    write_mixed_trace(path)
+
+    recorder = Recorder()
+    reports, _ = replay(path, recorder, speed=0)
+
+    assert reports == 2
+    assert [endpoint for endpoint, _ in recorder.reports] == [0x81, 0x81]
+
+
+def test_replay_mixed_trace_decodes_only_key_events(tmp_path):
+    path = str(tmp_path / 'mixed.mkt')
+    write_mixed_trace(path)
+
+    events = []
+    monitor = InputMonitor(None, events.append)
+    monitor.raw_events = False
+    replay(path, monitor, speed=0)
+
+    assert [(event.type, event.keycode) for event in events] == [('press', F13), ('release', F13)]
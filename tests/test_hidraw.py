@@ -0,0 +1,124 @@
+"""HidrawDevice over pipes and ptys: same packets as MiniKBDevice over pyusb"""
+
+import os
+import pty
+import sys
+import threading
+import tty
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minikb_gui import BUTTONS, ENDPOINT_IN, HidrawDevice  # noqa: E402
+from minikb_sim import SimulatedDevice, SimulatedKeyboard  # noqa: E402
+
+PACKET_SIZE = 65
+F13 = 0x68
+
+
+def operations(device):
+    """Start/key/commit and LED mode sequences"""
+    device.program_layer([(button_id, [(0x04 + i, 0)]) for i, button_id in enumerate(BUTTONS.values())])
+    device.program_layer([(BUTTONS['Button 1'], [(0x04, 0x01), (0x05, 0)])], layer=1)
+    device.set_key(BUTTONS['Knob Press'], F13)
+    device.set_led_mode(2)
+    device.set_led_mode(0)
+
+
+def usb_packets():
+    """Packets MiniKBDevice sends over pyusb for connect() and operations()"""
+    keyboard = SimulatedKeyboard(0.0)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    operations(device)
+    return keyboard.packets
+
+
+class Reader(threading.Thread):
+    """Drains fd until size bytes arrived, so the writer never blocks"""
+
+    def __init__(self, fd, size):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.size = size
+        self.data = bytearray()
+
+    def run(self):
+        while len(self.data) < self.size:
+            self.data += os.read(self.fd, self.size - len(self.data))
+
+
+def open_pipe():
+    """(fd the device writes to, fd the test reads from, fds to close)"""
+    read_fd, write_fd = os.pipe()
+    return write_fd, read_fd, (read_fd, write_fd)
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return slave, master, (master, slave)
+
+
+@pytest.mark.parametrize('channel', [open_pipe, open_pty], ids=['pipe', 'pty'])
+def test_packets_match_pyusb_transport(channel):
+    expected = usb_packets()
+    device_fd, test_fd, fds = channel()
+    try:
+        reader = Reader(test_fd, len(expected) * PACKET_SIZE)
+        reader.start()
+        device = HidrawDevice(device_fd)
+        device.connect()
+        operations(device)
+        reader.join(5)
+
+        sent = [bytes(reader.data[i:i + PACKET_SIZE]) for i in range(0, len(reader.data), PACKET_SIZE)]
+        assert sent == expected
+        device.disconnect()
+        # The fd belongs to the caller
+        os.fstat(device_fd)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def test_input_reports_over_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    try:
+        device = HidrawDevice(slave, endpoint=0x83)
+        device.connect()
+        assert device.read_input(timeout=10) is None
+
+        report = bytes([0, 0, F13, 0, 0, 0, 0, 0])
+        os.write(master, report)
+        assert device.read_input(timeout=1000) == [(0x83, report)]
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_path_is_opened_and_closed(tmp_path):
+    path = str(tmp_path / 'hidraw0')
+    os.mkfifo(path)
+    keep = os.open(path, os.O_RDWR)  # a FIFO opened read-write never blocks
+    try:
+        device = HidrawDevice(path)
+        device.connect()
+        assert device.device == path
+        assert device.in_fds == {device.out_fd: ENDPOINT_IN}
+        out_fd = device.out_fd
+        device.disconnect()
+
+        with pytest.raises(OSError):
+            os.fstat(out_fd)
+        assert os.read(keep, PACKET_SIZE) == bytes([0x03] + [0x00] * 64)
+    finally:
+        os.close(keep)
+
+
+def test_missing_path_is_reported():
+    device = HidrawDevice('/nonexistent/hidraw9')
+    with pytest.raises(RuntimeError, match='Cannot open /nonexistent/hidraw9'):
+        device.connect()
@@ -0,0 +1,105 @@
+"""HyperHDRSupervisor against a dummy child that binds a Unix socket"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hyperhdr_toggle import HyperHDRSupervisor, _starttime  # noqa: E402
+
+# argv: socket path, 'normal' or 'stubborn' (ignores SIGTERM)
+DUMMY = """\
+import signal, socket, sys
+if sys.argv[2] == 'stubborn':
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+server = socket.socket(socket.AF_UNIX)
+server.bind(sys.argv[1])
+server.listen(1)
+while True:
+    signal.pause()
+"""
+
+
+@pytest.fixture
+def make_supervisor(tmp_path):
+    with open(tmp_path / 'dummy.py', 'w') as f:
+        f.write(DUMMY)
+    supervisors = []
+
+    def make(mode='normal'):
+        command = [sys.executable, str(tmp_path / 'dummy.py'), str(tmp_path / 'hdr.sock'), mode]
+        supervisor = HyperHDRSupervisor(command, str(tmp_path / 'hdr.sock'),
+                                        str(tmp_path / 'hdr.pid'), name=None)
+        supervisors.append(supervisor)
+        return supervisor
+
+    yield make
+    for supervisor in supervisors:
+        # Never signal the test run itself (see the stale pidfile test)
+        if os.getpid() not in supervisor.running():
+            supervisor.stop(term_timeout=0.1)
+
+
+def test_start_reports_ready(make_supervisor):
+    supervisor = make_supervisor()
+
+    pid, state, seconds = supervisor.start(timeout=5)
+
+    assert state == 'ready'
+    assert supervisor.running() == [pid]
+    assert os.path.exists(supervisor.socket_path)
+    assert seconds < 5
+
+
+def test_stop_with_sigterm_needs_no_sigkill(make_supervisor):
+    supervisor = make_supervisor()
+    pid, _, _ = supervisor.start(timeout=5)
+
+    pids, killed, _ = supervisor.stop(term_timeout=5)
+
+    assert pids == [pid]
+    assert killed == []
+    assert _starttime(pid) is None
+    assert supervisor.running() == []
+    assert not os.path.exists(supervisor.socket_path)
+    assert not os.path.exists(supervisor.pidfile)
+
+
+def test_stubborn_child_is_killed_after_term_timeout(make_supervisor):
+    supervisor = make_supervisor('stubborn')
+    pid, state, _ = supervisor.start(timeout=5)
+    assert state == 'ready'
+
+    pids, killed, seconds = supervisor.stop(term_timeout=0.3)
+
+    assert pids == [pid]
+    assert killed == [pid]
+    assert seconds >= 0.3
+    assert _starttime(pid) is None
+
+
+def test_stale_pidfile_is_not_running(make_supervisor):
+    supervisor = make_supervisor()
+    starttime = _starttime(os.getpid())
+
+    # Our own pid with its real start time counts as running
+    with open(supervisor.pidfile, 'w') as f:
+        f.write(f"{os.getpid()} {starttime}\n")
+    assert supervisor.running() == [os.getpid()]
+
+    # The same pid with another start time is a recycled pid, not ours
+    with open(supervisor.pidfile, 'w') as f:
+        f.write(f"{os.getpid()} {starttime + 1}\n")
+    assert supervisor.running() == []
+
+    # A pid that is gone
+    pid, _, _ = supervisor.start(timeout=5)
+    with open(supervisor.pidfile) as f:
+        stale = f.read()
+    supervisor.stop(term_timeout=5)
+    with open(supervisor.pidfile, 'w') as f:
+        f.write(stale)
+    assert supervisor.running() == []
+    assert supervisor.toggle(start_timeout=5)[0] == 'started'
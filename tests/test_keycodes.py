@@ -0,0 +1,27 @@
+"""Keycode registry: GUI display names resolve to the same keys everywhere"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import keycodes  # noqa: E402
+
+
+def test_display_names_round_trip_through_keycode():
+    wrong = {display: (code, keycodes.keycode(display))
+             for display, code in keycodes.DISPLAY_KEYCODES.items()
+             if keycodes.keycode(display) != code}
+    assert wrong == {}
+
+
+def test_display_name_of_each_display_keycode():
+    for display, code in keycodes.DISPLAY_KEYCODES.items():
+        assert keycodes.display_name(code) == display
+
+
+def test_mute_display_name_is_keyboard_page_key():
+    # The GUI saves 'Mute' (0x7f); the canonical name 'mute' is the media key
+    assert keycodes.keycode('Mute') == keycodes.DISPLAY_KEYCODES['Mute'] == 0x7f
+    assert keycodes.keycode('mute') == 0xef
+    assert keycodes.parse_action('mute') == (0xef, 0)
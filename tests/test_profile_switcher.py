@@ -0,0 +1,118 @@
+"""Profile switching driven by FakeWindowSource, headless"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import profile_switcher  # noqa: E402
+from profile_switcher import FakeWindowSource, ProfileSwitcher, RecordingDevice  # noqa: E402
+
+MAPPING = """\
+rows: 2
+columns: 3
+layers:
+  - buttons:
+      - [{0}, b, c]
+      - [d, e, f]
+    knobs:
+      - ccw: volumedown
+        press: mute
+        cw: volumeup
+"""
+
+# HID keycodes
+A, B, C, F13 = 0x04, 0x05, 0x06, 0x68
+VOLUME_DOWN, MUTE, VOLUME_UP = 0xee, 0xef, 0xed
+
+
+def write_profile(path, first_key):
+    with open(path, 'w') as f:
+        f.write(MAPPING.format(first_key))
+
+
+def make_switcher(tmp_path):
+    """Profiles 'edit' and 'media' that differ in button 1 only"""
+    profiles = {'edit': str(tmp_path / 'edit.yaml'), 'media': str(tmp_path / 'media.yaml')}
+    write_profile(profiles['edit'], 'a')
+    write_profile(profiles['media'], 'f13')
+    device = RecordingDevice()
+    switcher = ProfileSwitcher(device, profiles, {'Konsole': 'edit', 'firefox': 'media'})
+    return switcher, device
+
+
+def run(switcher, *classes):
+    source = FakeWindowSource(classes)
+    source.close()
+    switcher.run(source)
+
+
+def test_first_switch_writes_every_key(tmp_path):
+    switcher, device = make_switcher(tmp_path)
+    run(switcher, 'konsole')
+
+    assert switcher.active == 'edit'
+    assert len(device.sessions) == 1
+    layer, bindings = device.sessions[0]
+    assert layer == 0
+    assert dict(bindings) == {0x01: [(A, 0)], 0x02: [(B, 0)], 0x03: [(C, 0)],
+                              0x04: [(0x07, 0)], 0x05: [(0x08, 0)], 0x06: [(0x09, 0)],
+                              0x0d: [(VOLUME_DOWN, 0)], 0x0e: [(MUTE, 0)], 0x0f: [(VOLUME_UP, 0)]}
+
+
+def test_switch_writes_only_changed_keys(tmp_path):
+    switcher, device = make_switcher(tmp_path)
+    run(switcher, 'konsole', 'firefox', 'konsole')
+
+    assert [bindings for _, bindings in device.sessions[1:]] == [[(0x01, [(F13, 0)])],
+                                                                 [(0x01, [(A, 0)])]]
+    assert switcher.state[(0, 0x01)] == ((A, 0),)
+    assert switcher.state[(0, 0x02)] == ((B, 0),)
+
+
+def test_diff_is_per_layer_and_button(tmp_path):
+    switcher, _ = make_switcher(tmp_path)
+    switcher.state = {(0, 0x01): ((A, 0),), (1, 0x01): ((F13, 0),)}
+
+    changes = switcher.diff({(0, 0x01): ((A, 0),), (0, 0x02): ((B, 0),), (1, 0x01): ((A, 0),)})
+
+    assert changes == {0: [(0x02, [(B, 0)])], 1: [(0x01, [(A, 0)])]}
+
+
+def test_same_profile_and_unknown_window_write_nothing(tmp_path):
+    switcher, device = make_switcher(tmp_path)
+    # Instance and class names both match ('konsole', 'Konsole')
+    run(switcher, 'konsole', 'Konsole', 'gimp')
+
+    assert len(device.sessions) == 1
+    assert switcher.active == 'edit'
+
+
+def test_compiled_profile_reused_until_mtime_changes(tmp_path, monkeypatch):
+    switcher, device = make_switcher(tmp_path)
+    compiled = []
+    original = profile_switcher.compile_profile
+
+    def counting(path):
+        compiled.append(os.path.basename(path))
+        return original(path)
+
+    monkeypatch.setattr(profile_switcher, 'compile_profile', counting)
+
+    switcher.preload()
+    run(switcher, 'konsole', 'firefox', 'konsole', 'firefox')
+    assert sorted(compiled) == ['edit.yaml', 'media.yaml']
+
+    # Rewrite media with a new key; only a newer mtime makes it recompile
+    path = switcher.profiles['media']
+    stat = os.stat(path)
+    write_profile(path, 'c')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    run(switcher, 'konsole', 'firefox')
+    assert sorted(compiled) == ['edit.yaml', 'media.yaml']
+    assert device.sessions[-1][1] == [(0x01, [(F13, 0)])]
+
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    run(switcher, 'konsole', 'firefox')
+    assert sorted(compiled) == ['edit.yaml', 'media.yaml', 'media.yaml']
+    assert device.sessions[-1][1] == [(0x01, [(C, 0)])]
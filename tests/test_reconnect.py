@@ -0,0 +1,108 @@
+"""Fault recovery of MiniKBDevice on the simulated keyboard"""
+
+import errno
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minikb_gui import BUTTONS, INTERACTIVE_RECONNECT_TIMEOUT  # noqa: E402
+from minikb_sim import SimulatedDevice, SimulatedKeyboard  # noqa: E402
+
+REENUMERATE = 0.05
+
+
+def bindings(keycode):
+    return [(button_id, [(keycode + i, 0)]) for i, button_id in enumerate(BUTTONS.values())]
+
+
+def expected_keys(keycode):
+    return {(0, button_id): sequence for button_id, sequence in bindings(keycode)}
+
+
+def connected(away=REENUMERATE):
+    keyboard = SimulatedKeyboard(away)
+    device = SimulatedDevice(keyboard)
+    device.connect()
+    device.set_led_mode(2)
+    return keyboard, device
+
+
+def test_transient_error_is_retried_in_place():
+    keyboard, device = connected()
+    generation = device.generation
+
+    keyboard.inject('stall', after=3)
+    device.program_layer(bindings(0x04))
+
+    assert keyboard.fail_in is None  # the stall happened
+    assert keyboard.keys == expected_keys(0x04)
+    assert device.reconnects == 0
+    assert device.generation == generation
+    assert keyboard.epoch == 0
+
+
+def test_disconnect_reconnects_and_replays_session():
+    keyboard, device = connected()
+    device.program_layer(bindings(0x04))
+    generation = device.generation
+
+    # Drops off the bus in the middle of the session, forgetting the LED mode
+    keyboard.inject('reset', after=4)
+    device.program_layer(bindings(0x10))
+
+    assert device.reconnects == 1
+    assert device.generation == generation + 1
+    assert keyboard.keys == expected_keys(0x10)
+    assert keyboard.led_mode == 2
+
+
+def test_stale_generation_is_rejected():
+    keyboard, device = connected()
+    stale_handle, stale_generation = device.device, device.generation
+
+    keyboard.inject('reset')
+    device.set_led_mode(1)
+    assert device.reconnects == 1
+    assert keyboard.led_mode == 1
+
+    # A handle of the previous enumeration is dead
+    with pytest.raises(OSError) as info:
+        stale_handle.write(0x02, bytes(65))
+    assert info.value.errno == errno.ENODEV
+
+    # A failure seen before the reconnect does not reconnect again
+    epoch = keyboard.epoch
+    assert device.reconnect(generation=stale_generation) == 0.0
+    assert device.reconnects == 1
+    assert keyboard.epoch == epoch
+    device.set_led_mode(3)
+    assert keyboard.led_mode == 3
+
+
+def test_interactive_thread_gives_up_after_timeout():
+    keyboard, device = connected(away=1.0)
+    device.interactive_thread = threading.current_thread()
+
+    keyboard.inject('reset')
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        device.set_led_mode(1)
+    waited = time.monotonic() - start
+    assert waited < INTERACTIVE_RECONNECT_TIMEOUT + 0.1
+
+    # Writes fail at once while the recovery continues in the background
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        device.set_led_mode(1)
+    assert time.monotonic() - start < INTERACTIVE_RECONNECT_TIMEOUT
+
+    deadline = time.monotonic() + 2.0
+    while not device.reconnects and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert device.reconnects == 1
+    assert keyboard.led_mode == 2
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+MiniKB Transfer Trace - Every USB transfer, grouped by device operation
+A TransferTracer attached to MiniKBDevice.tracer records each OUT and IN
+transfer (monotonic ns timestamp, duration, length, first PREVIEW_BYTES
+bytes, error) inside a span for the operation that caused it: connect,
+set_key, set_macro, program_layer, set_led_mode, read_input, reconnect.
+Spans nest (set_key -> set_macro) per thread.
+
+export_chrome() writes Chrome trace-event JSON: open it in chrome://tracing
+or https://ui.perfetto.dev to see which transfer of a slow apply stalled.
+Spans are category 'op', transfers 'out' / 'in'; one row per thread.
+
+Records are kept in a ring of max_events, so tracing can stay on in a long
+session; the oldest are dropped first.
+
+Usage:
+    python3 minikb_gui.py --chrome-trace session.json
+    python3 transfer_trace.py session.json
+    python3 transfer_trace.py session.json --top 20
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PREVIEW_BYTES = 16
+MAX_EVENTS = 200000
+
+
+class TransferTracer:
+    """Records device operations as spans and USB transfers inside them"""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.events = deque(maxlen=max_events)
+        self.started_ns = time.monotonic_ns()
+        self.transfers = 0
+        self._local = threading.local()
+        self._threads = {}  # thread id -> name
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            thread = threading.current_thread()
+            self._threads[thread.ident] = thread.name
+        return stack
+
+    @contextmanager
+    def span(self, name, keep_empty=True, **args):
+        """Group the transfers of one operation
+
+        Args:
+            keep_empty: record the span even if it made no transfer (False
+                for polls such as read_input)
+            args: shown with the span in the trace viewer
+        """
+        stack = self._stack()
+        # [name, transfers inside]
+        frame = [name, 0]
+        stack.append(frame)
+        start = time.monotonic_ns()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            end = time.monotonic_ns()
+            stack.pop()
+            if stack:
+                stack[-1][1] += frame[1]
+            if keep_empty or frame[1] or error is not None:
+                if error is not None:
+                    args['error'] = str(error)
+                self.events.append(('span', threading.get_ident(), start, end, name, args))
+
+    def transfer(self, direction, endpoint, data, start_ns, end_ns, error=None):
+        """Record one transfer ('out' or 'in') inside the current span"""
+        stack = self._stack()
+        operation = stack[-1][0] if stack else None
+        if stack:
+            stack[-1][1] += 1
+        self.transfers += 1
+        self.events.append(('xfer', threading.get_ident(), start_ns, end_ns, direction, endpoint,
+                            len(data), bytes(data[:PREVIEW_BYTES]), operation,
+                            None if error is None else str(error)))
+
+    def chrome_events(self):
+        """The recorded events as Chrome trace-event dicts (timestamps in us)"""
+        pid = os.getpid()
+        base = self.started_ns
+        out = [{'ph': 'M', 'name': 'process_name', 'pid': pid, 'args': {'name': 'MiniKB device'}}]
+        for tid, name in list(self._threads.items()):
+            out.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+
+        for event in list(self.events):
+            if event[0] == 'span':
+                _, tid, start, end, name, args = event
+                out.append({'ph': 'X', 'cat': 'op', 'name': name, 'pid': pid, 'tid': tid,
+                            'ts': (start - base) / 1000, 'dur': (end - start) / 1000, 'args': args})
+                continue
+            _, tid, start, end, direction, endpoint, length, preview, operation, error = event
+            args = {'endpoint': f'0x{endpoint:02x}', 'length': length, 'bytes': preview.hex(' ')}
+            if operation:
+                args['operation'] = operation
+            if error:
+                args['error'] = error
+            out.append({'ph': 'X', 'cat': direction,
+                        'name': f"{direction.upper()} 0x{endpoint:02x}{' !' if error else ''}",
+                        'pid': pid, 'tid': tid, 'ts': (start - base) / 1000,
+                        'dur': (end - start) / 1000, 'args': args})
+        return out
+
+    def export_chrome(self, path):
+        """Write the trace as Chrome trace-event JSON; returns the number of events"""
+        events = self.chrome_events()
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, separators=(',', ':'))
+        return len(events)
+
+
+def summarize(path, top=10):
+    """Slowest operations and transfers of an exported trace, as printable lines"""
+    with open(path) as f:
+        events = [e for e in json.load(f)['traceEvents'] if e.get('ph') == 'X']
+
+    lines = []
+    spans = [e for e in events if e['cat'] == 'op']
+    transfers = [e for e in events if e['cat'] != 'op']
+    lines.append(f"{len(spans)} operation(s), {len(transfers)} transfer(s), "
+                 f"{sum(1 for e in transfers if 'error' in e['args'])} failed")
+
+    totals = {}
+    for span in spans:
+        count, total, worst = totals.get(span['name'], (0, 0.0, 0.0))
+        totals[span['name']] = (count + 1, total + span['dur'], max(worst, span['dur']))
+    lines.append(f"\n{'operation':>14} {'count':>6} {'avg ms':>8} {'max ms':>8}")
+    for name, (count, total, worst) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:>14} {count:>6} {total / count / 1000:>8.2f} {worst / 1000:>8.2f}")
+
+    lines.append(f"\nslowest transfers{'':>4} {'ms':>7}  {'at ms':>10}  operation / bytes")
+    for event in sorted(transfers, key=lambda e: -e['dur'])[:top]:
+        args = event['args']
+        lines.append(f"{event['name']:>21} {event['dur'] / 1000:>7.2f}  {event['ts'] / 1000:>10.1f}  "
+                     f"{args.get('operation', '-')}: {args['bytes']}"
+                     f"{'  ' + args['error'] if 'error' in args else ''}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a MiniKB Chrome trace')
+    parser.add_argument('trace', help='JSON written by --chrome-trace')
+    parser.add_argument('--top', type=int, default=10, help='Slowest transfers to list (default: 10)')
+    args = parser.parse_args()
+
+    for line in summarize(args.trace, args.top):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
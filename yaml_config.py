@@ -4,6 +4,10 @@ YAML Configuration Parser for MiniKB
 Compatible with ch57x-keyboard-tool format
 """
 
+import time
+
+from keycodes import MAX_MACRO_LENGTH, parse_action
+
 try:
     import yaml
     YAML_AVAILABLE = True
@@ -12,96 +16,103 @@ except ImportError:
     print("Warning: pyyaml not installed. Run: pip install pyyaml")
 
 
-# Key name to HID keycode mapping (compatible with ch57x-keyboard-tool)
-KEY_MAP = {
-    # Letters
-    'a': 0x04, 'b': 0x05, 'c': 0x06, 'd': 0x07, 'e': 0x08,
-    'f': 0x09, 'g': 0x0a, 'h': 0x0b, 'i': 0x0c, 'j': 0x0d,
-    'k': 0x0e, 'l': 0x0f, 'm': 0x10, 'n': 0x11, 'o': 0x12,
-    'p': 0x13, 'q': 0x14, 'r': 0x15, 's': 0x16, 't': 0x17,
-    'u': 0x18, 'v': 0x19, 'w': 0x1a, 'x': 0x1b, 'y': 0x1c, 'z': 0x1d,
-
-    # Numbers
-    '1': 0x1e, '2': 0x1f, '3': 0x20, '4': 0x21, '5': 0x22,
-    '6': 0x23, '7': 0x24, '8': 0x25, '9': 0x26, '0': 0x27,
-
-    # Function keys
-    'f1': 0x3a, 'f2': 0x3b, 'f3': 0x3c, 'f4': 0x3d, 'f5': 0x3e, 'f6': 0x3f,
-    'f7': 0x40, 'f8': 0x41, 'f9': 0x42, 'f10': 0x43, 'f11': 0x44, 'f12': 0x45,
-    'f13': 0x68, 'f14': 0x69, 'f15': 0x6a, 'f16': 0x6b,
-    'f17': 0x6c, 'f18': 0x6d, 'f19': 0x6e, 'f20': 0x6f,
-    'f21': 0x70, 'f22': 0x71, 'f23': 0x72, 'f24': 0x73,
-
-    # Special keys
-    'enter': 0x28, 'escape': 0x29, 'backspace': 0x2a, 'tab': 0x2b,
-    'space': 0x2c, 'minus': 0x2d, 'equal': 0x2e,
-    'leftbracket': 0x2f, 'rightbracket': 0x30, 'backslash': 0x31,
-    'semicolon': 0x33, 'quote': 0x34, 'grave': 0x35,
-    'comma': 0x36, 'dot': 0x37, 'slash': 0x38,
-    'capslock': 0x39,
-
-    # Navigation
-    'insert': 0x49, 'home': 0x4a, 'pageup': 0x4b,
-    'delete': 0x4c, 'end': 0x4d, 'pagedown': 0x4e,
-    'right': 0x4f, 'left': 0x50, 'down': 0x51, 'up': 0x52,
-
-    # Media keys
-    'mute': 0xef, 'volumeup': 0xed, 'volumedown': 0xee,
-    'next': 0xeb, 'previous': 0xea, 'prev': 0xea,
-    'play': 0xe8, 'stop': 0xe9,
-}
-
-# Modifier name to bitmask
-MODIFIER_MAP = {
-    'ctrl': 0x01,
-    'shift': 0x02,
-    'alt': 0x04,
-    'opt': 0x04,  # Mac option = alt
-    'win': 0x08,
-    'cmd': 0x08,  # Mac command = win
-    'rctrl': 0x10,
-    'rshift': 0x20,
-    'ralt': 0x40,
-    'ropt': 0x40,
-    'rwin': 0x80,
-    'rcmd': 0x80,
-}
+# ch57x keyboards store up to three layers
+MAX_LAYERS = 3
+
+# Button IDs: 1-6 for buttons, 0x0d, 0x0e, 0x0f for knob
+BUTTON_IDS = [0x01, 0x02, 0x03, 0x04, 0x05, 0x06]
+KNOB_CCW_ID = 0x0d
+KNOB_PRESS_ID = 0x0e
+KNOB_CW_ID = 0x0f
 
 
 def parse_key_action(action_str):
     """Parse key action string like 'ctrl-shift-c' into (keycode, modifier)
 
+    Comma-separated actions ('ctrl-c,ctrl-v') and YAML lists ([ctrl-c, ctrl-v])
+    describe a macro and are returned as a list of (keycode, modifier) chords.
+
     Args:
-        action_str: String like 'a', 'ctrl-c', 'ctrl-shift-delete', etc.
+        action_str: String like 'a', 'ctrl-c', 'ctrl-shift-delete', etc., or
+            a list of such strings
 
     Returns:
-        tuple: (keycode, modifier) or None if invalid
+        tuple: (keycode, modifier), list of tuples for macros, or None if invalid
     """
+    if isinstance(action_str, list):
+        # YAML list form of a macro: [ctrl-c, ctrl-v]
+        action_str = ','.join(str(a) for a in action_str)
     if not action_str or not isinstance(action_str, str):
         return None
 
-    parts = action_str.lower().split('-')
+    if ',' in action_str:
+        return parse_macro(action_str)
+
+    try:
+        return parse_action(action_str)
+    except ValueError as e:
+        print(f"Warning: {e}")
+        return None
+
+
+def _parse_layer(layer, index, max_buttons):
+    """Parse a single layer dict into button and knob actions
+
+    Args:
+        layer: Layer dict from the YAML 'layers' list
+        index: Layer number (used in error messages)
+        max_buttons: rows * columns of the keyboard
+
+    Returns:
+        dict: {'buttons': [...], 'knob_ccw': ..., 'knob_press': ..., 'knob_cw': ...}
+    """
+    if not isinstance(layer, dict):
+        raise ValueError(f"Invalid YAML config: layer {index} is not a mapping")
+
+    # Parse buttons (2D array -> flat list)
+    button_grid = layer.get('buttons') or []
+    buttons = []
+    for row in button_grid:
+        for action in row:
+            parsed = parse_key_action(action)
+            buttons.append(parsed if parsed else (0x00, 0x00))
+
+    if len(buttons) > max_buttons:
+        raise ValueError(f"Invalid YAML config: layer {index} has {len(buttons)} buttons, "
+                         f"keyboard has {max_buttons}")
+
+    # Parse knob
+    knob_config = layer.get('knobs', [{}])[0] if layer.get('knobs') else {}
+    knob_ccw = parse_key_action(knob_config.get('ccw', ''))
+    knob_press = parse_key_action(knob_config.get('press', ''))
+    knob_cw = parse_key_action(knob_config.get('cw', ''))
+
+    return {
+        'buttons': buttons,
+        'knob_ccw': knob_ccw if knob_ccw else (0x00, 0x00),
+        'knob_press': knob_press if knob_press else (0x00, 0x00),
+        'knob_cw': knob_cw if knob_cw else (0x00, 0x00),
+    }
+
 
-    # Last part is the key
-    key = parts[-1]
-    modifiers = parts[:-1]
+def parse_macro(action_str):
+    """Parse comma-separated actions like 'h,e,l,l,o' into a list of chords
 
-    # Get keycode
-    keycode = KEY_MAP.get(key)
-    if keycode is None:
-        print(f"Warning: Unknown key '{key}' in action '{action_str}'")
+    Returns:
+        list: [(keycode, modifier), ...] or None if any action is invalid
+    """
+    actions = [a.strip() for a in action_str.split(',') if a.strip()]
+    if len(actions) > MAX_MACRO_LENGTH:
+        print(f"Warning: Macro '{action_str}' has {len(actions)} keys (max {MAX_MACRO_LENGTH})")
         return None
 
-    # Calculate modifier bitmask
-    modifier = 0x00
-    for mod in modifiers:
-        mod_bit = MODIFIER_MAP.get(mod)
-        if mod_bit is None:
-            print(f"Warning: Unknown modifier '{mod}' in action '{action_str}'")
+    sequence = []
+    for action in actions:
+        parsed = parse_key_action(action)
+        if parsed is None:
             return None
-        modifier |= mod_bit
-
-    return (keycode, modifier)
+        sequence.append(parsed)
+    return sequence
 
 
 def parse_yaml_config(yaml_path):
@@ -117,7 +128,9 @@ def parse_yaml_config(yaml_path):
             'rows': 2,
             'columns': 3,
             'knobs': 1,
-            'buttons': [(keycode, modifier), ...],  # 6 buttons
+            'layers': [layer, ...],  # up to MAX_LAYERS, see _parse_layer()
+            # Layer 0 is also exposed at the top level:
+            'buttons': [(keycode, modifier), ...],  # 6 buttons, macros as lists
             'knob_ccw': (keycode, modifier),
             'knob_press': (keycode, modifier),
             'knob_cw': (keycode, modifier),
@@ -132,66 +145,72 @@ def parse_yaml_config(yaml_path):
     if not config or 'layers' not in config:
         raise ValueError("Invalid YAML config: missing 'layers'")
 
-    # Use first layer (layer 0)
-    layer = config['layers'][0]
+    raw_layers = config['layers']
+    if not isinstance(raw_layers, list) or not raw_layers:
+        raise ValueError("Invalid YAML config: 'layers' must be a non-empty list")
+    if len(raw_layers) > MAX_LAYERS:
+        raise ValueError(f"Invalid YAML config: {len(raw_layers)} layers, "
+                         f"device supports at most {MAX_LAYERS}")
 
-    # Parse buttons (2D array -> flat list)
-    button_grid = layer.get('buttons', [])
-    buttons = []
-    for row in button_grid:
-        for action in row:
-            parsed = parse_key_action(action)
-            buttons.append(parsed if parsed else (0x00, 0x00))
+    rows = config.get('rows', 2)
+    columns = config.get('columns', 3)
+    max_buttons = min(rows * columns, len(BUTTON_IDS))
 
-    # Parse knob
-    knob_config = layer.get('knobs', [{}])[0] if layer.get('knobs') else {}
-    knob_ccw = parse_key_action(knob_config.get('ccw', ''))
-    knob_press = parse_key_action(knob_config.get('press', ''))
-    knob_cw = parse_key_action(knob_config.get('cw', ''))
+    layers = [_parse_layer(layer, i, max_buttons) for i, layer in enumerate(raw_layers)]
 
     return {
         'orientation': config.get('orientation', 'normal'),
-        'rows': config.get('rows', 2),
-        'columns': config.get('columns', 3),
+        'rows': rows,
+        'columns': columns,
         'knobs': config.get('knobs', 1),
-        'buttons': buttons,
-        'knob_ccw': knob_ccw if knob_ccw else (0x00, 0x00),
-        'knob_press': knob_press if knob_press else (0x00, 0x00),
-        'knob_cw': knob_cw if knob_cw else (0x00, 0x00),
+        'layers': layers,
+        **layers[0],
     }
 
 
+def _as_sequence(action):
+    """Normalize a parsed action (chord or macro) to a list of chords"""
+    return action if isinstance(action, list) else [action]
+
+
+def layer_bindings(layer):
+    """Flatten a parsed layer into (button_id, [(keycode, modifier), ...]) tuples"""
+    bindings = []
+    for button_id, action in zip(BUTTON_IDS, layer['buttons']):
+        bindings.append((button_id, _as_sequence(action)))
+
+    bindings.append((KNOB_CCW_ID, _as_sequence(layer['knob_ccw'])))
+    bindings.append((KNOB_PRESS_ID, _as_sequence(layer['knob_press'])))
+    bindings.append((KNOB_CW_ID, _as_sequence(layer['knob_cw'])))
+    return bindings
+
+
 def apply_yaml_to_device(device, yaml_path):
-    """Load YAML config and apply to device
+    """Load YAML config and apply all layers to device
+
+    Each layer is uploaded as one programming session (a single start/commit
+    pair around all of its key packets) via device.program_layer().
 
     Args:
         device: MiniKBDevice instance
         yaml_path: Path to mapping.yaml
 
     Returns:
-        bool: True if successful
+        list: [(layer, key_count, seconds), ...] upload timing per layer
     """
     config = parse_yaml_config(yaml_path)
 
-    # Button IDs: 1-6 for buttons, 0x0d, 0x0e, 0x0f for knob
-    button_ids = [0x01, 0x02, 0x03, 0x04, 0x05, 0x06]
-
-    # Apply button mappings
-    for i, (keycode, modifier) in enumerate(config['buttons']):
-        if i < len(button_ids):
-            device.set_key(button_ids[i], keycode, modifier, layer=0)
-
-    # Apply knob mappings
-    knob_ccw_keycode, knob_ccw_mod = config['knob_ccw']
-    knob_press_keycode, knob_press_mod = config['knob_press']
-    knob_cw_keycode, knob_cw_mod = config['knob_cw']
-
-    device.set_key(0x0d, knob_ccw_keycode, knob_ccw_mod, layer=0)      # Knob CCW
-    device.set_key(0x0e, knob_press_keycode, knob_press_mod, layer=0)  # Knob Press
-    device.set_key(0x0f, knob_cw_keycode, knob_cw_mod, layer=0)        # Knob CW
+    timings = []
+    for layer_num, layer in enumerate(config['layers']):
+        bindings = layer_bindings(layer)
+        start = time.perf_counter()
+        device.program_layer(bindings, layer=layer_num)
+        elapsed = time.perf_counter() - start
+        timings.append((layer_num, len(bindings), elapsed))
+        print(f"  Layer {layer_num}: {len(bindings)} keys in {elapsed * 1000:.1f} ms")
 
-    print(f"Applied YAML config: {len(config['buttons'])} buttons + knob")
-    return True
+    print(f"Applied YAML config: {len(config['layers'])} layer(s)")
+    return timings
 
 
 if __name__ == "__main__":
@@ -206,3 +225,6 @@ if __name__ == "__main__":
         print(f"  Knob CCW: {config['knob_ccw']}")
         print(f"  Knob Press: {config['knob_press']}")
         print(f"  Knob CW: {config['knob_cw']}")
+        print(f"  Layers: {len(config['layers'])}")
+        for i, layer in enumerate(config['layers'][1:], start=1):
+            print(f"  Layer {i} buttons: {layer['buttons']}")